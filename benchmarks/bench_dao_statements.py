@@ -0,0 +1,67 @@
+"""
+Микробенчмарк накладных расходов BaseDAO на один вызов.
+
+Сравнивает построение запроса select(...).filter_by(**filters) на каждый вызов (как было)
+с конструкцией из statement_cache, а также pydantic model_dump против передачи словаря.
+Выполнение измеряется на синхронной SQLite в памяти, чтобы время базы было минимальным
+и в результат попадали в основном расходы SQLAlchemy.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_dao_statements
+"""
+import timeit
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from bot.dao.base import _filter_params, _signature, as_dict, statement_cache
+from bot.users.dao import UserDAO
+from bot.users.models import User
+from bot.users.schemas import TelegramIDModel
+
+NUMBER = 20_000
+
+
+def report(name: str, seconds: float) -> None:
+    print(f"{name:<50} {seconds / NUMBER * 1e6:8.2f} мкс/вызов")
+
+
+def cached_select(filter_dict: dict):
+    signature = _signature(filter_dict)
+    return UserDAO._statement("select", signature, lambda: select(User).where(*UserDAO._criteria(signature)))
+
+
+def main() -> None:
+    engine = create_engine("sqlite://")
+    User.metadata.create_all(engine, tables=[User.__table__])
+    with Session(engine) as session:
+        session.add_all(User(telegram_id=telegram_id) for telegram_id in range(1, 1001))
+        session.commit()
+
+        filters = TelegramIDModel(telegram_id=500)
+        filter_dict = {"telegram_id": 500}
+
+        report("model_dump(exclude_unset=True)", timeit.timeit(lambda: filters.model_dump(exclude_unset=True),
+                                                               number=NUMBER))
+        report("as_dict(dict)", timeit.timeit(lambda: as_dict(filter_dict), number=NUMBER))
+
+        report("построение: select().filter_by()", timeit.timeit(lambda: select(User).filter_by(**filter_dict),
+                                                                  number=NUMBER))
+        report("построение: statement_cache", timeit.timeit(lambda: cached_select(filter_dict), number=NUMBER))
+
+        def execute_old() -> None:
+            query = select(User).filter_by(**filters.model_dump(exclude_unset=True))
+            session.execute(query).scalar_one_or_none()
+
+        def execute_new() -> None:
+            values = as_dict(filter_dict)
+            session.execute(cached_select(values), _filter_params(values)).scalar_one_or_none()
+
+        report("выполнение: filter_by + model_dump", timeit.timeit(execute_old, number=NUMBER))
+        report("выполнение: statement_cache + dict", timeit.timeit(execute_new, number=NUMBER))
+
+    print(f"statement_cache: {statement_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Бенчмарк профиля производительности (PERFORMANCE_PROFILE) против настроек по умолчанию.
+
+Локальный HTTP-сервер отвечает на запросы по имени localhost, чтобы в измерение попадало
+разрешение имен. Для каждого профиля измеряются:
+    * задержка первой пачки одновременных запросов (холодный пул или после warm_up);
+    * пропускная способность серии запросов с фиксированной конкурентностью.
+
+Профиль по умолчанию: asyncio event loop, DNS-кэш каждого соединителя, keep-alive 15 с, без прогрева.
+Профиль производительности: uvloop (если установлен), общий CachingResolver, keep-alive из настроек, warm_up.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_runtime
+"""
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+
+from bot.runtime import CachingResolver, ConnectorOptions, run, uvloop, warm_up
+
+BURST = 20
+REQUESTS = 5_000
+CONCURRENCY = 50
+
+
+async def _ok(request: web.Request) -> web.Response:
+    return web.json_response({"ok": True})
+
+
+async def measure(options: ConnectorOptions, warm: bool) -> tuple[float, float]:
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", _ok)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://localhost:{runner.addresses[0][1]}/ping"
+
+    async with aiohttp.ClientSession(connector=options.connector()) as session:
+        if warm:
+            await warm_up(session, url, BURST)
+
+        async def get() -> None:
+            async with session.get(url) as response:
+                await response.read()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(get() for _ in range(BURST)))
+        burst_latency = time.perf_counter() - started
+
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+
+        async def limited() -> None:
+            async with semaphore:
+                await get()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(limited() for _ in range(REQUESTS)))
+        throughput = REQUESTS / (time.perf_counter() - started)
+
+    if options.resolver is not None:
+        await options.resolver.close()
+    await runner.cleanup()
+    return burst_latency, throughput
+
+
+def main() -> None:
+    default = ConnectorOptions(keepalive_timeout=15.0)
+    tuned = ConnectorOptions(keepalive_timeout=60.0, resolver=CachingResolver(ttl=300))
+
+    results = {
+        "default": asyncio.run(measure(default, warm=False)),
+        "performance": run(measure(tuned, warm=True), fast_loop=True),
+    }
+    loop_name = "uvloop" if uvloop is not None else "asyncio (uvloop не установлен)"
+    print(f"Профиль производительности: {loop_name}")
+    print(f"{'профиль':<12} {'первые ' + str(BURST) + ' запросов, мс':>26} {'запросов/с':>12}")
+    for name, (burst_latency, throughput) in results.items():
+        print(f"{name:<12} {burst_latency * 1000:>26.1f} {throughput:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Микробенчмарк маршрутизации текстовых сообщений.
+
+Сравнивает цепочку magic-фильтров F.text.lower().contains(...) (как было в user_router)
+с таблицей TEXT_ROUTES, а также построение клавиатуры против кэшированной.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_text_routing
+"""
+import timeit
+from datetime import datetime
+
+from aiogram import F
+from aiogram.types import Chat, Message
+from aiogram.utils.keyboard import ReplyKeyboardBuilder
+
+from bot.users.filters import resolve_text_action
+from bot.users.keyboards.markup_kb import IMEI_BUTTON, start_keyboard
+
+NUMBER = 100_000
+
+MAGIC_FILTERS = [
+    F.text.lower().contains('регистрация'),
+    F.text.lower().contains('информация по imei'),
+]
+
+
+def make_message(text: str) -> Message:
+    return Message(message_id=1, date=datetime.now(), chat=Chat(id=1, type="private"), text=text)
+
+
+def magic_route(message: Message) -> int | None:
+    for index, magic in enumerate(MAGIC_FILTERS):
+        if magic.resolve(message):
+            return index
+    return None
+
+
+def build_keyboard():
+    kb = ReplyKeyboardBuilder()
+    kb.button(text=IMEI_BUTTON)
+    kb.adjust(1)
+    return kb.as_markup(resize_keyboard=True, one_time_keyboard=True)
+
+
+def report(name: str, seconds: float) -> None:
+    print(f"{name:<45} {seconds / NUMBER * 1e6:8.3f} мкс/вызов")
+
+
+def main() -> None:
+    samples = {
+        "кнопка": make_message(IMEI_BUTTON),
+        "IMEI (промах)": make_message("356938035643809"),
+        "длинный текст (промах)": make_message("произвольный текст " * 200),
+    }
+    for label, message in samples.items():
+        report(f"magic-фильтры, {label}", timeit.timeit(lambda: magic_route(message), number=NUMBER))
+        report(f"TEXT_ROUTES, {label}", timeit.timeit(lambda: resolve_text_action(message.text), number=NUMBER))
+
+    report("ReplyKeyboardBuilder на каждый ответ", timeit.timeit(build_keyboard, number=NUMBER // 10) * 10)
+    report("start_keyboard (кэш)", timeit.timeit(lambda: start_keyboard(registered=True), number=NUMBER))
+
+
+if __name__ == "__main__":
+    main()
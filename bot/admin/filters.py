@@ -0,0 +1,13 @@
+from aiogram.filters import Filter
+from aiogram.types import CallbackQuery, Message
+
+from bot import config
+
+
+class IsAdmin(Filter):
+    """
+    Пропускает только пользователей из ADMIN_IDS.
+    """
+
+    async def __call__(self, event: Message | CallbackQuery) -> bool:
+        return event.from_user is not None and event.from_user.id in config.admins
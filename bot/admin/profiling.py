@@ -0,0 +1,231 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+# Глубина стека, сохраняемая tracemalloc для каждого выделения памяти
+TRACEMALLOC_FRAMES = 25
+# Максимальная длительность CPU-профиля в секундах
+CPU_PROFILE_MAX_SECONDS = 120
+# Период опроса стека главного потока в секундах
+CPU_SAMPLE_INTERVAL = 0.005
+
+Stack = Tuple[str, ...]
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class MemoryProfiler:
+    """
+    Снимки tracemalloc и их сравнение.
+
+    Трассировка включается только командой start: пока она выключена,
+    накладных расходов нет.
+    """
+
+    def __init__(self) -> None:
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._baseline_at: Optional[datetime] = None
+
+    @property
+    def running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self) -> None:
+        """
+        Включает трассировку выделений памяти.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._baseline, self._baseline_at = None, None
+
+    def stop(self) -> None:
+        """
+        Выключает трассировку и освобождает сохраненный снимок.
+        """
+        tracemalloc.stop()
+        self._baseline, self._baseline_at = None, None
+
+    def snapshot_report(self, limit: int = 30) -> str:
+        """
+        Делает снимок и сравнивает его с предыдущим (если он есть); новый снимок становится базовым.
+
+        :param limit: Количество строк в каждом разделе отчета.
+        :return: Текст отчета.
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        now = datetime.now()
+        lines = [
+            f"Снимок tracemalloc {now:%Y-%m-%d %H:%M:%S}",
+            f"отслеживается: {current / 2 ** 20:.1f} МиБ, пик: {peak / 2 ** 20:.1f} МиБ",
+            "",
+            f"Топ-{limit} мест выделения памяти:",
+        ]
+        lines.extend(str(stat) for stat in snapshot.statistics("lineno")[:limit])
+
+        if self._baseline is not None:
+            lines += ["", f"Топ-{limit} изменений с {self._baseline_at:%H:%M:%S}:"]
+            lines.extend(str(stat) for stat in snapshot.compare_to(self._baseline, "lineno")[:limit])
+            growth = snapshot.compare_to(self._baseline, "traceback")[:3]
+            for stat in growth:
+                lines += ["", f"Стек выделения {stat.size_diff / 1024:+.1f} КиБ ({stat.count_diff:+d} блоков):"]
+                lines.extend(stat.traceback.format(limit=10))
+
+        self._baseline, self._baseline_at = snapshot, now
+        return "\n".join(lines)
+
+
+class CpuSampler:
+    """
+    Сэмплирующий профилировщик: отдельный поток периодически читает стек главного потока
+    (в нем работает event loop). Поток существует только во время профилирования.
+    """
+
+    def __init__(self) -> None:
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    @staticmethod
+    def _sample(thread_id: int, seconds: float, interval: float) -> Counter:
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                stacks[tuple(reversed(stack))] += 1
+            time.sleep(interval)
+        return stacks
+
+    async def profile(self, seconds: float, limit: int = 30) -> str:
+        """
+        Собирает профиль за указанное время.
+
+        :param seconds: Длительность профилирования.
+        :param limit: Количество строк в таблицах отчета.
+        :return: Текст отчета; в конце - свернутые стеки в формате flamegraph.pl.
+        :raises RuntimeError: Если профилирование уже выполняется.
+        """
+        if self._lock.locked():
+            raise RuntimeError("Профилирование уже выполняется")
+        async with self._lock:
+            stacks = await asyncio.to_thread(self._sample, threading.main_thread().ident, seconds,
+                                             CPU_SAMPLE_INTERVAL)
+
+        total = sum(stacks.values())
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                inclusive[label] += count
+
+        lines = [f"CPU-профиль: {seconds:g} с, {total} сэмплов каждые {CPU_SAMPLE_INTERVAL * 1000:g} мс",
+                 "Сэмплы в selector/select означают, что event loop простаивал.", "",
+                 f"Топ-{limit} по собственным сэмплам:"]
+        lines.extend(f"{count / total:6.1%}  {label}" for label, count in own.most_common(limit))
+        lines += ["", f"Топ-{limit} по сэмплам с учетом вложенных вызовов:"]
+        lines.extend(f"{count / total:6.1%}  {label}" for label, count in inclusive.most_common(limit))
+        lines += ["", "Свернутые стеки (формат flamegraph.pl):"]
+        lines.extend(f"{';'.join(stack)} {count}" for stack, count in stacks.most_common())
+        return "\n".join(lines) if total else "CPU-профиль: нет сэмплов"
+
+
+class TaskInspector:
+    """
+    Сводка по asyncio-задачам.
+
+    asyncio не хранит время создания задачи, поэтому на время отслеживания (start) в event loop
+    устанавливается фабрика задач, запоминающая его. Возраст известен только для задач, созданных
+    после start; остальные в рейтинг самых долгих не попадают.
+    """
+
+    def __init__(self) -> None:
+        self._created: "weakref.WeakKeyDictionary[asyncio.Future, float]" = weakref.WeakKeyDictionary()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._previous_factory = None
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def start(self) -> None:
+        """
+        Начинает запоминать время создания задач текущего event loop.
+        """
+        if self._loop is not None:
+            return
+        loop = asyncio.get_running_loop()
+        previous = loop.get_task_factory()
+
+        def factory(loop: asyncio.AbstractEventLoop, coro, **kwargs) -> asyncio.Future:
+            task = previous(loop, coro, **kwargs) if previous is not None else asyncio.Task(coro, loop=loop, **kwargs)
+            self._created[task] = loop.time()
+            return task
+
+        loop.set_task_factory(factory)
+        self._loop, self._previous_factory = loop, previous
+
+    def stop(self) -> None:
+        """
+        Возвращает прежнюю фабрику задач и забывает сохраненное время создания.
+        """
+        if self._loop is not None:
+            self._loop.set_task_factory(self._previous_factory)
+        self._loop, self._previous_factory = None, None
+        self._created = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _describe(task: asyncio.Task) -> str:
+        coro = task.get_coro()
+        return getattr(coro, "__qualname__", None) or type(coro).__name__
+
+    def report(self, limit: int = 20) -> str:
+        """
+        Возвращает количество задач по корутинам и, если отслеживание включено, самые долгие задачи.
+
+        :param limit: Количество долгих задач в отчете.
+        :return: Текст отчета.
+        """
+        tasks = [task for task in asyncio.all_tasks() if not task.done()]
+        by_coro = Counter(self._describe(task) for task in tasks)
+
+        lines = [f"Незавершенные asyncio-задачи: {len(tasks)}", "", "По корутинам:"]
+        lines.extend(f"{count:6d}  {name}" for name, count in by_coro.most_common())
+        if self._loop is None:
+            lines += ["", "Возраст задач не отслеживается: включите его командой /tasks start."]
+            return "\n".join(lines)
+
+        now = self._loop.time()
+        ages = {task: now - self._created[task] for task in tasks if task in self._created}
+        lines += ["", f"Самые долгие незавершенные с момента создания (не больше {limit}; "
+                      f"без {len(tasks) - len(ages)} задач, созданных до /tasks start):"]
+        for task in sorted(ages, key=ages.__getitem__, reverse=True)[:limit]:
+            stack = task.get_stack(limit=1)
+            where = (f"{os.path.basename(stack[0].f_code.co_filename)}:{stack[0].f_lineno}"
+                     if stack else "не запущена")
+            lines.append(f"{ages[task]:9.1f} с  {task.get_name()}  {self._describe(task)}  @ {where}")
+        return "\n".join(lines)
+
+
+memory_profiler = MemoryProfiler()
+cpu_sampler = CpuSampler()
+task_inspector = TaskInspector()
@@ -0,0 +1,191 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from html import escape
+
+from aiogram.dispatcher.router import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import BufferedInputFile, Message
+from loguru import logger
+
+from bot.admin.filters import IsAdmin
+from bot.admin.profiling import CPU_PROFILE_MAX_SECONDS, cpu_sampler, memory_profiler, task_inspector
+from bot.dao.base import statement_cache
+from bot.database import connection
+from bot.quotas.dao import UsageDAO
+from bot.quotas.utils import usage_counter
+from bot.stats.dao import StatsDAO
+from bot.updates.utils import UpdateScheduler
+
+admin_router = Router()
+admin_router.message.filter(IsAdmin())
+
+
+@admin_router.message(Command(commands=['top_usage']))
+@connection()
+async def cmd_top_usage(message: Message, session, command: CommandObject = None, **kwargs) -> None:
+    """
+    Показывает пользователей с наибольшим числом проверок: /top_usage [day|month].
+
+    :param message: Сообщение от администратора.
+    :param session: Сессия базы данных.
+    :param command: Объект команды с необязательным периодом.
+    """
+    try:
+        period = (command.args or "month").strip().lower() if command else "month"
+        today = date.today()
+        since = today if period == "day" else today.replace(day=1)
+
+        # Сначала сохраняем накопленные в памяти счетчики, чтобы отчет был актуальным
+        await usage_counter.flush()
+        top = await UsageDAO.top_consumers(session, since=since, limit=10)
+
+        if not top:
+            await message.answer("За выбранный период проверок не было.")
+            return
+        title = "за сегодня" if period == "day" else "за месяц"
+        lines = [f"📊 Самые активные пользователи {title}:"]
+        for place, (user, checks) in enumerate(top, start=1):
+            name = escape(f"@{user.username}" if user.username else str(user.telegram_id))
+            lines.append(f"{place}. {name} — {checks}")
+        await message.answer("\n".join(lines))
+
+    except Exception as e:
+        logger.error(f"Ошибка при выполнении команды /top_usage для пользователя {message.from_user.id}: {e}")
+        await message.answer("Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте снова позже.")
+
+
+@admin_router.message(Command(commands=['stats']))
+@connection()
+async def cmd_stats(message: Message, session, command: CommandObject = None,
+                    update_scheduler: UpdateScheduler = None, **kwargs) -> None:
+    """
+    Показывает статистику регистраций и проверок по заранее посчитанным почасовым агрегатам.
+
+    :param message: Сообщение от администратора.
+    :param session: Сессия базы данных.
+    :param command: Объект команды (по умолчанию None).
+    :param update_scheduler: Планировщик апдейтов (из данных диспетчера).
+    """
+    try:
+        # Границы окна считаются по часам базы: по ним же агрегаты разложены по часам
+        now = await StatsDAO.current_time(session)
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        hours_from = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=11)
+        totals, today_totals, hours = await StatsDAO.summary(session, today=today, hours_from=hours_from)
+
+        lines = [
+            "📈 Статистика",
+            f"Пользователей: {totals.get('users', 0)} (сегодня +{today_totals.get('users', 0)})",
+            f"Проверок: {totals.get('checks', 0)} (сегодня {today_totals.get('checks', 0)})",
+            "",
+            "Проверок по часам:",
+        ]
+        checks_by_hour = {row.bucket: row.value for row in hours if row.metric == "checks"}
+        for offset in range(12):
+            bucket = hours_from + timedelta(hours=offset)
+            lines.append(f"{bucket:%H}:00 — {checks_by_hour.get(bucket, 0)}")
+
+        cache = statement_cache.stats()
+        lines += ["", f"Кэш запросов DAO: {cache['hit_rate']:.0%} попаданий "
+                      f"({cache['hits']} из {cache['hits'] + cache['misses']}), {cache['size']}/{cache['maxsize']}"]
+        if update_scheduler is not None:
+            lines.append(f"Апдейты: в очереди {update_scheduler.pending} (чатов {update_scheduler.active_chats}), "
+                         f"отклонено {update_scheduler.rejected}")
+        await message.answer("\n".join(lines))
+
+    except Exception as e:
+        logger.error(f"Ошибка при выполнении команды /stats для пользователя {message.from_user.id}: {e}")
+        await message.answer("Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте снова позже.")
+
+
+async def send_report(message: Message, name: str, report: str, caption: str) -> None:
+    """
+    Отправляет отчет текстовым файлом.
+
+    :param message: Сообщение администратора.
+    :param name: Префикс имени файла.
+    :param report: Текст отчета.
+    :param caption: Подпись к файлу.
+    """
+    filename = f"{name}-{datetime.now():%Y%m%d-%H%M%S}.txt"
+    await message.answer_document(BufferedInputFile(report.encode(), filename=filename), caption=caption)
+
+
+@admin_router.message(Command(commands=['mem']))
+async def cmd_mem(message: Message, command: CommandObject = None, **kwargs) -> None:
+    """
+    Снимки памяти tracemalloc: /mem start | snapshot | stop.
+    Каждый snapshot сравнивается с предыдущим.
+
+    :param message: Сообщение от администратора.
+    :param command: Объект команды с действием.
+    """
+    try:
+        action = (command.args or "snapshot").strip().lower() if command else "snapshot"
+        if action == "start":
+            memory_profiler.start()
+            await message.answer("tracemalloc включен. Сделайте /mem snapshot сейчас и позже, чтобы увидеть рост.")
+        elif action == "stop":
+            memory_profiler.stop()
+            await message.answer("tracemalloc выключен.")
+        elif not memory_profiler.running:
+            await message.answer("tracemalloc выключен. Включите его командой /mem start.")
+        else:
+            report = await asyncio.to_thread(memory_profiler.snapshot_report)
+            await send_report(message, "memory", report, caption="Снимок памяти")
+
+    except Exception as e:
+        logger.error(f"Ошибка при выполнении команды /mem для пользователя {message.from_user.id}: {e}")
+        await message.answer("Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте снова позже.")
+
+
+@admin_router.message(Command(commands=['cpu']))
+async def cmd_cpu(message: Message, command: CommandObject = None, **kwargs) -> None:
+    """
+    Сэмплирующий CPU-профиль главного потока: /cpu [секунды].
+
+    :param message: Сообщение от администратора.
+    :param command: Объект команды с длительностью (по умолчанию 10 секунд).
+    """
+    try:
+        args = (command.args or "").strip() if command else ""
+        if args and not args.isdigit():
+            await message.answer(f"Использование: /cpu [секунды], не больше {CPU_PROFILE_MAX_SECONDS}.")
+            return
+        seconds = min(max(int(args or 10), 1), CPU_PROFILE_MAX_SECONDS)
+        if cpu_sampler.running:
+            await message.answer("Профилирование уже выполняется.")
+            return
+
+        await message.answer(f"Профилирую {seconds} с...")
+        report = await cpu_sampler.profile(seconds)
+        await send_report(message, "cpu", report, caption=f"CPU-профиль за {seconds} с")
+
+    except Exception as e:
+        logger.error(f"Ошибка при выполнении команды /cpu для пользователя {message.from_user.id}: {e}")
+        await message.answer("Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте снова позже.")
+
+
+@admin_router.message(Command(commands=['tasks']))
+async def cmd_tasks(message: Message, command: CommandObject = None, **kwargs) -> None:
+    """
+    Количество asyncio-задач по корутинам и самые долгие ожидающие задачи: /tasks [start | stop].
+    Возраст задач отслеживается между /tasks start и /tasks stop.
+
+    :param message: Сообщение от администратора.
+    :param command: Объект команды с действием.
+    """
+    try:
+        action = (command.args or "report").strip().lower() if command else "report"
+        if action == "start":
+            task_inspector.start()
+            await message.answer("Отслеживание возраста задач включено. Отчет - /tasks, выключение - /tasks stop.")
+        elif action == "stop":
+            task_inspector.stop()
+            await message.answer("Отслеживание возраста задач выключено.")
+        else:
+            await send_report(message, "tasks", task_inspector.report(), caption="asyncio-задачи")
+
+    except Exception as e:
+        logger.error(f"Ошибка при выполнении команды /tasks для пользователя {message.from_user.id}: {e}")
+        await message.answer("Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте снова позже.")
@@ -0,0 +1,42 @@
+from aiohttp import web
+from loguru import logger
+
+from bot.api.router import LIMITER_KEY, routes
+from bot.api.utils import TokenLimiter
+from bot import config
+
+
+def create_app() -> web.Application:
+    """
+    Создает aiohttp-приложение HTTP API.
+
+    :return: Экземпляр web.Application.
+    """
+    app = web.Application(client_max_size=64 * 1024)
+    app[LIMITER_KEY] = TokenLimiter(concurrency=config.settings.API_TOKEN_CONCURRENCY,
+                                    rate_per_minute=config.settings.API_TOKEN_RATE)
+    app.add_routes(routes)
+    return app
+
+
+async def start_api() -> web.AppRunner:
+    """
+    Запускает HTTP API в текущем event loop рядом с ботом.
+
+    :return: Runner, который нужно передать в stop_api при остановке.
+    """
+    runner = web.AppRunner(create_app(), access_log=None, shutdown_timeout=config.settings.SHUTDOWN_TIMEOUT)
+    await runner.setup()
+    await web.TCPSite(runner, config.settings.API_HOST, config.settings.API_PORT).start()
+    logger.info(f"HTTP API запущен на {config.settings.API_HOST}:{config.settings.API_PORT}")
+    return runner
+
+
+async def stop_api(runner: web.AppRunner) -> None:
+    """
+    Прекращает прием запросов и дожидается выполняющихся (не дольше SHUTDOWN_TIMEOUT).
+
+    :param runner: Runner, полученный из start_api.
+    """
+    await runner.cleanup()
+    logger.info("HTTP API остановлен.")
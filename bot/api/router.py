@@ -0,0 +1,95 @@
+import asyncio
+from typing import Optional
+
+from aiohttp import web
+from loguru import logger
+from pydantic import ValidationError
+
+from bot import json_codec
+from bot.api.schemas import CheckRequest, CheckResult
+from bot.api.utils import TokenLimiter, extract_token, token_cache
+from bot.checks.utils import get_or_create_check, is_valid_imei
+from bot import config
+from bot.database import connection
+from bot.quotas.utils import QuotaExceeded
+
+routes = web.RouteTableDef()
+
+LIMITER_KEY = web.AppKey("limiter", TokenLimiter)
+
+
+def json_error(status: int, message: str, headers: Optional[dict] = None) -> web.Response:
+    """
+    Формирует JSON-ответ с ошибкой.
+
+    :param status: HTTP-статус.
+    :param message: Описание ошибки.
+    :param headers: Дополнительные заголовки.
+    :return: HTTP-ответ.
+    """
+    return web.json_response({"error": message}, status=status, headers=headers, dumps=json_codec.dumps)
+
+
+@connection()
+async def _check_one(user_id: int, imei: str, service_id: int, session) -> CheckResult:
+    check = await get_or_create_check(session, user_id=user_id, imei=imei, service_id=service_id)
+    return CheckResult(imei=imei, status=check.status, result=check.result)
+
+
+async def _check_limited(semaphore: asyncio.Semaphore, user_id: int, imei: str, service_id: int) -> CheckResult:
+    async with semaphore:
+        try:
+            return await _check_one(user_id, imei, service_id)
+        except QuotaExceeded as e:
+            return CheckResult(imei=imei, error=f"{e.period} quota exceeded")
+        except Exception as e:
+            logger.error(f"Ошибка при проверке IMEI {imei} через API для пользователя {user_id}: {e}")
+            return CheckResult(imei=imei, error="check failed")
+
+
+@routes.post('/api/check-imei')
+async def check_imei(request: web.Request) -> web.Response:
+    """
+    Проверяет один IMEI (поле imei) или пакет (поле imeis).
+
+    Токен передается в заголовке Authorization: Bearer <token> или в поле token.
+
+    :param request: HTTP-запрос.
+    :return: JSON со списком результатов в порядке запроса.
+    """
+    try:
+        payload = CheckRequest.model_validate(json_codec.loads(await request.read()))
+    except (ValueError, ValidationError):
+        return json_error(400, "invalid request body")
+
+    token = extract_token(request) or payload.token
+    if not token:
+        return json_error(401, "token required")
+    user_id = await token_cache.resolve(token)
+    if user_id is None:
+        return json_error(401, "invalid token")
+
+    imeis = payload.imeis if payload.imeis is not None else [payload.imei] if payload.imei else []
+    if not imeis:
+        return json_error(400, "imei or imeis required")
+    if len(imeis) > config.settings.API_MAX_BATCH:
+        return json_error(400, f"too many imeis, max {config.settings.API_MAX_BATCH}")
+    invalid = [imei for imei in imeis if not is_valid_imei(imei)]
+    if invalid:
+        return json_error(400, f"invalid imei: {', '.join(map(str, invalid))}")
+    # service_id приходит от клиента, а платные услуги выбирает только администратор
+    if payload.service_id not in config.settings.API_SERVICE_IDS:
+        return json_error(403, f"service {payload.service_id} is not allowed")
+
+    # Повторы в пакете проверяются и списываются из лимитов один раз
+    unique = list(dict.fromkeys(imeis))
+    limiter = request.app[LIMITER_KEY]
+    retry_after = limiter.try_consume(token, len(unique))
+    if retry_after:
+        return json_error(429, "rate limit exceeded", headers={"Retry-After": str(int(retry_after) + 1)})
+
+    semaphore = limiter.semaphore(token)
+    checked = await asyncio.gather(*(_check_limited(semaphore, user_id, imei, payload.service_id) for imei in unique))
+    results = dict(zip(unique, checked))
+    return web.json_response({"results": [results[imei].model_dump(exclude_none=True) for imei in imeis]},
+                             dumps=json_codec.dumps)
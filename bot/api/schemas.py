@@ -0,0 +1,35 @@
+from pydantic import BaseModel
+
+from bot.checks.client import DEFAULT_SERVICE_ID
+
+
+class CheckRequest(BaseModel):
+    """
+    Тело запроса на проверку IMEI через HTTP API.
+
+    Attributes:
+        token (Optional[str]): Токен пользователя (если не передан в заголовке Authorization).
+        imei (Optional[str]): IMEI для одиночной проверки.
+        imeis (Optional[List[str]]): Список IMEI для пакетной проверки.
+        service_id (int): Идентификатор услуги imeicheck.net (одна из API_SERVICE_IDS).
+    """
+    token: str | None = None
+    imei: str | None = None
+    imeis: list[str] | None = None
+    service_id: int = DEFAULT_SERVICE_ID
+
+
+class CheckResult(BaseModel):
+    """
+    Результат проверки одного IMEI в ответе HTTP API.
+
+    Attributes:
+        imei (str): IMEI устройства.
+        status (Optional[str]): Статус проверки.
+        result (Optional[dict]): Ответ сервиса imeicheck.net.
+        error (Optional[str]): Описание ошибки, если проверка не удалась.
+    """
+    imei: str
+    status: str | None = None
+    result: dict | None = None
+    error: str | None = None
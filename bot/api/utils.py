@@ -0,0 +1,153 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from aiohttp import web
+
+from bot.cache import TTLCache
+from bot.database import connection
+from bot.invalidation import Keys, cache_invalidator
+from bot.users.dao import UserDAO
+from bot.users.schemas import TokenIDModel
+
+
+def extract_token(request: web.Request) -> Optional[str]:
+    """
+    Извлекает токен из заголовка Authorization: Bearer <token>.
+
+    :param request: HTTP-запрос.
+    :return: Токен или None.
+    """
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    return token.strip() or None
+
+
+class TokenCache:
+    """
+    Кэш соответствия токена и идентификатора пользователя (users.id).
+
+    Неизвестные токены тоже кэшируются, но на короткое время, чтобы перебор
+    токенов не превращался в поток запросов к базе данных.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300, negative_ttl: float = 30) -> None:
+        self.negative_ttl = negative_ttl
+        self._cache: TTLCache[str, int | None] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def resolve(self, token: str) -> Optional[int]:
+        """
+        Возвращает users.id владельца токена.
+
+        :param token: Токен пользователя.
+        :return: Идентификатор пользователя или None, если токен неизвестен.
+        """
+        if token in self._cache:
+            return self._cache.get(token)
+        user_id = await self._lookup(token)
+        self._cache.set(token, user_id, ttl=None if user_id is not None else self.negative_ttl)
+        return user_id
+
+    def invalidate(self, token: str | None = None) -> None:
+        """
+        Удаляет токен из кэша (или очищает кэш целиком).
+
+        :param token: Токен; None - очистить весь кэш.
+        """
+        if token is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(token)
+
+    def on_users_changed(self, op: str, keys: Keys) -> None:
+        """
+        Сбрасывает записи кэша после изменения таблицы users (в том числе другим экземпляром бота).
+
+        Новый пользователь может быть закэширован только как неизвестный токен, поэтому при вставке
+        удаляются лишь его токены. Изменение существующих строк без указания токена может
+        отозвать любой токен, поэтому в этом случае кэш очищается целиком.
+
+        :param op: Операция: insert, update или delete.
+        :param keys: Ключевые столбцы измененных строк или None.
+        """
+        if keys is not None and (op == "insert" or set(keys) == {"token_id"}):
+            for token in keys.get("token_id", ()):
+                self._cache.pop(token)
+        else:
+            self._cache.clear()
+
+    @staticmethod
+    @connection()
+    async def _lookup(token: str, session) -> Optional[int]:
+        filters = TokenIDModel(token_id=token)
+        user_info = await UserDAO.find_one_or_none(session=session, filters=filters)
+        if user_info is None:
+            # Только что выданный токен может еще не дойти до реплики
+            user_info = await UserDAO.find_one_or_none(session=session, filters=filters, consistent=True)
+        return user_info.id if user_info else None
+
+
+@dataclass
+class _TokenState:
+    semaphore: asyncio.Semaphore
+    tokens: float
+    updated_at: float = field(default_factory=time.monotonic)
+
+
+class TokenLimiter:
+    """
+    Ограничения на один токен: число одновременных проверок и скорость (token bucket).
+
+    Attributes:
+        concurrency (int): Максимум одновременных проверок на токен.
+        rate_per_minute (int): Максимум проверок на токен в минуту.
+    """
+
+    def __init__(self, concurrency: int, rate_per_minute: int) -> None:
+        self.concurrency = concurrency
+        self.rate_per_minute = rate_per_minute
+        # Неактивные токены вытесняются, чтобы состояние не росло без ограничений
+        self._states: TTLCache[str, _TokenState] = TTLCache(maxsize=10_000, ttl=600)
+
+    def _state(self, token: str) -> _TokenState:
+        state = self._states.get(token)
+        if state is None:
+            state = _TokenState(semaphore=asyncio.Semaphore(self.concurrency), tokens=self.rate_per_minute)
+        # Продлеваем жизнь записи при каждом обращении
+        self._states.set(token, state)
+        return state
+
+    def try_consume(self, token: str, amount: int = 1) -> float:
+        """
+        Списывает amount проверок из лимита токена.
+
+        :param token: Токен пользователя.
+        :param amount: Количество проверок.
+        :return: 0, если лимит позволяет; иначе - через сколько секунд повторить запрос.
+        """
+        state = self._state(token)
+        now = time.monotonic()
+        refill_rate = self.rate_per_minute / 60
+        state.tokens = min(self.rate_per_minute, state.tokens + (now - state.updated_at) * refill_rate)
+        state.updated_at = now
+        if amount > self.rate_per_minute:
+            return 60.0
+        if state.tokens < amount:
+            return (amount - state.tokens) / refill_rate
+        state.tokens -= amount
+        return 0
+
+    def semaphore(self, token: str) -> asyncio.Semaphore:
+        """
+        Возвращает семафор, ограничивающий одновременные проверки токена.
+
+        :param token: Токен пользователя.
+        :return: Семафор токена.
+        """
+        return self._state(token).semaphore
+
+
+token_cache = TokenCache()
+cache_invalidator.subscribe("users", token_cache.on_users_changed)
@@ -0,0 +1,74 @@
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Ограниченный по размеру in-memory кэш с временем жизни записей (LRU + TTL).
+
+    Attributes:
+        maxsize (int): Максимальное количество записей.
+        ttl (float): Время жизни записи в секундах.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """
+        Возвращает значение по ключу, если оно есть и не устарело.
+
+        :param key: Ключ.
+        :param default: Значение по умолчанию.
+        :return: Значение из кэша или default.
+        """
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """
+        Сохраняет значение, вытесняя самые давние записи при переполнении.
+
+        :param key: Ключ.
+        :param value: Значение.
+        :param ttl: Время жизни в секундах (по умолчанию - ttl кэша).
+        """
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        """
+        Удаляет запись по ключу, если она есть.
+
+        :param key: Ключ.
+        """
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Очищает кэш.
+        """
+        self._data.clear()
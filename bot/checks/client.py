@@ -0,0 +1,108 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Optional
+
+import aiohttp
+
+from bot import json_codec
+from bot.checks.schemas import CheckResponse
+from bot import config
+from bot.runtime import connector_options, warm_up
+
+# Услуга imeicheck.net, используемая по умолчанию
+DEFAULT_SERVICE_ID = 12
+
+
+async def _on_request_headers_sent(session: aiohttp.ClientSession, trace_ctx: SimpleNamespace,
+                                   params: aiohttp.TraceRequestHeadersSentParams) -> None:
+    sent = trace_ctx.trace_request_ctx
+    if isinstance(sent, asyncio.Event):
+        sent.set()
+
+
+class ImeiCheckClient:
+    """
+    Клиент API imeicheck.net с общей HTTP-сессией.
+
+    Одновременных запросов к сервису не больше IMEICHECK_CONCURRENCY - лимит общий
+    для бота и HTTP API, так как оба используют один экземпляр клиента.
+
+    Attributes:
+        base_url (str): Базовый URL API.
+    """
+
+    def __init__(self, base_url: str = "https://api.imeicheck.net/v1") -> None:
+        self.base_url = base_url
+        self._session: aiohttp.ClientSession | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Сессия создается при первом запросе, чтобы импорт модуля не требовал event loop
+        if self._session is None or self._session.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_request_headers_sent.append(_on_request_headers_sent)
+            self._session = aiohttp.ClientSession(
+                headers={
+                    'Authorization': f'Bearer {config.settings.IMEICHECK_TOKEN.get_secret_value()}',
+                    'Accept-Language': 'en',
+                    'Content-Type': 'application/json',
+                },
+                json_serialize=json_codec.dumps,
+                connector=connector_options().connector(),
+                trace_configs=[trace_config],
+            )
+        return self._session
+
+    async def _request(self, method: str, path: str, payload: dict | None = None,
+                       sent: Optional[asyncio.Event] = None) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(config.settings.IMEICHECK_CONCURRENCY)
+        session = self._get_session()
+        async with self._semaphore:
+            async with session.request(method, f"{self.base_url}{path}", json=payload,
+                                       trace_request_ctx=sent) as response:
+                response.raise_for_status()  # Проверка на ошибки
+                # Разбираем байты напрямую, без промежуточной строки
+                return json_codec.loads(await response.read())
+
+    async def fetch_services(self) -> list[dict]:
+        """
+        Получает список доступных услуг.
+
+        :return: Список услуг в виде словарей.
+        """
+        return await self._request("GET", "/services")
+
+    async def create_check(self, imei: str, service_id: int = DEFAULT_SERVICE_ID,
+                           sent: Optional[asyncio.Event] = None) -> CheckResponse:
+        """
+        Создает проверку IMEI.
+
+        :param imei: IMEI устройства для проверки.
+        :param service_id: Идентификатор услуги imeicheck.net.
+        :param sent: Событие, которое устанавливается, когда запрос отправлен в сервис. Если оно
+            не установлено, проверка точно не была оплачена (например, ожидала места в очереди).
+        :return: Типизированный ответ сервиса.
+        """
+        data = await self._request("POST", "/checks", {"deviceId": f"{imei}", "serviceId": service_id}, sent=sent)
+        return CheckResponse.model_validate(data)
+
+    async def warm_up(self, connections: int) -> int:
+        """
+        Заранее открывает соединения с API, чтобы первые проверки не ждали установки TLS.
+
+        :param connections: Сколько соединений открыть.
+        :return: Сколько соединений удалось открыть.
+        """
+        return await warm_up(self._get_session(), self.base_url, connections)
+
+    async def close(self) -> None:
+        """
+        Закрывает HTTP-сессию, если она была создана.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+imeicheck_client = ImeiCheckClient()
@@ -0,0 +1,123 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from bot.checks.models import ImeiCheck
+from bot.dao.base import BaseDAO
+
+
+class ImeiCheckDAO(BaseDAO[ImeiCheck]):
+    model = ImeiCheck
+
+    @classmethod
+    async def find_latest(cls, session: AsyncSession, imei: str, service_id: int,
+                          newer_than: datetime) -> Optional[ImeiCheck]:
+        """
+        Находит последний результат проверки IMEI, созданный не раньше newer_than.
+
+        :param session: Сессия базы данных.
+        :param imei: IMEI устройства.
+        :param service_id: Идентификатор услуги imeicheck.net.
+        :param newer_than: Минимальное время создания записи.
+        :return: Запись проверки или None.
+        """
+        logger.info(f"Поиск сохраненной проверки IMEI {imei} (услуга {service_id})")
+        try:
+            query = (
+                select(cls.model)
+                .filter_by(imei=imei, service_id=service_id)
+                .where(cls.model.created_at >= newer_than)
+                .order_by(cls.model.created_at.desc())
+                .limit(1)
+            )
+            result = await cls._execute_read(session, query)
+            return result.scalar_one_or_none()
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при поиске сохраненной проверки IMEI {imei}: {e}")
+            raise
+
+    @classmethod
+    async def find_latest_many(cls, session: AsyncSession, imei: str, service_ids: Sequence[int],
+                               newer_than: datetime) -> Dict[int, ImeiCheck]:
+        """
+        Находит последние результаты проверки IMEI сразу по нескольким услугам одним запросом.
+
+        :param session: Сессия базы данных.
+        :param imei: IMEI устройства.
+        :param service_ids: Идентификаторы услуг imeicheck.net.
+        :param newer_than: Минимальное время создания записи.
+        :return: Словарь {service_id: запись} только для найденных услуг.
+        """
+        logger.info(f"Поиск сохраненных проверок IMEI {imei} по услугам {list(service_ids)}")
+        try:
+            query = (
+                select(cls.model)
+                .filter_by(imei=imei)
+                .where(cls.model.service_id.in_(service_ids), cls.model.created_at >= newer_than)
+                .order_by(cls.model.created_at.desc())
+            )
+            result = await cls._execute_read(session, query)
+            latest: Dict[int, ImeiCheck] = {}
+            for record in result.scalars():
+                latest.setdefault(record.service_id, record)
+            return latest
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при поиске сохраненных проверок IMEI {imei}: {e}")
+            raise
+
+    @classmethod
+    async def find_by_tac(cls, session: AsyncSession, tac: str, limit: int = 5) -> List[ImeiCheck]:
+        """
+        Находит проверки устройств с указанным TAC (первые 8 цифр IMEI определяют модель).
+
+        Префикс ищется диапазоном [tac, tac + 1), чтобы использовать индекс по imei.
+
+        :param session: Сессия базы данных.
+        :param tac: Type Allocation Code - 8 цифр.
+        :param limit: Максимальное количество записей.
+        :return: Список проверок.
+        """
+        logger.info(f"Поиск проверок по TAC {tac}")
+        try:
+            upper = str(int(tac) + 1).zfill(len(tac))
+            query = (
+                select(cls.model)
+                .where(cls.model.imei >= tac, cls.model.imei < upper)
+                .limit(limit)
+            )
+            result = await cls._execute_read(session, query)
+            return list(result.scalars().all())
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при поиске проверок по TAC {tac}: {e}")
+            raise
+
+    @classmethod
+    async def find_page_by_user(cls, session: AsyncSession, user_id: int, before_id: Optional[int] = None,
+                                limit: int = 5) -> Tuple[List[ImeiCheck], Optional[int]]:
+        """
+        Возвращает страницу истории проверок пользователя (keyset-пагинация по id).
+
+        :param session: Сессия базы данных.
+        :param user_id: Идентификатор пользователя (users.id).
+        :param before_id: Вернуть записи с id меньше указанного; None - с самой новой.
+        :param limit: Размер страницы.
+        :return: Записи страницы и курсор для следующей страницы (None, если страница последняя).
+        """
+        logger.info(f"История проверок пользователя {user_id}, курсор: {before_id}, размер страницы: {limit}")
+        try:
+            query = select(cls.model).filter_by(user_id=user_id)
+            if before_id is not None:
+                query = query.where(cls.model.id < before_id)
+            # Запрашиваем на одну запись больше, чтобы узнать, есть ли следующая страница
+            query = query.order_by(cls.model.id.desc()).limit(limit + 1)
+            result = await cls._execute_read(session, query)
+            records = list(result.scalars().all())
+            next_cursor = records[limit - 1].id if len(records) > limit else None
+            return records[:limit], next_cursor
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при получении истории проверок пользователя {user_id}: {e}")
+            raise
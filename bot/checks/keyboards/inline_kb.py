@@ -0,0 +1,28 @@
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+
+class HistoryCallback(CallbackData, prefix="history"):
+    """
+    Данные кнопки перехода к следующей странице истории.
+
+    Attributes:
+        before_id (int): Курсор - id последней показанной записи.
+    """
+    before_id: int
+
+
+def history_keyboard(next_cursor: int | None) -> InlineKeyboardMarkup | None:
+    """
+    Создает клавиатуру пагинации истории проверок.
+
+    :param next_cursor: Курсор следующей страницы или None, если страница последняя.
+    :return: Объект InlineKeyboardMarkup или None.
+    """
+    if next_cursor is None:
+        return None
+    kb = InlineKeyboardBuilder()
+    kb.button(text="Далее ▶", callback_data=HistoryCallback(before_id=next_cursor))
+    kb.adjust(1)
+    return kb.as_markup()
@@ -0,0 +1,38 @@
+from typing import Optional
+
+from sqlalchemy import ForeignKey, Index, JSON, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from bot.database import Base, partitioned_by_month
+
+
+class ImeiCheck(Base):
+    """
+    Модель результата проверки IMEI.
+
+    Attributes:
+        user_id (int): Идентификатор пользователя (users.id), запросившего проверку.
+        imei (str): Проверенный IMEI.
+        service_id (int): Идентификатор услуги imeicheck.net.
+        status (Optional[str]): Статус проверки, который вернул сервис.
+        result (dict): Полный ответ сервиса.
+    """
+
+    __tablename__ = 'imei_checks'
+    __table_args__ = (
+        # Keyset-пагинация истории пользователя: WHERE user_id = ? AND id < ? ORDER BY id DESC
+        Index('ix_imei_checks_user_id_id', 'user_id', 'id'),
+        # Поиск свежего результата по IMEI для повторных запросов
+        Index('ix_imei_checks_imei_service_id_created_at', 'imei', 'service_id', 'created_at'),
+        # Инкрементальный пересчет статистики проверок по диапазону created_at
+        Index('ix_imei_checks_created_at', 'created_at'),
+        # Помесячные партиции: запросы с границами по created_at читают только нужные месяцы
+        partitioned_by_month('created_at'),
+    )
+
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    imei: Mapped[str] = mapped_column(String(15), nullable=False)
+    service_id: Mapped[int] = mapped_column(nullable=False)
+    status: Mapped[Optional[str]]
+    result: Mapped[dict] = mapped_column(JSON().with_variant(JSONB(), 'postgresql'), nullable=False)
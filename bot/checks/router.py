@@ -0,0 +1,165 @@
+import asyncio
+from html import escape
+
+from aiogram.dispatcher.router import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import (CallbackQuery, InlineQuery, InlineQueryResultArticle, InlineQueryResultsButton,
+                           InputTextMessageContent, Message)
+from loguru import logger
+
+from bot.checks.dao import ImeiCheckDAO
+from bot.checks.keyboards.inline_kb import HistoryCallback, history_keyboard
+from bot.checks.utils import (TAC_LENGTH, device_name, format_history, inline_debouncer, is_valid_imei,
+                              pending_checks, render_check, result_cache)
+from bot import config
+from bot.database import connection
+from bot.quotas.utils import QuotaExceeded
+from bot.updates.utils import released_slot
+from bot.users.dao import UserDAO
+from bot.users.keyboards.markup_kb import start_keyboard
+from bot.users.schemas import TelegramIDModel
+
+checks_router = Router()
+
+
+@checks_router.message(Command(commands=['history']))
+@connection()
+async def cmd_history(message: Message, session, command: CommandObject = None, **kwargs) -> None:
+    """
+    Показывает первую страницу истории проверок пользователя.
+
+    :param message: Сообщение от пользователя.
+    :param session: Сессия базы данных.
+    :param command: Объект команды (по умолчанию None).
+    """
+    try:
+        user_info = await UserDAO.find_one_or_none(session=session,
+                                                   filters=TelegramIDModel(telegram_id=message.from_user.id),
+                                                   consistent=True)
+        if not user_info:
+            await message.answer("Необходимо пройти регистрацию!", reply_markup=start_keyboard(registered=False))
+            return
+
+        records, next_cursor = await ImeiCheckDAO.find_page_by_user(session, user_id=user_info.id,
+                                                                    limit=config.settings.HISTORY_PAGE_SIZE)
+        await message.answer(format_history(records), reply_markup=history_keyboard(next_cursor))
+
+    except Exception as e:
+        logger.error(f"Ошибка при выполнении команды /history для пользователя {message.from_user.id}: {e}")
+        await message.answer("Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте снова позже.")
+
+
+@checks_router.callback_query(HistoryCallback.filter())
+@connection()
+async def history_next_page(call: CallbackQuery, callback_data: HistoryCallback, session, **kwargs) -> None:
+    """
+    Показывает следующую страницу истории проверок.
+
+    :param call: Нажатие инлайн-кнопки.
+    :param callback_data: Данные кнопки с курсором.
+    :param session: Сессия базы данных.
+    """
+    try:
+        user_info = await UserDAO.find_one_or_none(session=session,
+                                                   filters=TelegramIDModel(telegram_id=call.from_user.id),
+                                                   consistent=True)
+        if not user_info:
+            await call.answer("Необходимо пройти регистрацию!", show_alert=True)
+            return
+
+        records, next_cursor = await ImeiCheckDAO.find_page_by_user(session, user_id=user_info.id,
+                                                                    before_id=callback_data.before_id,
+                                                                    limit=config.settings.HISTORY_PAGE_SIZE)
+        await call.message.edit_text(format_history(records), reply_markup=history_keyboard(next_cursor))
+        await call.answer()
+
+    except Exception as e:
+        logger.error(f"Ошибка при листании истории для пользователя {call.from_user.id}: {e}")
+        await call.answer("Произошла ошибка. Пожалуйста, попробуйте снова позже.", show_alert=True)
+
+
+def _inline_hint(text: str, start_parameter: str = "inline") -> InlineQueryResultsButton:
+    return InlineQueryResultsButton(text=text, start_parameter=start_parameter)
+
+
+@checks_router.inline_query()
+@connection()
+async def inline_imei(query: InlineQuery, session, **kwargs) -> None:
+    """
+    Проверка IMEI в inline-режиме: @bot <imei> в любом чате.
+
+    Сохраненный результат и модель устройства по TAC отдаются сразу. Новая проверка
+    через API запускается только после паузы в вводе (INLINE_DEBOUNCE) и ждется не дольше
+    INLINE_DEADLINE от получения запроса; если она не успела, проверка продолжается в фоне.
+
+    :param query: Inline-запрос.
+    :param session: Сессия базы данных.
+    """
+    loop = asyncio.get_running_loop()
+    received = loop.time()
+    try:
+        text = query.query.replace(" ", "")
+        user_info = await UserDAO.find_one_or_none(session=session,
+                                                   filters=TelegramIDModel(telegram_id=query.from_user.id),
+                                                   consistent=True)
+        if not user_info or not user_info.token_id:
+            await query.answer([], cache_time=0, is_personal=True,
+                               button=_inline_hint("Необходимо пройти регистрацию"))
+            return
+        if not text.isdigit() or not TAC_LENGTH <= len(text) <= 15:
+            await query.answer([], cache_time=0, is_personal=True, button=_inline_hint("Введите IMEI: 15 цифр"))
+            return
+
+        result = await result_cache.lookup(session, text) if is_valid_imei(text) else None
+        device = device_name(result) if result else await result_cache.tac_device(session, text)
+        # Не держим соединение с базой, пока ждем паузу в вводе и ответ API
+        await session.close()
+
+        pending = False
+        if result is None and is_valid_imei(text):
+            # Пауза в вводе и ожидание проверки не должны занимать места обработчиков других чатов
+            async with released_slot():
+                settled = await inline_debouncer.settle(query.from_user.id, query.id,
+                                                        config.settings.INLINE_DEBOUNCE)
+                if settled:
+                    task = pending_checks.start(user_info.id, text)
+                    try:
+                        remaining = config.settings.INLINE_DEADLINE - (loop.time() - received)
+                        result = await asyncio.wait_for(asyncio.shield(task), timeout=max(remaining, 0))
+                        device = device_name(result) or device
+                    except asyncio.TimeoutError:
+                        pending = True
+            if not settled:
+                return  # Пользователь продолжает печатать - ответим на следующий запрос
+
+        if result is not None:
+            article = InlineQueryResultArticle(
+                id=f"check-{text}",
+                title=device or "Результат проверки",
+                description=f"IMEI {text} · {result.get('status', 'неизвестно')}",
+                input_message_content=InputTextMessageContent(message_text=render_check(result)[0]),
+            )
+        elif device:
+            tac = text[:TAC_LENGTH]
+            description = "Проверка выполняется, повторите запрос через несколько секунд" if pending else "Модель по TAC"
+            article = InlineQueryResultArticle(
+                id=f"tac-{tac}",
+                title=device,
+                description=description,
+                input_message_content=InputTextMessageContent(
+                    message_text=f"📱 <b>{escape(device)}</b>\nTAC: <code>{tac}</code>"),
+            )
+        else:
+            hint = "Проверка выполняется, повторите запрос" if pending else "Нет данных по этому IMEI"
+            await query.answer([], cache_time=0, is_personal=True, button=_inline_hint(hint))
+            return
+
+        await query.answer([article], cache_time=0 if pending or result is None else 300, is_personal=True)
+
+    except QuotaExceeded as e:
+        period = "дневной" if e.period == "day" else "месячный"
+        await query.answer([], cache_time=0, is_personal=True,
+                           button=_inline_hint(f"Исчерпан {period} лимит проверок ({e.limit})"))
+
+    except Exception as e:
+        logger.error(f"Ошибка при обработке inline-запроса пользователя {query.from_user.id}: {e}")
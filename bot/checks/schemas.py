@@ -0,0 +1,90 @@
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class ImeiCheckModel(BaseModel):
+    """
+    Модель для сохранения результата проверки IMEI.
+
+    Attributes:
+        user_id (int): Идентификатор пользователя (users.id).
+        imei (str): Проверенный IMEI.
+        service_id (int): Идентификатор услуги imeicheck.net.
+        status (Optional[str]): Статус проверки.
+        result (dict): Полный ответ сервиса.
+    """
+    user_id: int
+    imei: str
+    service_id: int
+    status: str | None = None
+    result: dict
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CheckServiceInfo(BaseModel):
+    """
+    Услуга imeicheck.net, которой выполнена проверка.
+
+    Attributes:
+        id (int): Идентификатор услуги.
+        title (Optional[str]): Название услуги.
+    """
+    id: int
+    title: str | None = None
+
+    model_config = ConfigDict(extra="allow")
+
+
+class CheckResponse(BaseModel):
+    """
+    Ответ imeicheck.net на создание проверки (POST /v1/checks).
+
+    Attributes:
+        id (Optional[str]): Идентификатор проверки.
+        type (Optional[str]): Тип проверки.
+        status (Optional[str]): Статус проверки (successful, unsuccessful, failed и т.п.).
+        order_id (Optional[str | int]): Идентификатор заказа.
+        service (Optional[CheckServiceInfo]): Услуга, которой выполнена проверка.
+        amount (Optional[str | float]): Стоимость проверки.
+        device_id (Optional[str]): Проверенный IMEI или серийный номер.
+        processed_at (Optional[int | float]): Время обработки (unix time).
+        properties (dict): Свойства устройства, набор полей зависит от услуги.
+    """
+    id: str | None = None
+    type: str | None = None
+    status: str | None = None
+    order_id: str | int | None = Field(default=None, alias="orderId")
+    service: CheckServiceInfo | None = None
+    amount: str | float | None = None
+    device_id: str | None = Field(default=None, alias="deviceId")
+    processed_at: int | float | None = Field(default=None, alias="processedAt")
+    properties: dict[str, Any] = Field(default_factory=dict)
+
+    model_config = ConfigDict(extra="allow", populate_by_name=True)
+
+
+class CheckReport(BaseModel):
+    """
+    Сводный отчет по IMEI, собранный из ответов нескольких услуг.
+
+    Attributes:
+        imei (str): IMEI устройства.
+        responses (Dict[int, CheckResponse]): Ответы услуг, успевших выполнить проверку, в порядке запроса.
+        missing (List[int]): Услуги, не ответившие до истечения срока или завершившиеся ошибкой.
+    """
+    imei: str
+    responses: dict[int, CheckResponse] = Field(default_factory=dict)
+    missing: list[int] = Field(default_factory=list)
+
+    @property
+    def properties(self) -> dict[str, Any]:
+        """
+        Свойства устройства из всех ответов; при совпадении ключей приоритет у услуги, запрошенной раньше.
+        """
+        merged: dict[str, Any] = {}
+        for response in self.responses.values():
+            for key, value in response.properties.items():
+                merged.setdefault(key, value)
+        return merged
@@ -0,0 +1,463 @@
+import asyncio
+from datetime import datetime, timedelta
+from html import escape
+from string import Template
+from typing import Any, Dict, List, Optional, Sequence
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.cache import TTLCache
+from bot.checks.client import DEFAULT_SERVICE_ID, imeicheck_client
+from bot.checks.dao import ImeiCheckDAO
+from bot.checks.models import ImeiCheck
+from bot.checks.schemas import CheckReport, CheckResponse, ImeiCheckModel
+from bot import config
+from bot.database import connection
+from bot.lifecycle import background
+from bot.quotas.utils import usage_counter
+from bot.stats.utils import stats_rollup
+
+# Максимальная длина текста одного сообщения Telegram
+MESSAGE_LIMIT = 4096
+
+# Шаблоны компилируются один раз при импорте модуля
+_HEADER_TEMPLATE = Template("📱 <b>$device</b>\nIMEI: <code>$imei</code>\nСтатус: $status\nУслуга: $service")
+_PROPERTY_TEMPLATE = Template("• $label: $value")
+_HISTORY_LINE_TEMPLATE = Template("$created_at · <code>$imei</code> · $status")
+_REPORT_HEADER_TEMPLATE = Template("📋 <b>$device</b>\nIMEI: <code>$imei</code>\nУслуги: $services")
+_REPORT_MISSING_TEMPLATE = Template("⚠️ Нет данных от услуг: $services")
+
+# Подписи известных свойств устройства; остальные выводятся под своими ключами
+PROPERTY_LABELS = {
+    "deviceName": "Устройство",
+    "modelDesc": "Модель",
+    "imei": "IMEI",
+    "imei2": "IMEI 2",
+    "serial": "Серийный номер",
+    "estPurchaseDate": "Дата покупки",
+    "purchaseCountry": "Страна покупки",
+    "apple/region": "Регион",
+    "simLock": "SIM-lock",
+    "network": "Сеть",
+    "warrantyStatus": "Гарантия",
+    "repairCoverage": "Покрытие ремонта",
+    "technicalSupport": "Техподдержка",
+    "fmiOn": "Find My iPhone",
+    "lostMode": "Режим пропажи",
+    "usaBlockStatus": "Блокировка (США)",
+    "gsmaBlacklisted": "Черный список GSMA",
+    "demoUnit": "Демо-образец",
+    "refurbished": "Восстановленный",
+}
+
+# Свойства, которые не имеет смысла показывать текстом
+_HIDDEN_PROPERTIES = frozenset({"image"})
+
+
+# Длина TAC (Type Allocation Code) - префикса IMEI, определяющего модель устройства
+TAC_LENGTH = 8
+# Сколько хранится модель устройства по TAC: соответствие TAC и модели не меняется
+TAC_TTL = 7 * 24 * 60 * 60
+# Сколько помнить, что модель по TAC неизвестна
+TAC_NEGATIVE_TTL = 5 * 60
+
+
+def device_name(result: Dict[str, Any]) -> Optional[str]:
+    """
+    Извлекает название устройства из ответа imeicheck.net.
+
+    :param result: Ответ сервиса.
+    :return: Название устройства или None.
+    """
+    properties = result.get("properties") or {}
+    return properties.get("deviceName") or properties.get("modelDesc")
+
+
+class ResultCache:
+    """
+    Последние результаты проверок и модели устройств по TAC в памяти процесса.
+
+    Результат хранится, пока он свежий (CHECK_CACHE_TTL от времени проверки),
+    поэтому ответ из кэша совпадает с тем, что вернул бы get_or_create_check.
+    """
+
+    def __init__(self, maxsize: int = 10_000, tac_maxsize: int = 50_000) -> None:
+        # Время жизни задается для каждого результата отдельно, в remember
+        self._results: TTLCache[tuple[str, int], Dict[str, Any]] = TTLCache(maxsize=maxsize, ttl=0)
+        self._tacs: TTLCache[str, str] = TTLCache(maxsize=tac_maxsize, ttl=TAC_TTL)
+
+    def remember(self, imei: str, service_id: int, result: Dict[str, Any], checked_at: datetime) -> None:
+        """
+        Сохраняет результат проверки и модель устройства по его TAC.
+
+        :param imei: IMEI устройства.
+        :param service_id: Идентификатор услуги imeicheck.net.
+        :param result: Ответ сервиса.
+        :param checked_at: Время проверки.
+        """
+        ttl = config.settings.CHECK_CACHE_TTL - (datetime.now() - checked_at).total_seconds()
+        if ttl > 0:
+            self._results.set((imei, service_id), result, ttl=ttl)
+        name = device_name(result)
+        if name:
+            self._tacs.set(imei[:TAC_LENGTH], name)
+
+    def get(self, imei: str, service_id: int = DEFAULT_SERVICE_ID) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает свежий результат проверки из памяти.
+
+        :param imei: IMEI устройства.
+        :param service_id: Идентификатор услуги imeicheck.net.
+        :return: Ответ сервиса или None.
+        """
+        return self._results.get((imei, service_id))
+
+    async def lookup(self, session: AsyncSession, imei: str,
+                     service_id: int = DEFAULT_SERVICE_ID) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает свежий результат проверки из памяти или из истории проверок, не обращаясь к API.
+
+        :param session: Сессия базы данных.
+        :param imei: IMEI устройства.
+        :param service_id: Идентификатор услуги imeicheck.net.
+        :return: Ответ сервиса или None.
+        """
+        result = self.get(imei, service_id)
+        if result is not None:
+            return result
+        newer_than = datetime.now() - timedelta(seconds=config.settings.CHECK_CACHE_TTL)
+        check = await ImeiCheckDAO.find_latest(session, imei=imei, service_id=service_id, newer_than=newer_than)
+        if check is None:
+            return None
+        self.remember(check.imei, check.service_id, check.result, check.created_at)
+        return check.result
+
+    async def tac_device(self, session: AsyncSession, imei_prefix: str) -> Optional[str]:
+        """
+        Определяет модель устройства по TAC по ранее выполненным проверкам.
+
+        :param session: Сессия базы данных.
+        :param imei_prefix: IMEI или его начало длиной не меньше TAC_LENGTH цифр.
+        :return: Название модели или None.
+        """
+        tac = imei_prefix[:TAC_LENGTH]
+        if tac in self._tacs:
+            return self._tacs.get(tac) or None
+        records = await ImeiCheckDAO.find_by_tac(session, tac)
+        name = next((name for name in (device_name(record.result) for record in records) if name), None)
+        # Неизвестный TAC тоже запоминаем, но ненадолго: пока пользователь печатает, запросы повторяются
+        self._tacs.set(tac, name or "", ttl=None if name else TAC_NEGATIVE_TTL)
+        return name
+
+
+class InlineDebouncer:
+    """
+    Откладывает обработку inline-запроса, пока пользователь печатает.
+
+    Telegram присылает новый inline-запрос почти на каждый введенный символ; обработку
+    продолжает только последний запрос, после которого пользователь выждал delay секунд.
+    """
+
+    def __init__(self) -> None:
+        self._latest: Dict[int, str] = {}
+
+    async def settle(self, user_id: int, query_id: str, delay: float) -> bool:
+        """
+        Ждет delay секунд и сообщает, остался ли запрос последним.
+
+        :param user_id: Telegram ID пользователя.
+        :param query_id: Идентификатор inline-запроса.
+        :param delay: Пауза в секундах.
+        :return: True, если за время паузы новых запросов от пользователя не было.
+        """
+        self._latest[user_id] = query_id
+        await asyncio.sleep(delay)
+        if self._latest.get(user_id) != query_id:
+            return False
+        del self._latest[user_id]
+        return True
+
+
+@connection()
+async def _check_result(user_id: int, imei: str, session) -> Dict[str, Any]:
+    check = await get_or_create_check(session, user_id=user_id, imei=imei)
+    return check.result
+
+
+class PendingChecks:
+    """
+    Проверки IMEI, запущенные из inline-режима в фоне.
+
+    Проверка продолжается, даже если ответ на inline-запрос пришлось отправить раньше:
+    следующий запрос того же IMEI получит результат из кэша. Повторные запросы
+    пользователя ждут уже запущенную проверку, а не создают новую.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Dict[tuple[int, str], asyncio.Task] = {}
+
+    def start(self, user_id: int, imei: str) -> asyncio.Task:
+        """
+        Запускает проверку или возвращает уже выполняющуюся.
+
+        :param user_id: Идентификатор пользователя (users.id).
+        :param imei: IMEI устройства.
+        :return: Задача, результат которой - ответ сервиса.
+        """
+        key = (user_id, imei)
+        task = self._tasks.get(key)
+        if task is None:
+            task = background.spawn(_check_result(user_id, imei), name=f"inline_check_{imei}")
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return task
+
+
+result_cache = ResultCache()
+inline_debouncer = InlineDebouncer()
+pending_checks = PendingChecks()
+
+
+def is_valid_imei(imei: str | None) -> bool:
+    """
+    Проверяет формат IMEI: ровно 15 цифр.
+
+    :param imei: Строка для проверки.
+    :return: True, если строка похожа на IMEI.
+    """
+    return bool(imei) and len(imei) == 15 and imei.isdigit()
+
+
+async def get_or_create_check(session: AsyncSession, user_id: int, imei: str,
+                              service_id: int = DEFAULT_SERVICE_ID) -> ImeiCheck:
+    """
+    Возвращает результат проверки IMEI из истории или выполняет новую проверку через API.
+
+    Свежим считается результат не старше CHECK_CACHE_TTL секунд. Если его запрашивал
+    другой пользователь, копия результата сохраняется в историю текущего пользователя.
+
+    :param session: Сессия базы данных.
+    :param user_id: Идентификатор пользователя (users.id).
+    :param imei: IMEI устройства.
+    :param service_id: Идентификатор услуги imeicheck.net.
+    :return: Запись проверки.
+    """
+    newer_than = datetime.now() - timedelta(seconds=config.settings.CHECK_CACHE_TTL)
+    cached = await ImeiCheckDAO.find_latest(session, imei=imei, service_id=service_id, newer_than=newer_than)
+    if cached is not None and cached.user_id == user_id:
+        result_cache.remember(imei, service_id, cached.result, cached.created_at)
+        return cached
+
+    if cached is not None:
+        data = cached.result
+    else:
+        # Квота проверяется до обращения к платному API; возвращается, только если запрос не был отправлен
+        charged_on = usage_counter.acquire(user_id)
+        sent = asyncio.Event()
+        try:
+            response = await imeicheck_client.create_check(imei, service_id, sent=sent)
+        except BaseException:
+            if not sent.is_set():
+                usage_counter.refund(user_id, charged_on)
+            raise
+        data = response.model_dump(mode="json", by_alias=True, exclude_none=True)
+    values = ImeiCheckModel(user_id=user_id, imei=imei, service_id=service_id,
+                            status=data.get("status"), result=data)
+    check = await ImeiCheckDAO.add(session=session, values=values)
+    result_cache.remember(imei, service_id, data, cached.created_at if cached is not None else datetime.now())
+    stats_rollup.mark_dirty()
+    return check
+
+
+async def get_or_create_report(session: AsyncSession, user_id: int, imei: str,
+                               service_ids: Sequence[int], deadline: float) -> CheckReport:
+    """
+    Собирает сводный отчет по IMEI, опрашивая несколько услуг параллельно.
+
+    Свежие результаты берутся из истории (чужие копируются в историю пользователя), остальные
+    услуги запрашиваются одновременно. Через deadline секунд незавершенные запросы отменяются, а услуги попадают в missing.
+    Квота за отмененные и неудачные запросы возвращается, только если запрос не был отправлен в сервис.
+
+    :param session: Сессия базы данных.
+    :param user_id: Идентификатор пользователя (users.id).
+    :param imei: IMEI устройства.
+    :param service_ids: Идентификаторы услуг imeicheck.net в порядке приоритета.
+    :param deadline: Общий срок ожидания ответов в секундах.
+    :return: Сводный отчет.
+    """
+    newer_than = datetime.now() - timedelta(seconds=config.settings.CHECK_CACHE_TTL)
+    cached = await ImeiCheckDAO.find_latest_many(session, imei=imei, service_ids=service_ids, newer_than=newer_than)
+    responses: Dict[int, CheckResponse] = {
+        service_id: CheckResponse.model_validate(check.result) for service_id, check in cached.items()
+    }
+    # Результаты других пользователей копируются в историю текущего, как в get_or_create_check
+    copies = [ImeiCheckModel(user_id=user_id, imei=imei, service_id=service_id, status=check.status,
+                             result=check.result)
+              for service_id, check in cached.items() if check.user_id != user_id]
+    for service_id, check in cached.items():
+        result_cache.remember(imei, service_id, check.result, check.created_at)
+
+    to_request = [service_id for service_id in service_ids if service_id not in cached]
+    if to_request:
+        # Квота списывается за все запрашиваемые услуги до обращения к платному API
+        charged_on = usage_counter.acquire(user_id, len(to_request))
+    sent = {service_id: asyncio.Event() for service_id in to_request}
+    tasks = {
+        asyncio.create_task(imeicheck_client.create_check(imei, service_id, sent=sent[service_id])): service_id
+        for service_id in to_request
+    }
+    new_checks: List[ImeiCheckModel] = []
+    if tasks:
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        # Дожидаемся отмены, чтобы запросы не продолжали работать и состояние sent было окончательным
+        await asyncio.gather(*pending, return_exceptions=True)
+        # Отправленный запрос мог быть оплачен, даже если ответ не получен; возвращаются только неотправленные
+        unsent = sum(not sent[tasks[task]].is_set() for task in pending)
+        for task in done:
+            service_id = tasks[task]
+            if task.exception() is not None:
+                unsent += not sent[service_id].is_set()
+                logger.error(f"Услуга {service_id} не смогла проверить IMEI {imei}: {task.exception()}")
+                continue
+            response = task.result()
+            responses[service_id] = response
+            data = response.model_dump(mode="json", by_alias=True, exclude_none=True)
+            new_checks.append(ImeiCheckModel(user_id=user_id, imei=imei, service_id=service_id,
+                                             status=response.status, result=data))
+        if pending:
+            logger.warning(f"Услуги {[tasks[task] for task in pending]} не ответили за {deadline} с по IMEI {imei}")
+        if unsent:
+            usage_counter.refund(user_id, charged_on, unsent)
+
+    if new_checks or copies:
+        await ImeiCheckDAO.add_many(session=session, instances=new_checks + copies)
+        checked_at = datetime.now()
+        for new_check in new_checks:
+            result_cache.remember(imei, new_check.service_id, new_check.result, checked_at)
+        stats_rollup.mark_dirty()
+
+    return CheckReport(
+        imei=imei,
+        responses={service_id: responses[service_id] for service_id in service_ids if service_id in responses},
+        missing=[service_id for service_id in service_ids if service_id not in responses],
+    )
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "да" if value else "нет"
+    if value is None:
+        return "—"
+    return escape(str(value))
+
+
+def _safe_cut(line: str, limit: int) -> int:
+    # Не разрываем HTML-сущность вида &amp; на границе сообщения
+    amp = line.rfind("&", max(limit - 8, 0), limit)
+    if amp > 0 and line.find(";", amp, limit) == -1:
+        return amp
+    return limit
+
+
+def split_message(lines: Sequence[str], limit: int = MESSAGE_LIMIT) -> List[str]:
+    """
+    Собирает строки в сообщения не длиннее limit, разрывая только между строками.
+
+    Строка длиннее limit режется на части, чтобы ни одно сообщение не превысило ограничение.
+
+    :param lines: Строки текста.
+    :param limit: Максимальная длина сообщения.
+    :return: Список текстов сообщений.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in lines:
+        while len(line) > limit:
+            # Слишком длинная строка: режем по границе limit
+            if current:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            cut = _safe_cut(line, limit)
+            chunks.append(line[:cut])
+            line = line[cut:]
+        added = len(line) + (1 if current else 0)
+        if size + added > limit:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+            added = len(line)
+        current.append(line)
+        size += added
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def render_check(data: dict | CheckResponse) -> List[str]:
+    """
+    Формирует текст результата проверки для отправки в Telegram.
+
+    :param data: Ответ сервиса (сохраненный словарь или типизированная модель).
+    :return: Список сообщений, каждое не длиннее MESSAGE_LIMIT.
+    """
+    response = data if isinstance(data, CheckResponse) else CheckResponse.model_validate(data)
+    properties = response.properties
+    lines = [_HEADER_TEMPLATE.substitute(
+        device=escape(str(properties.get("deviceName") or properties.get("modelDesc") or "Неизвестное устройство")),
+        imei=escape(str(response.device_id or properties.get("imei") or "")),
+        status=escape(response.status or "unknown"),
+        service=escape(response.service.title if response.service and response.service.title else "—"),
+    )]
+    for key, value in properties.items():
+        if key in _HIDDEN_PROPERTIES:
+            continue
+        lines.append(_PROPERTY_TEMPLATE.substitute(label=PROPERTY_LABELS.get(key, escape(key)),
+                                                   value=_format_value(value)))
+    return split_message(lines)
+
+
+def render_report(report: CheckReport) -> List[str]:
+    """
+    Формирует текст сводного отчета, явно перечисляя услуги без данных.
+
+    :param report: Сводный отчет.
+    :return: Список сообщений, каждое не длиннее MESSAGE_LIMIT.
+    """
+    properties = report.properties
+    services = ", ".join(
+        escape(response.service.title if response.service and response.service.title else str(service_id))
+        for service_id, response in report.responses.items()
+    )
+    lines = [_REPORT_HEADER_TEMPLATE.substitute(
+        device=escape(str(properties.get("deviceName") or properties.get("modelDesc") or "Неизвестное устройство")),
+        imei=escape(report.imei),
+        services=services or "—",
+    )]
+    if report.missing:
+        lines.append(_REPORT_MISSING_TEMPLATE.substitute(services=", ".join(map(str, report.missing))))
+    for key, value in properties.items():
+        if key in _HIDDEN_PROPERTIES:
+            continue
+        lines.append(_PROPERTY_TEMPLATE.substitute(label=PROPERTY_LABELS.get(key, escape(key)),
+                                                   value=_format_value(value)))
+    return split_message(lines)
+
+
+def format_history(records: Sequence[ImeiCheck]) -> str:
+    """
+    Формирует текст страницы истории проверок.
+
+    :param records: Записи проверок.
+    :return: Текст сообщения.
+    """
+    if not records:
+        return "История проверок пуста."
+    lines = ["🗂 История проверок:"]
+    for record in records:
+        lines.append(_HISTORY_LINE_TEMPLATE.substitute(created_at=f"{record.created_at:%d.%m.%Y %H:%M}",
+                                                       imei=record.imei,
+                                                       status=escape(record.status or 'unknown')))
+    return "\n".join(lines)
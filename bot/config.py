@@ -1,14 +1,13 @@
 import os
 import sys
-from typing import List
+from typing import Any, Callable, List, Literal, Optional, TYPE_CHECKING
 from loguru import logger
-from aiogram import Bot, Dispatcher
-from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.client.default import DefaultBotProperties
 from pydantic import SecretStr, ValidationError
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+if TYPE_CHECKING:
+    from aiogram import Bot, Dispatcher
+
 # Использую разные .env файлы для разработки и для деплоя
 env_file_local: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env")
 env_file_docker: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env.docker")
@@ -26,8 +25,56 @@ class Settings(BaseSettings):
         DB_HOST (str): Хост базы данных.
         DB_PORT (int): Порт базы данных.
         DB_NAME (str): Имя основной базы данных.
+        DB_URL (Optional[str]): Полный URL основной базы; если задан, заменяет DB_* параметры.
+        DB_REPLICA_URL (Optional[str]): URL реплики для чтения; если не задан, все запросы идут в основную базу.
+        DB_REPLICA_MAX_LAG (float): Допустимое отставание реплики в секундах.
+        DB_REPLICA_CHECK_INTERVAL (float): Период проверки отставания реплики в секундах.
         PYTHONPATH (str): Путь к Python.
         IMEICHECK_TOKEN (str): Токен для доступа к сервису
+        SHUTDOWN_TIMEOUT (float): Сколько секунд ждать завершения обработчиков при остановке.
+        CHECK_CACHE_TTL (int): Сколько секунд результат проверки IMEI считается свежим.
+        HISTORY_PAGE_SIZE (int): Количество проверок на одной странице /history.
+        JSON_CODEC (str): Кодек JSON: auto (orjson, если установлен), orjson или json.
+        IMEICHECK_CONCURRENCY (int): Максимум одновременных запросов к imeicheck.net.
+        IMEICHECK_REPORT_SERVICES (List[int]): Услуги imeicheck.net для сводного отчета (/full_report), по приоритету;
+            /full_report доступна, если услуг не меньше двух.
+        IMEICHECK_REPORT_DEADLINE (float): Общий срок ожидания ответов услуг для сводного отчета в секундах.
+        UPDATES_DEDUP_WINDOW (int): Сколько последних update_id помнить для защиты от повторной обработки.
+        UPDATES_FLUSH_INTERVAL (float): Период сохранения журнала апдейтов в базу в секундах.
+        UPDATES_CONCURRENCY (int): Максимум одновременно обрабатываемых апдейтов.
+        UPDATES_MAX_PENDING (int): Максимум принятых, но еще не обработанных апдейтов; сверх него - ответ "бот занят".
+        UPDATES_MAX_PENDING_PER_CHAT (int): То же для одного чата.
+        QUOTA_DAILY (int): Дневная квота платных проверок на пользователя (0 - без ограничения).
+        QUOTA_MONTHLY (int): Месячная квота платных проверок на пользователя (0 - без ограничения).
+        USAGE_FLUSH_INTERVAL (float): Период сохранения счетчиков использования в базу в секундах.
+        STATS_REFRESH_INTERVAL (float): Период обновления агрегатов статистики в секундах.
+        RECORD_UPDATES (bool): Записывать ли обезличенные апдейты для воспроизведения.
+        RECORD_DIR (str): Каталог для файлов записи.
+        RECORD_MAX_BYTES (int): Размер несжатых данных, после которого начинается новый файл записи.
+        RECORD_ROTATE_SECONDS (float): Максимальный возраст файла записи в секундах.
+        RECORD_SALT (Optional[SecretStr]): Соль для псевдонимов ID; без нее соль случайна для каждого запуска.
+        USER_WRITE_WINDOW (float): Сколько секунд копить добавления и обновления пользователей для групповой записи.
+        USER_WRITE_MAX_ROWS (int): Размер группы, при котором она записывается сразу.
+        INLINE_DEBOUNCE (float): Пауза в вводе inline-запроса, после которой запускается проверка через API.
+        INLINE_DEADLINE (float): За сколько секунд нужно ответить на inline-запрос.
+        PERFORMANCE_PROFILE (bool): Профиль производительности: uvloop (если установлен), общий DNS-кэш
+            и заранее открытые соединения с Telegram и imeicheck.net.
+        HTTP_LIMIT (int): Максимум одновременных HTTP-соединений одной сессии.
+        HTTP_LIMIT_PER_HOST (int): Максимум HTTP-соединений с одним хостом (0 - без ограничения).
+        HTTP_KEEPALIVE_TIMEOUT (float): Сколько секунд держать неиспользуемое соединение открытым.
+        HTTP_DNS_TTL (int): Время жизни записей DNS-кэша в секундах.
+        HTTP_WARMUP_CONNECTIONS (int): Сколько соединений с каждым хостом открывать при запуске (в профиле производительности).
+        PARTITION_PREMAKE_MONTHS (int): На сколько месяцев вперед создавать партиции партиционированных таблиц.
+        PARTITION_RETENTION_MONTHS (int): Сколько месяцев хранить партиции (0 - хранить все).
+        PARTITION_ARCHIVE_DIR (str): Каталог сжатых архивов удаляемых партиций; пустая строка - удалять без архива.
+        PARTITION_MAINTENANCE_INTERVAL (float): Период обслуживания партиций в секундах.
+        API_ENABLED (bool): Запускать ли HTTP API вместе с ботом.
+        API_HOST (str): Адрес, на котором слушает HTTP API.
+        API_PORT (int): Порт HTTP API.
+        API_MAX_BATCH (int): Максимум IMEI в одном запросе к HTTP API.
+        API_TOKEN_CONCURRENCY (int): Максимум одновременных проверок на один токен.
+        API_TOKEN_RATE (int): Максимум проверок на один токен в минуту.
+        API_SERVICE_IDS (List[int]): Услуги imeicheck.net, доступные через HTTP API.
 
     Методы:
         get_db_url() -> str: Возвращает URL для основной базы данных.
@@ -41,10 +88,66 @@ class Settings(BaseSettings):
     DB_HOST: str
     DB_PORT: int
     DB_NAME: str
+    DB_URL: Optional[str] = None
+    DB_REPLICA_URL: Optional[str] = None
+    DB_REPLICA_MAX_LAG: float = 5.0
+    DB_REPLICA_CHECK_INTERVAL: float = 5.0
     IMEICHECK_TOKEN: SecretStr
 
     PYTHONPATH: SecretStr
 
+    SHUTDOWN_TIMEOUT: float = 10.0
+    CHECK_CACHE_TTL: int = 24 * 60 * 60
+    HISTORY_PAGE_SIZE: int = 5
+    JSON_CODEC: Literal["auto", "orjson", "json"] = "auto"
+    IMEICHECK_CONCURRENCY: int = 10
+    IMEICHECK_REPORT_SERVICES: List[int] = [12]
+    IMEICHECK_REPORT_DEADLINE: float = 15.0
+
+    UPDATES_DEDUP_WINDOW: int = 10_000
+    UPDATES_FLUSH_INTERVAL: float = 1.0
+    UPDATES_CONCURRENCY: int = 20
+    UPDATES_MAX_PENDING: int = 1000
+    UPDATES_MAX_PENDING_PER_CHAT: int = 10
+
+    QUOTA_DAILY: int = 50
+    QUOTA_MONTHLY: int = 500
+    USAGE_FLUSH_INTERVAL: float = 10.0
+
+    STATS_REFRESH_INTERVAL: float = 60.0
+
+    RECORD_UPDATES: bool = False
+    RECORD_DIR: str = "captures"
+    RECORD_MAX_BYTES: int = 64 * 1024 * 1024
+    RECORD_ROTATE_SECONDS: float = 60 * 60
+    RECORD_SALT: Optional[SecretStr] = None
+
+    USER_WRITE_WINDOW: float = 0.005
+    USER_WRITE_MAX_ROWS: int = 500
+
+    INLINE_DEBOUNCE: float = 0.8
+    INLINE_DEADLINE: float = 8.0
+
+    PERFORMANCE_PROFILE: bool = False
+    HTTP_LIMIT: int = 100
+    HTTP_LIMIT_PER_HOST: int = 0
+    HTTP_KEEPALIVE_TIMEOUT: float = 60.0
+    HTTP_DNS_TTL: int = 300
+    HTTP_WARMUP_CONNECTIONS: int = 4
+
+    PARTITION_PREMAKE_MONTHS: int = 3
+    PARTITION_RETENTION_MONTHS: int = 0
+    PARTITION_ARCHIVE_DIR: str = "archive"
+    PARTITION_MAINTENANCE_INTERVAL: float = 6 * 60 * 60
+
+    API_ENABLED: bool = False
+    API_HOST: str = "0.0.0.0"
+    API_PORT: int = 8080
+    API_MAX_BATCH: int = 50
+    API_TOKEN_CONCURRENCY: int = 5
+    API_TOKEN_RATE: int = 60
+    API_SERVICE_IDS: List[int] = [12]
+
     model_config = SettingsConfigDict(extra="ignore")
 
     def get_db_url(self) -> str:
@@ -53,6 +156,8 @@ class Settings(BaseSettings):
 
         :return: URL базы данных в формате строки.
         """
+        if self.DB_URL:
+            return self.DB_URL
         return (
             f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD.get_secret_value()}@"
             f"{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
@@ -81,52 +186,119 @@ def get_settings() -> Settings:
         raise RuntimeError(f"Validation errors: {', '.join(error_messages)}")
 
 
-try:
+def setup_logging() -> None:
+    """
+    Настраивает обработчики loguru (консоль и файл ошибок).
+
+    Повторные вызовы ничего не делают, поэтому функцию можно вызывать из любой точки входа.
+    """
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+
+    # Удаляем все существующие обработчики
+    logger.remove()
+
+    # Настройка логирования
+    logger.add(
+        sys.stdout,
+        level="DEBUG",
+        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> - "
+               "<level>{level:^8}</level> - "
+               "<cyan>{name}</cyan>:<magenta>{line}</magenta> - "
+               "<yellow>{function}</yellow> - "
+               "<white>{message}</white> <magenta>{extra[user]:^10}</magenta>",
+    )
+
+    # Конфигурация логгера с дополнительными полями
+    logger.configure(extra={"ip": "", "user": ""})
+    logger.add(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "file.log"),
+        level="ERROR",
+        format="{time:YYYY-MM-DD HH:mm:ss} - {level} - {name}:{line} - {function} - {message} {extra[user]}",
+        rotation="1 day",
+        retention="7 days",
+        backtrace=True,
+        diagnose=True,
+    )
+
+
+_logging_configured = False
+
+
+def _create_settings() -> Settings:
     # Получаем параметры для загрузки переменных среды
-    settings = get_settings()
-except RuntimeError as e:
-    print(e)
-
-# Инициализируем бота и диспетчер
-bot = Bot(token=settings.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-dp = Dispatcher(storage=MemoryStorage())
-admins = settings.ADMIN_IDS
-# Получение URL базы данных
-database_url = settings.get_db_url()
-
-# Удаляем все существующие обработчики
-logger.remove()
-
-# Настройка логирования
-logger.add(
-    sys.stdout,
-    level="DEBUG",
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> - "
-           "<level>{level:^8}</level> - "
-           "<cyan>{name}</cyan>:<magenta>{line}</magenta> - "
-           "<yellow>{function}</yellow> - "
-           "<white>{message}</white> <magenta>{extra[user]:^10}</magenta>",
-)
-
-# Конфигурация логгера с дополнительными полями
-logger.configure(extra={"ip": "", "user": ""})
-logger.add(
-    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "file.log"),
-    level="ERROR",
-    format="{time:YYYY-MM-DD HH:mm:ss} - {level} - {name}:{line} - {function} - {message} {extra[user]}",
-    rotation="1 day",
-    retention="7 days",
-    backtrace=True,
-    diagnose=True,
-)
+    try:
+        return get_settings()
+    except RuntimeError as e:
+        print(e)
+        raise
+
+
+def _create_bot() -> "Bot":
+    from aiogram import Bot
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.enums import ParseMode
+
+    from bot import json_codec
+    from bot.runtime import TunedAiohttpSession, connector_options
+
+    session = TunedAiohttpSession(connector_options(), json_loads=json_codec.loads, json_dumps=json_codec.dumps)
+    return Bot(token=__getattr__("settings").BOT_TOKEN, session=session,
+               default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+
+
+def _create_dispatcher() -> "Dispatcher":
+    from aiogram import Dispatcher
+    from aiogram.fsm.storage.memory import MemoryStorage
+
+    return Dispatcher(storage=MemoryStorage())
+
+
+# Тяжелые объекты (настройки, бот, диспетчер) создаются при первом обращении к ним,
+# чтобы импорт модуля из миграций и CLI-утилит не читал .env и не создавал сессию бота.
+_LAZY_FACTORIES: dict[str, Callable[[], Any]] = {
+    "settings": _create_settings,
+    "bot": _create_bot,
+    "dp": _create_dispatcher,
+    "admins": lambda: __getattr__("settings").ADMIN_IDS,
+    "database_url": lambda: __getattr__("settings").get_db_url(),
+}
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Лениво создает объект модуля при первом обращении и кэширует его в globals().
+
+    :param name: Имя атрибута модуля.
+    :return: Созданный объект.
+    :raises AttributeError: Если атрибут не относится к ленивым.
+    """
+    factory = _LAZY_FACTORIES.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = factory()
+    globals()[name] = value
+    return value
+
+
+if TYPE_CHECKING:
+    # Типы ленивых объектов для mypy и IDE; во время выполнения их создает __getattr__
+    settings: Settings
+    bot: Bot
+    dp: Dispatcher
+    admins: List[int]
+    database_url: str
 
 # Теперь вы можете использовать logger в других модулях
 # Явный экспорт для того чтобы mypy не ругался
-__all__ = ["logger"]
+__all__ = ["logger", "setup_logging", "settings", "bot", "dp", "admins", "database_url"]
 
 if __name__ == '__main__':
-    print(settings)
-    print(database_url)
+    setup_logging()
+    print(__getattr__("settings"))
+    print(__getattr__("database_url"))
     logger.info('test_info')
     logger.bind(user="BORIS").error('test_error')
-    print(admins)
+    print(__getattr__("admins"))
@@ -1,27 +1,210 @@
-from typing import List, Any, TypeVar, Generic
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Any, TypeVar, Generic, Callable, Dict, Hashable, Optional, Tuple
 from pydantic import BaseModel
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import InvalidRequestError, SQLAlchemyError
 from sqlalchemy.future import select
-from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete, func
+from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete, func, bindparam, inspect
 from loguru import logger
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
-from bot.database import Base
+from bot.database import Base, get_engine
+from bot.invalidation import cache_invalidator
 
 # Объявляем типовой параметр T с ограничением, что это наследник Base
 T = TypeVar("T", bound=Base)
 
 
+def dialect_insert(model: type[Base]):
+    """
+    Возвращает INSERT с поддержкой ON CONFLICT для диалекта основной базы (PostgreSQL или SQLite).
+
+    :param model: Модель, в которую выполняется вставка.
+    :return: Конструкция insert нужного диалекта.
+    """
+    if get_engine().dialect.name == "sqlite":
+        return sqlite_insert(model)
+    return pg_insert(model)
+
+
+# Фильтр или значения: pydantic-схема (берутся только заданные поля) или обычный словарь
+Data = BaseModel | Dict[str, Any]
+# Сигнатура фильтра: имена полей и признак сравнения с NULL (x IS NULL нельзя выразить параметром)
+FilterSignature = Tuple[Tuple[str, bool], ...]
+# Заданы ли нижняя и верхняя границы по времени создания записи
+TimeBounds = Tuple[bool, bool]
+
+
+def as_dict(data: Optional[Data]) -> Dict[str, Any]:
+    """
+    Приводит фильтр или значения к словарю.
+
+    :param data: Pydantic-схема, словарь или None.
+    :return: Словарь заданных полей; словарь передается как есть, без model_dump.
+    """
+    if data is None:
+        return {}
+    if isinstance(data, dict):
+        return data
+    return data.model_dump(exclude_unset=True)
+
+
+class StatementCache:
+    """
+    Ограниченный LRU-кэш готовых SQL-конструкций BaseDAO.
+
+    Конструкции содержат параметры (bindparam) вместо значений, поэтому одна конструкция
+    обслуживает все вызовы с тем же набором полей. Повторное выполнение одной и той же
+    конструкции также попадает в кэш компиляции SQLAlchemy без повторного построения запроса.
+
+    Attributes:
+        maxsize (int): Максимальное количество конструкций.
+        hits (int): Количество попаданий.
+        misses (int): Количество промахов (построенных конструкций).
+    """
+
+    def __init__(self, maxsize: int = 512) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """
+        Возвращает конструкцию из кэша или строит и сохраняет ее.
+
+        :param key: Ключ: модель, операция и сигнатура полей.
+        :param build: Функция построения конструкции.
+        :return: SQL-конструкция.
+        """
+        statement = self._data.get(key)
+        if statement is not None:
+            self.hits += 1
+            self._data.move_to_end(key)
+            return statement
+        self.misses += 1
+        statement = self._data[key] = build()
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return statement
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Возвращает метрики кэша.
+
+        :return: Размер, попадания, промахи и доля попаданий.
+        """
+        total = self.hits + self.misses
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+
+statement_cache = StatementCache()
+
+
+def _signature(filter_dict: Dict[str, Any]) -> FilterSignature:
+    return tuple(sorted((key, value is None) for key, value in filter_dict.items()))
+
+
+def _filter_params(filter_dict: Dict[str, Any]) -> Dict[str, Any]:
+    return {f"f_{key}": value for key, value in filter_dict.items() if value is not None}
+
+
+def _time_params(since: Optional[datetime], until: Optional[datetime]) -> Dict[str, Any]:
+    params = {}
+    if since is not None:
+        params["t_since"] = since
+    if until is not None:
+        params["t_until"] = until
+    return params
+
+
 class BaseDAO(Generic[T]):
     model: type[T]
 
+    @staticmethod
+    async def _execute_read(session: AsyncSession, query, consistent: bool = False,
+                            params: Optional[Dict[str, Any]] = None):
+        # Чтение может уйти на реплику; consistent=True оставляет его в основной базе
+        return await session.execute(query, params, bind_arguments={"consistent": True} if consistent else None)
+
     @classmethod
-    async def find_one_or_none_by_id(cls, data_id: int, session: AsyncSession):
+    def _column(cls, key: str):
+        column = getattr(cls.model, key, None)
+        if column is None:
+            raise InvalidRequestError(f'Entity namespace for "{cls.model.__tablename__}" has no property "{key}"')
+        return column
+
+    @classmethod
+    def _criteria(cls, signature: FilterSignature) -> list:
+        # Аналог filter_by(**filters), но со значениями в параметрах f_<поле>
+        return [cls._column(key).is_(None) if is_null else cls._column(key) == bindparam(f"f_{key}")
+                for key, is_null in signature]
+
+    @classmethod
+    def _time_criteria(cls, bounds: TimeBounds) -> list:
+        # Диапазон [since, until) по столбцу партиционирования (created_at). Для партиционированной
+        # таблицы PostgreSQL по этим условиям читает только партиции нужных месяцев
+        column = cls._column(cls.model.__table__.info.get("partition_by", "created_at"))
+        since, until = bounds
+        return ([column >= bindparam("t_since")] if since else []) + ([column < bindparam("t_until")] if until else [])
+
+    @classmethod
+    def _statement(cls, operation: str, signature: Hashable, build: Callable[[], Any]):
+        return statement_cache.get_or_build((cls.model, operation, signature), build)
+
+    @classmethod
+    def _key_columns(cls) -> frozenset[str]:
+        # Столбцы, однозначно определяющие строку: первичный ключ и уникальные столбцы
+        table = cls.model.__table__
+        names = {column.name for column in table.columns if column.primary_key or column.unique}
+        names.update(index.columns[0].name for index in table.indexes if index.unique and len(index.columns) == 1)
+        return frozenset(names)
+
+    @classmethod
+    def _synchronize(cls, session: AsyncSession, data_id: Any, values: Dict[str, Any]) -> None:
+        # Кэшированный UPDATE содержит bindparam без значений, поэтому ORM не может сама обновить
+        # загруженные объекты (synchronize_session записал бы в них None). Значения переносятся отсюда,
+        # а столбцы с onupdate (updated_at) истекают - как при synchronize_session="evaluate"
+        mapper = inspect(cls.model)
+        instance = session.identity_map.get(mapper.identity_key_from_primary_key((data_id,)))
+        if instance is None:
+            return
+        for key, value in values.items():
+            set_committed_value(instance, key, value)
+        onupdate = [prop.key for prop in mapper.column_attrs
+                    if prop.key not in values and prop.columns[0].onupdate is not None]
+        if onupdate:
+            session.expire(instance, onupdate)
+
+    @classmethod
+    async def _publish_invalidation(cls, session: AsyncSession, op: str, *rows: dict, targeted: bool = True) -> None:
+        # Сообщение о записи уходит в ту же транзакцию; кэши сбрасываются после коммита.
+        # targeted=False - затронутые строки неизвестны, подписчики сбрасывают все по таблице
+        keys = None
+        if targeted:
+            key_columns = cls._key_columns()
+            keys = {}
+            for row in rows:
+                for key, value in row.items():
+                    if key in key_columns and isinstance(value, (int, str)):
+                        keys.setdefault(key, []).append(value)
+        await cache_invalidator.publish(session, cls.model.__tablename__, op, keys)
+
+    @classmethod
+    async def find_one_or_none_by_id(cls, data_id: int, session: AsyncSession, consistent: bool = False):
         # Найти запись по ID
         logger.info(f"Поиск {cls.model.__name__} с ID: {data_id}")
         try:
-            query = select(cls.model).filter_by(id=data_id)
-            result = await session.execute(query)
+            query = cls._statement("select", (("id", False),),
+                                   lambda: select(cls.model).where(*cls._criteria((("id", False),))))
+            result = await cls._execute_read(session, query, consistent, {"f_id": data_id})
             record = result.scalar_one_or_none()
             if record:
                 logger.info(f"Запись с ID {data_id} найдена.")
@@ -33,13 +216,14 @@ class BaseDAO(Generic[T]):
             raise
 
     @classmethod
-    async def find_one_or_none(cls, session: AsyncSession, filters: BaseModel):
+    async def find_one_or_none(cls, session: AsyncSession, filters: Data, consistent: bool = False):
         # Найти одну запись по фильтрам
-        filter_dict = filters.model_dump(exclude_unset=True)
+        filter_dict = as_dict(filters)
         logger.info(f"Поиск одной записи {cls.model.__name__} по фильтрам: {filter_dict}")
         try:
-            query = select(cls.model).filter_by(**filter_dict)
-            result = await session.execute(query)
+            signature = _signature(filter_dict)
+            query = cls._statement("select", signature, lambda: select(cls.model).where(*cls._criteria(signature)))
+            result = await cls._execute_read(session, query, consistent, _filter_params(filter_dict))
             record = result.scalar_one_or_none()
             if record:
                 logger.info(f"Запись найдена по фильтрам: {filter_dict}")
@@ -51,13 +235,19 @@ class BaseDAO(Generic[T]):
             raise
 
     @classmethod
-    async def find_all(cls, session: AsyncSession, filters: BaseModel):
-        # Найти все записи по фильтрам
-        filter_dict = filters.model_dump(exclude_unset=True)
+    async def find_all(cls, session: AsyncSession, filters: Data, consistent: bool = False,
+                       since: Optional[datetime] = None, until: Optional[datetime] = None):
+        # Найти все записи по фильтрам; since/until ограничивают время создания записей
+        filter_dict = as_dict(filters)
         logger.info(f"Поиск всех записей {cls.model.__name__} по фильтрам: {filter_dict}")
         try:
-            query = select(cls.model).filter_by(**filter_dict)
-            result = await session.execute(query)
+            signature = _signature(filter_dict)
+            bounds = (since is not None, until is not None)
+            query = cls._statement("select_all", (signature, bounds), lambda: (
+                select(cls.model).where(*cls._criteria(signature), *cls._time_criteria(bounds))
+            ))
+            params = {**_filter_params(filter_dict), **_time_params(since, until)}
+            result = await cls._execute_read(session, query, consistent, params)
             records = result.scalars().all()
             logger.info(f"Найдено {len(records)} записей.")
             return records
@@ -66,13 +256,14 @@ class BaseDAO(Generic[T]):
             raise
 
     @classmethod
-    async def add(cls, session: AsyncSession, values: BaseModel):
+    async def add(cls, session: AsyncSession, values: Data):
         # Добавить одну запись
-        values_dict = values.model_dump(exclude_unset=True)
+        values_dict = as_dict(values)
         logger.info(f"Добавление записи {cls.model.__name__} с параметрами: {values_dict}")
         new_instance = cls.model(**values_dict)
         session.add(new_instance)
         try:
+            await cls._publish_invalidation(session, "insert", values_dict)
             await session.commit()
             logger.info(f"Запись {cls.model.__name__} успешно добавлена.")
         except SQLAlchemyError as e:
@@ -82,13 +273,14 @@ class BaseDAO(Generic[T]):
         return new_instance
 
     @classmethod
-    async def add_many(cls, session: AsyncSession, instances: List[BaseModel]):
+    async def add_many(cls, session: AsyncSession, instances: List[Data]):
         # Добавить несколько записей
-        values_list = [item.model_dump(exclude_unset=True) for item in instances]
+        values_list = [as_dict(item) for item in instances]
         logger.info(f"Добавление нескольких записей {cls.model.__name__}. Количество: {len(values_list)}")
         new_instances = [cls.model(**values) for values in values_list]
         session.add_all(new_instances)
         try:
+            await cls._publish_invalidation(session, "insert", *values_list)
             await session.commit()
             logger.info(f"Успешно добавлено {len(new_instances)} записей.")
         except SQLAlchemyError as e:
@@ -98,39 +290,50 @@ class BaseDAO(Generic[T]):
         return new_instances
 
     @classmethod
-    async def update(cls, session: AsyncSession, filters: BaseModel, values: BaseModel):
+    async def update(cls, session: AsyncSession, filters: Data, values: Data):
         # Обновить записи по фильтрам
-        filter_dict = filters.model_dump(exclude_unset=True)
-        values_dict = values.model_dump(exclude_unset=True)
+        filter_dict = as_dict(filters)
+        values_dict = as_dict(values)
         logger.info(f"Обновление записей {cls.model.__name__} по фильтру: {filter_dict} с параметрами: {values_dict}")
-        query = (
-            sqlalchemy_update(cls.model)
-            .where(*[getattr(cls.model, k) == v for k, v in filter_dict.items()])
-            .values(**values_dict)
-            .execution_options(synchronize_session="fetch")
-        )
+        signature = (_signature(filter_dict), tuple(sorted(values_dict)))
+        params = {**_filter_params(filter_dict), **{f"v_{key}": value for key, value in values_dict.items()}}
         try:
-            result = await session.execute(query)
+            query = cls._statement("update", signature, lambda: (
+                sqlalchemy_update(cls.model)
+                .where(*cls._criteria(signature[0]))
+                .values({key: bindparam(f"v_{key}") for key in signature[1]})
+                .returning(cls.model.id)
+                .execution_options(synchronize_session=False)
+            ))
+            updated_ids = (await session.execute(query, params)).scalars().all()
+            for data_id in updated_ids:
+                cls._synchronize(session, data_id, values_dict)
+            await cls._publish_invalidation(session, "update", filter_dict, values_dict,
+                                            targeted=bool(cls._key_columns() & filter_dict.keys()))
             await session.commit()
-            logger.info(f"Обновлено {result.rowcount} записей.")
-            return result.rowcount
+            logger.info(f"Обновлено {len(updated_ids)} записей.")
+            return len(updated_ids)
         except SQLAlchemyError as e:
             await session.rollback()
             logger.error(f"Ошибка при обновлении записей: {e}")
             raise e
 
     @classmethod
-    async def delete(cls, session: AsyncSession, filters: BaseModel):
+    async def delete(cls, session: AsyncSession, filters: Data):
         # Удалить записи по фильтру
-        filter_dict = filters.model_dump(exclude_unset=True)
+        filter_dict = as_dict(filters)
         logger.info(f"Удаление записей {cls.model.__name__} по фильтру: {filter_dict}")
         if not filter_dict:
             logger.error("Нужен хотя бы один фильтр для удаления.")
             raise ValueError("Нужен хотя бы один фильтр для удаления.")
 
-        query = sqlalchemy_delete(cls.model).filter_by(**filter_dict)
+        signature = _signature(filter_dict)
         try:
-            result = await session.execute(query)
+            query = cls._statement("delete", signature,
+                                   lambda: sqlalchemy_delete(cls.model).where(*cls._criteria(signature)))
+            result = await session.execute(query, _filter_params(filter_dict))
+            await cls._publish_invalidation(session, "delete", filter_dict,
+                                            targeted=bool(cls._key_columns() & filter_dict.keys()))
             await session.commit()
             logger.info(f"Удалено {result.rowcount} записей.")
             return result.rowcount
@@ -140,13 +343,19 @@ class BaseDAO(Generic[T]):
             raise e
 
     @classmethod
-    async def count(cls, session: AsyncSession, filters: BaseModel):
-        # Подсчитать количество записей
-        filter_dict = filters.model_dump(exclude_unset=True)
+    async def count(cls, session: AsyncSession, filters: Data, consistent: bool = False,
+                    since: Optional[datetime] = None, until: Optional[datetime] = None):
+        # Подсчитать количество записей; since/until ограничивают время создания записей
+        filter_dict = as_dict(filters)
         logger.info(f"Подсчет количества записей {cls.model.__name__} по фильтру: {filter_dict}")
         try:
-            query = select(func.count(cls.model.id)).filter_by(**filter_dict)
-            result = await session.execute(query)
+            signature = _signature(filter_dict)
+            bounds = (since is not None, until is not None)
+            query = cls._statement("count", (signature, bounds), lambda: (
+                select(func.count(cls.model.id)).where(*cls._criteria(signature), *cls._time_criteria(bounds))
+            ))
+            params = {**_filter_params(filter_dict), **_time_params(since, until)}
+            result = await cls._execute_read(session, query, consistent, params)
             count = result.scalar()
             logger.info(f"Найдено {count} записей.")
             return count
@@ -155,14 +364,22 @@ class BaseDAO(Generic[T]):
             raise
 
     @classmethod
-    async def paginate(cls, session: AsyncSession, page: int = 1, page_size: int = 10, filters: BaseModel = None):
-        # Пагинация записей
-        filter_dict = filters.model_dump(exclude_unset=True) if filters else {}
+    async def paginate(cls, session: AsyncSession, page: int = 1, page_size: int = 10, filters: Data = None,
+                       consistent: bool = False, since: Optional[datetime] = None, until: Optional[datetime] = None):
+        # Пагинация записей; since/until ограничивают время создания записей
+        filter_dict = as_dict(filters)
         logger.info(
             f"Пагинация записей {cls.model.__name__} по фильтру: {filter_dict}, страница: {page}, размер страницы: {page_size}")
         try:
-            query = select(cls.model).filter_by(**filter_dict)
-            result = await session.execute(query.offset((page - 1) * page_size).limit(page_size))
+            signature = _signature(filter_dict)
+            bounds = (since is not None, until is not None)
+            query = cls._statement("paginate", (signature, bounds), lambda: (
+                select(cls.model).where(*cls._criteria(signature), *cls._time_criteria(bounds))
+                .offset(bindparam("offset")).limit(bindparam("limit"))
+            ))
+            params = {**_filter_params(filter_dict), **_time_params(since, until),
+                      "offset": (page - 1) * page_size, "limit": page_size}
+            result = await cls._execute_read(session, query, consistent, params)
             records = result.scalars().all()
             logger.info(f"Найдено {len(records)} записей на странице {page}.")
             return records
@@ -171,12 +388,14 @@ class BaseDAO(Generic[T]):
             raise
 
     @classmethod
-    async def find_by_ids(cls, session: AsyncSession, ids: List[int]) -> List[Any]:
+    async def find_by_ids(cls, session: AsyncSession, ids: List[int], consistent: bool = False) -> List[Any]:
         """Найти несколько записей по списку ID"""
         logger.info(f"Поиск записей {cls.model.__name__} по списку ID: {ids}")
         try:
-            query = select(cls.model).filter(cls.model.id.in_(ids))
-            result = await session.execute(query)
+            query = cls._statement("select_ids", (), lambda: (
+                select(cls.model).where(cls.model.id.in_(bindparam("ids", expanding=True)))
+            ))
+            result = await cls._execute_read(session, query, consistent, {"ids": list(ids)})
             records = result.scalars().all()
             logger.info(f"Найдено {len(records)} записей по списку ID.")
             return records
@@ -185,18 +404,19 @@ class BaseDAO(Generic[T]):
             raise
 
     @classmethod
-    async def upsert(cls, session: AsyncSession, unique_fields: List[str], values: BaseModel):
+    async def upsert(cls, session: AsyncSession, unique_fields: List[str], values: Data):
         """Создать запись или обновить существующую"""
-        values_dict = values.model_dump(exclude_unset=True)
+        values_dict = as_dict(values)
         filter_dict = {field: values_dict[field] for field in unique_fields if field in values_dict}
 
         logger.info(f"Upsert для {cls.model.__name__}")
         try:
-            existing = await cls.find_one_or_none(session, BaseModel.construct(**filter_dict))
+            existing = await cls.find_one_or_none(session, filter_dict, consistent=True)
             if existing:
                 # Обновляем существующую запись
                 for key, value in values_dict.items():
                     setattr(existing, key, value)
+                await cls._publish_invalidation(session, "update", {"id": existing.id}, values_dict)
                 await session.commit()
                 logger.info(f"Обновлена существующая запись {cls.model.__name__}")
                 return existing
@@ -204,6 +424,7 @@ class BaseDAO(Generic[T]):
                 # Создаем новую запись
                 new_instance = cls.model(**values_dict)
                 session.add(new_instance)
+                await cls._publish_invalidation(session, "insert", values_dict)
                 await session.commit()
                 logger.info(f"Создана новая запись {cls.model.__name__}")
                 return new_instance
@@ -213,25 +434,34 @@ class BaseDAO(Generic[T]):
             raise
 
     @classmethod
-    async def bulk_update(cls, session: AsyncSession, records: List[BaseModel]) -> int:
+    async def bulk_update(cls, session: AsyncSession, records: List[Data]) -> int:
         """Массовое обновление записей"""
         logger.info(f"Массовое обновление записей {cls.model.__name__}")
         try:
             updated_count = 0
+            updated_rows = []
             for record in records:
-                record_dict = record.model_dump(exclude_unset=True)
+                record_dict = as_dict(record)
                 if 'id' not in record_dict:
                     continue
 
                 update_data = {k: v for k, v in record_dict.items() if k != 'id'}
-                stmt = (
+                columns = tuple(sorted(update_data))
+                stmt = cls._statement("update_by_id", columns, lambda: (
                     sqlalchemy_update(cls.model)
-                    .filter_by(id=record_dict['id'])
-                    .values(**update_data)
-                )
-                result = await session.execute(stmt)
+                    .where(cls.model.id == bindparam("f_id"))
+                    .values({key: bindparam(f"v_{key}") for key in columns})
+                    .execution_options(synchronize_session=False)
+                ))
+                params = {"f_id": record_dict['id'], **{f"v_{key}": value for key, value in update_data.items()}}
+                result = await session.execute(stmt, params)
+                if result.rowcount:
+                    cls._synchronize(session, record_dict['id'], update_data)
                 updated_count += result.rowcount
+                updated_rows.append(record_dict)
 
+            if updated_rows:
+                await cls._publish_invalidation(session, "update", *updated_rows)
             await session.commit()
             logger.info(f"Обновлено {updated_count} записей")
             return updated_count
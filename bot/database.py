@@ -1,20 +1,166 @@
+import asyncio
 from datetime import datetime
-from functools import wraps
+from functools import lru_cache, wraps
+from typing import Any, Optional
 
-from bot.config import database_url
-from sqlalchemy import func, TIMESTAMP, Integer, text
-from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase
-from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine, AsyncSession
+from loguru import logger
+from sqlalchemy import Engine, Select, func, TIMESTAMP, Integer, text
+from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase, Session
+from sqlalchemy.ext.asyncio import AsyncAttrs, AsyncEngine, async_sessionmaker, create_async_engine, AsyncSession
 
-engine = create_async_engine(url=database_url)
-async_session_maker = async_sessionmaker(engine, class_=AsyncSession)
+
+@lru_cache(maxsize=None)
+def get_engine() -> AsyncEngine:
+    """
+    Создает движок базы данных при первом обращении.
+
+    :return: Асинхронный движок SQLAlchemy.
+    """
+    from bot.config import database_url
+
+    return create_async_engine(url=database_url)
+
+
+@lru_cache(maxsize=None)
+def get_replica_engine() -> Optional[AsyncEngine]:
+    """
+    Создает движок реплики для чтения, если задан DB_REPLICA_URL.
+
+    :return: Асинхронный движок реплики или None.
+    """
+    from bot.config import settings
+
+    if not settings.DB_REPLICA_URL:
+        return None
+    return create_async_engine(url=settings.DB_REPLICA_URL)
+
+
+class ReplicaMonitor:
+    """
+    Следит за доступностью и отставанием реплики.
+
+    Пока реплика не проверена, недоступна или отстает больше DB_REPLICA_MAX_LAG секунд,
+    все запросы идут в основную базу. Отставание измеряется только для PostgreSQL; реплика
+    другого типа (файл SQLite для локальной проверки) считается исправной, пока доступна,
+    поэтому она должна быть копией основной базы.
+
+    Attributes:
+        healthy (bool): Можно ли сейчас читать с реплики.
+        lag (Optional[float]): Последнее измеренное отставание в секундах.
+    """
+
+    # Отставание считается нулевым, если реплика воспроизвела все полученные WAL-записи
+    _PG_LAG_QUERY = text(
+        "SELECT CASE"
+        " WHEN NOT pg_is_in_recovery() THEN 0"
+        " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+        " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+        " END"
+    )
+
+    def __init__(self) -> None:
+        self.healthy = False
+        self.lag: Optional[float] = None
+
+    async def check(self) -> bool:
+        """
+        Измеряет отставание реплики и обновляет флаг healthy.
+
+        :return: Значение healthy после проверки.
+        """
+        from bot.config import settings
+
+        engine = get_replica_engine()
+        if engine is None:
+            self.healthy = False
+            return False
+        try:
+            async with engine.connect() as conn:
+                query = self._PG_LAG_QUERY if engine.dialect.name == "postgresql" else text("SELECT 0")
+                self.lag = float((await conn.execute(query)).scalar() or 0)
+        except Exception as e:
+            if self.healthy:
+                logger.error(f"Реплика недоступна, чтение переключено на основную базу: {e}")
+            self.healthy, self.lag = False, None
+            return False
+
+        healthy = self.lag <= settings.DB_REPLICA_MAX_LAG
+        if healthy != self.healthy:
+            logger.warning(f"Реплика {'доступна' if healthy else 'отстает'} (lag={self.lag:.1f} с)")
+        self.healthy = healthy
+        return healthy
+
+    async def run(self) -> None:
+        """
+        Периодически проверяет реплику каждые DB_REPLICA_CHECK_INTERVAL секунд.
+        """
+        from bot.config import settings
+
+        while True:
+            await self.check()
+            await asyncio.sleep(settings.DB_REPLICA_CHECK_INTERVAL)
+
+
+replica_monitor = ReplicaMonitor()
+
+
+class RoutingSession(Session):
+    """
+    Сессия, отправляющая чтение на реплику, а запись - в основную базу.
+
+    В основную базу также идут: чтение внутри сессии после записи (read-your-writes),
+    чтение с bind_arguments={"consistent": True} и любые запросы, пока реплика нездорова.
+    """
+
+    def get_bind(self, mapper=None, clause=None, consistent: bool = False, **kw) -> Engine:
+        primary = get_engine().sync_engine
+        if self._flushing or not isinstance(clause, Select):
+            self.info["wrote"] = True
+            return primary
+        replica = get_replica_engine()
+        if replica is None or consistent or self.info.get("wrote") or not replica_monitor.healthy:
+            return primary
+        return replica.sync_engine
+
+
+@lru_cache(maxsize=None)
+def get_session_maker() -> async_sessionmaker[AsyncSession]:
+    """
+    Создает фабрику сессий при первом обращении.
+
+    :return: Фабрика асинхронных сессий.
+    """
+    # Объекты остаются доступными после коммита: повторная загрузка атрибута в asyncio
+    # потребовала бы неявного запроса к базе
+    if get_replica_engine() is not None:
+        return async_sessionmaker(class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False)
+    return async_sessionmaker(get_engine(), class_=AsyncSession, expire_on_commit=False)
+
+
+async def dispose_engine() -> None:
+    """
+    Закрывает пулы соединений основной базы и реплики, если движки уже были созданы.
+    """
+    if get_replica_engine.cache_info().currsize and get_replica_engine() is not None:
+        await get_replica_engine().dispose()
+    if get_engine.cache_info().currsize:
+        await get_engine().dispose()
+
+
+def __getattr__(name: str) -> Any:
+    # Обратная совместимость: engine и async_session_maker создаются лениво
+    if name == "engine":
+        return get_engine()
+    if name == "async_session_maker":
+        return get_session_maker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def connection(isolation_level=None):
     def decorator(method):
         @wraps(method)
         async def wrapper(*args, **kwargs):
-            async with async_session_maker() as session:
+            async with get_session_maker()() as session:
                 try:
                     # Устанавливаем уровень изоляции, если передан
                     if isolation_level:
@@ -33,6 +179,21 @@ def connection(isolation_level=None):
     return decorator
 
 
+def partitioned_by_month(column: str = "created_at") -> dict:
+    """
+    Аргументы таблицы (последний элемент __table_args__) для помесячного партиционирования по column.
+
+    В PostgreSQL такая таблица создается миграцией как PARTITION BY RANGE (column) с первичным ключом
+    (id, column), а партиции на следующие месяцы создает и старые удаляет bot.partitions. В модели
+    первичным ключом остается id: он уникален благодаря общей последовательности, а в остальных базах
+    таблица остается обычной.
+
+    :param column: Столбец времени, по которому таблица делится на партиции.
+    :return: Словарь аргументов таблицы.
+    """
+    return {"info": {"partition_by": column}}
+
+
 class Base(AsyncAttrs, DeclarativeBase):
     __abstract__ = True  # Базовый класс будет абстрактным, чтобы не создавать отдельную таблицу для него
 
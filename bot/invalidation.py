@@ -0,0 +1,160 @@
+import asyncio
+import secrets
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from bot import json_codec
+from bot.database import get_engine
+
+# Канал Postgres, через который экземпляры бота обмениваются сообщениями об изменениях
+CHANNEL = "cache_invalidation"
+# Предел полезной нагрузки NOTIFY - 8000 байт; более длинные сообщения отправляются без ключей
+_MAX_PAYLOAD = 7900
+# Период проверки соединения слушателя, секунды
+_PING_INTERVAL = 30.0
+
+Keys = Optional[Dict[str, List[Any]]]
+# Обработчик получает операцию (insert, update, delete) и ключи измененных строк;
+# keys=None означает "изменено неизвестно что" - нужно сбросить все, что относится к таблице
+Handler = Callable[[str, Keys], None]
+
+
+class CacheInvalidator:
+    """
+    Согласование in-process кэшей между экземплярами бота через LISTEN/NOTIFY.
+
+    Запись через BaseDAO добавляет в свою транзакцию pg_notify: Postgres доставляет
+    уведомление только после коммита и отбрасывает его при откате. Свой экземпляр
+    сбрасывает кэши сразу после коммита, не дожидаясь уведомления. После (пере)подключения
+    слушателя сбрасываются все кэши, так как уведомления за время разрыва потеряны.
+
+    Attributes:
+        channel (str): Канал уведомлений.
+        origin (str): Идентификатор экземпляра; свои уведомления слушатель пропускает.
+    """
+
+    def __init__(self, channel: str = CHANNEL) -> None:
+        self.channel = channel
+        self.origin = secrets.token_hex(4)
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+
+    def subscribe(self, table: str, handler: Handler) -> None:
+        """
+        Регистрирует обработчик изменений таблицы.
+
+        :param table: Имя таблицы.
+        :param handler: Функция, удаляющая устаревшие записи кэша.
+        """
+        self._handlers[table].append(handler)
+
+    def dispatch(self, table: str, op: str, keys: Keys) -> None:
+        """
+        Вызывает обработчики таблицы; ошибка одного обработчика не мешает остальным.
+
+        :param table: Имя таблицы.
+        :param op: Операция.
+        :param keys: Ключи измененных строк или None.
+        """
+        for handler in self._handlers.get(table, ()):
+            try:
+                handler(op, keys)
+            except Exception as e:
+                logger.error(f"Ошибка сброса кэша для таблицы {table}: {e}")
+
+    def evict_all(self) -> None:
+        """
+        Сбрасывает все подписанные кэши.
+        """
+        for table in list(self._handlers):
+            self.dispatch(table, "update", None)
+
+    async def publish(self, session: AsyncSession, table: str, op: str, keys: Keys) -> None:
+        """
+        Ставит сообщение об изменении в текущую транзакцию сессии.
+
+        :param session: Сессия, в которой выполняется запись.
+        :param table: Имя таблицы.
+        :param op: Операция: insert, update или delete.
+        :param keys: Значения ключевых столбцов измененных строк или None.
+        """
+        session.info.setdefault("invalidations", []).append((table, op, keys))
+        if get_engine().dialect.name != "postgresql":
+            return
+        payload = json_codec.dumps({"o": self.origin, "t": table, "op": op, "k": keys})
+        if len(payload.encode()) > _MAX_PAYLOAD:
+            payload = json_codec.dumps({"o": self.origin, "t": table, "op": op, "k": None})
+        await session.execute(text("SELECT pg_notify(:channel, :payload)"),
+                              {"channel": self.channel, "payload": payload})
+
+    def _on_notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        try:
+            message = json_codec.loads(payload)
+        except ValueError:
+            logger.warning(f"Некорректное сообщение в канале {channel}: {payload[:200]}")
+            return
+        if message.get("o") == self.origin:
+            return
+        self.dispatch(message.get("t"), message.get("op", "update"), message.get("k"))
+
+    async def run(self) -> None:
+        """
+        Слушает канал уведомлений, переподключаясь с экспоненциальной задержкой.
+        Для баз, отличных от PostgreSQL (asyncpg), ничего не делает.
+        """
+        engine = get_engine()
+        if engine.dialect.name != "postgresql" or engine.dialect.driver != "asyncpg":
+            logger.info("Межпроцессный сброс кэшей отключен: требуется PostgreSQL (asyncpg).")
+            return
+
+        delay = 1.0
+        while True:
+            started = asyncio.get_running_loop().time()
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Слушатель {self.channel} отключен: {e}; повтор через {delay:.0f} с")
+            if asyncio.get_running_loop().time() - started > 60:
+                # Соединение долго работало - начинаем отсчет задержек заново
+                delay = 1.0
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+    async def _listen(self) -> None:
+        async with get_engine().connect() as conn:
+            raw = (await conn.get_raw_connection()).driver_connection
+            lost = asyncio.Event()
+            raw.add_termination_listener(lambda _: lost.set())
+            try:
+                await raw.add_listener(self.channel, self._on_notify)
+                self.evict_all()
+                logger.info(f"Подписка на канал {self.channel} установлена.")
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), timeout=_PING_INTERVAL)
+                    except asyncio.TimeoutError:
+                        await raw.execute("SELECT 1")
+                raise ConnectionError("соединение с базой данных потеряно")
+            finally:
+                # Соединение с подпиской не возвращаем в пул
+                await conn.invalidate()
+
+
+cache_invalidator = CacheInvalidator()
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_after_commit(session: Session) -> None:
+    for table, op, keys in session.info.pop("invalidations", ()):
+        cache_invalidator.dispatch(table, op, keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop("invalidations", None)
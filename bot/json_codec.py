@@ -0,0 +1,73 @@
+import json
+from typing import Any, Callable, NamedTuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+
+class JsonCodec(NamedTuple):
+    """
+    Пара функций сериализации JSON.
+
+    Attributes:
+        name (str): Название кодека.
+        loads (Callable[[str | bytes], Any]): Разбор JSON.
+        dumps (Callable[[Any], str]): Сериализация в строку JSON.
+    """
+    name: str
+    loads: Callable[[str | bytes], Any]
+    dumps: Callable[[Any], str]
+
+
+def _orjson_dumps(obj: Any) -> str:
+    return orjson.dumps(obj).decode()
+
+
+STDLIB_CODEC = JsonCodec("json", json.loads, lambda obj: json.dumps(obj, ensure_ascii=False))
+ORJSON_CODEC = JsonCodec("orjson", orjson.loads, _orjson_dumps) if orjson is not None else None
+
+_codec: JsonCodec = ORJSON_CODEC or STDLIB_CODEC
+
+
+def use_codec(name: str) -> JsonCodec:
+    """
+    Выбирает кодек JSON для всего приложения.
+
+    :param name: "auto" (orjson, если установлен), "orjson" или "json".
+    :return: Выбранный кодек.
+    :raises ValueError: Если кодек неизвестен или не установлен.
+    """
+    global _codec
+    if name == "auto":
+        _codec = ORJSON_CODEC or STDLIB_CODEC
+    elif name == "orjson":
+        if ORJSON_CODEC is None:
+            raise ValueError("Кодек orjson недоступен: пакет orjson не установлен")
+        _codec = ORJSON_CODEC
+    elif name == "json":
+        _codec = STDLIB_CODEC
+    else:
+        raise ValueError(f"Неизвестный кодек JSON: {name}")
+    return _codec
+
+
+def loads(data: str | bytes) -> Any:
+    """
+    Разбирает JSON текущим кодеком.
+
+    :param data: Строка или байты JSON.
+    :return: Разобранный объект.
+    """
+    return _codec.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """
+    Сериализует объект в строку JSON текущим кодеком.
+
+    :param obj: Объект для сериализации.
+    :return: Строка JSON.
+    """
+    return _codec.dumps(obj)
@@ -0,0 +1,106 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Coroutine, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from loguru import logger
+
+
+class TaskTracker:
+    """
+    Набор отслеживаемых asyncio-задач, которые нужно дождаться при остановке бота.
+
+    Attributes:
+        name (str): Имя набора для логов.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._tasks: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def track(self, task: asyncio.Task) -> None:
+        """
+        Добавляет задачу в набор; по завершении она удаляется автоматически.
+
+        :param task: Отслеживаемая задача.
+        """
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def spawn(self, coro: Coroutine[Any, Any, Any], name: str | None = None) -> asyncio.Task:
+        """
+        Запускает корутину в фоне и отслеживает ее.
+
+        :param coro: Корутина для запуска.
+        :param name: Имя задачи.
+        :return: Созданная задача.
+        """
+        task = asyncio.create_task(coro, name=name)
+        task.add_done_callback(self._log_failure)
+        self.track(task)
+        return task
+
+    async def drain(self, timeout: float) -> int:
+        """
+        Ждет завершения задач не дольше timeout секунд, оставшиеся отменяет.
+
+        :param timeout: Максимальное время ожидания в секундах.
+        :return: Количество задач, которые пришлось отменить.
+        """
+        current = asyncio.current_task()
+        pending = {task for task in self._tasks if task is not current}
+        if not pending:
+            return 0
+
+        logger.info(f"Ожидание завершения {len(pending)} задач ({self.name}), не дольше {timeout} с.")
+        _, pending = await asyncio.wait(pending, timeout=max(timeout, 0))
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning(f"Отменено {len(pending)} незавершенных задач ({self.name}).")
+        return len(pending)
+
+    async def cancel_all(self) -> None:
+        """
+        Отменяет все задачи набора и дожидается их завершения.
+        """
+        current = asyncio.current_task()
+        tasks = [task for task in self._tasks if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Фоновая задача {task.get_name()} завершилась с ошибкой: {task.exception()}")
+
+
+class InFlightMiddleware(BaseMiddleware):
+    """
+    Внешний middleware, регистрирующий задачу обработки апдейта как выполняющуюся.
+    """
+
+    def __init__(self, tracker: TaskTracker) -> None:
+        self.tracker = tracker
+
+    async def __call__(self,
+                       handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject,
+                       data: Dict[str, Any]) -> Any:
+        task = asyncio.current_task()
+        if task is not None:
+            self.tracker.track(task)
+        return await handler(event, data)
+
+
+# Апдейты, которые сейчас обрабатываются
+in_flight = TaskTracker("handlers")
+# Фоновая работа: уведомления, отложенные записи и т.п.
+background = TaskTracker("background")
+# Бесконечные периодические задачи; отменяются при остановке после завершения обработчиков
+services = TaskTracker("services")
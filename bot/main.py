@@ -1,10 +1,30 @@
 import asyncio
+import secrets
+from urllib.parse import urlsplit
+
 from aiogram import Bot, Dispatcher
 from aiogram.types import BotCommand, BotCommandScopeDefault
 from loguru import logger
 
-from bot.config import bot, admins, dp
+from bot.admin.router import admin_router
+from bot.api.app import start_api, stop_api
+from bot.checks.client import imeicheck_client
+from bot.checks.router import checks_router
+from bot import config
+from bot.config import setup_logging
+from bot.database import dispose_engine, get_replica_engine, replica_monitor
+from bot.json_codec import use_codec
 from bot.echo.router import echo_router
+from bot.invalidation import cache_invalidator
+from bot.lifecycle import InFlightMiddleware, background, in_flight, services
+from bot.partitions import partition_maintenance
+from bot.quotas.utils import usage_counter
+from bot.runtime import run, warm_up
+from bot.stats.utils import stats_rollup
+from bot.traffic.middleware import UpdateRecorderMiddleware
+from bot.traffic.utils import Anonymizer, CaptureWriter
+from bot.updates.middleware import UpdateJournalMiddleware, UpdateSchedulerMiddleware
+from bot.updates.utils import UpdateJournal, UpdateScheduler
 from bot.users.router import user_router
 
 
@@ -15,9 +35,11 @@ async def set_commands() -> None:
     commands = [
         BotCommand(command='start', description='Старт'),
         BotCommand(command='registration', description='Регистрация'),
-        BotCommand(command='send_imei', description='Отправить IMEI')
+        BotCommand(command='send_imei', description='Отправить IMEI'),
+        BotCommand(command='full_report', description='Сводный отчет по IMEI'),
+        BotCommand(command='history', description='История проверок')
     ]
-    await bot.set_my_commands(commands, BotCommandScopeDefault())
+    await config.bot.set_my_commands(commands, BotCommandScopeDefault())
 
 
 async def set_description(bot: Bot) -> None:
@@ -32,46 +54,161 @@ async def set_description(bot: Bot) -> None:
                                  f'информации об устройстве по его IMEI')
 
 
-async def start_bot(bot: Bot) -> None:
+async def notify_admins(bot: Bot, text: str) -> None:
     """
-    Функция, которая выполнится, когда бот запустится.
+    Отправляет сообщение всем администраторам одновременно.
 
     :param bot: Экземпляр бота.
+    :param text: Текст сообщения.
     """
-    await set_commands()
-    await set_description(bot)
+    results = await asyncio.gather(*(bot.send_message(admin_id, text) for admin_id in config.admins),
+                                   return_exceptions=True)
+    for admin_id, result in zip(config.admins, results):
+        if isinstance(result, Exception):
+            logger.error(f"Не удалось отправить сообщение администратору {admin_id}: {result}")
 
-    for admin_id in admins:
-        try:
-            await bot.send_message(admin_id, f'Я запущен🥳.')
-        except Exception as e:
-            logger.error(f"Не удалось отправить сообщение администратору {admin_id}: {e}")
 
-    logger.info("Бот успешно запущен.")
+async def announce_startup(bot: Bot) -> None:
+    """
+    Настраивает меню и описание бота и уведомляет администраторов о запуске.
 
+    :param bot: Экземпляр бота.
+    """
+    try:
+        await asyncio.gather(set_commands(), set_description(bot))
+    except Exception as e:
+        logger.error(f"Не удалось настроить меню или описание бота: {e}")
+    await notify_admins(bot, 'Я запущен🥳.')
 
-async def stop_bot() -> None:
+
+async def warm_up_connections(bot: Bot) -> None:
     """
-    Функция, которая выполнится, когда бот завершит свою работу.
+    Открывает keep-alive соединения с Telegram и imeicheck.net до первых запросов пользователей.
+
+    :param bot: Экземпляр бота.
+    """
+    connections = config.settings.HTTP_WARMUP_CONNECTIONS
+    api_base = urlsplit(bot.session.api.base)
+    telegram = await bot.session.create_session()
+    opened = await asyncio.gather(warm_up(telegram, f"{api_base.scheme}://{api_base.netloc}", connections),
+                                  imeicheck_client.warm_up(connections))
+    logger.info(f"Открыто соединений: Telegram - {opened[0]}, imeicheck.net - {opened[1]}")
+
+
+async def start_bot(bot: Bot, dispatcher: Dispatcher) -> None:
     """
+    Функция, которая выполнится, когда бот запустится.
+    Запросы к Telegram выполняются в фоне и не задерживают начало polling.
+
+    :param bot: Экземпляр бота.
+    :param dispatcher: Диспетчер (хранит runner HTTP API для остановки).
+    """
+    if get_replica_engine() is not None:
+        services.spawn(replica_monitor.run(), name="replica_monitor")
+    services.spawn(cache_invalidator.run(), name="cache_invalidator")
     try:
-        for admin_id in admins:
-            await bot.send_message(admin_id, 'Бот остановлен. За что?😔')
+        await usage_counter.load()
     except Exception as e:
-        logger.error(f"Не удалось отправить сообщение администратору при остановке: {e}")
+        logger.error(f"Не удалось загрузить счетчики использования: {e}")
+    services.spawn(usage_counter.run(), name="usage_counter")
+    services.spawn(stats_rollup.run(), name="stats_rollup")
+    services.spawn(partition_maintenance.run(), name="partition_maintenance")
+    if config.settings.API_ENABLED:
+        dispatcher["api_runner"] = await start_api()
+    if config.settings.PERFORMANCE_PROFILE:
+        background.spawn(warm_up_connections(bot), name="warm_up_connections")
+    background.spawn(announce_startup(bot), name="announce_startup")
+    logger.info(f"Бот успешно запущен (event loop: {type(asyncio.get_running_loop()).__module__}).")
+
+
+async def stop_bot(bot: Bot, dispatcher: Dispatcher) -> None:
+    """
+    Функция, которая выполнится, когда бот завершит свою работу.
 
+    К этому моменту polling уже остановлен и новые апдейты не принимаются.
+    Останавливает HTTP API, ожидает выполняющиеся обработчики и фоновые задачи
+    не дольше SHUTDOWN_TIMEOUT, после чего закрывает HTTP-сессию и пул соединений с базой данных.
+
+    :param bot: Экземпляр бота.
+    :param dispatcher: Диспетчер.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + config.settings.SHUTDOWN_TIMEOUT
+
+    api_runner = dispatcher.workflow_data.pop("api_runner", None)
+    if api_runner is not None:
+        await stop_api(api_runner)
+
+    await in_flight.drain(deadline - loop.time())
+    await background.drain(deadline - loop.time())
+    await services.cancel_all()
+
+    try:
+        await asyncio.wait_for(notify_admins(bot, 'Бот остановлен. За что?😔'),
+                               timeout=max(deadline - loop.time(), 1))
+    except asyncio.TimeoutError:
+        logger.error("Не удалось уведомить администраторов об остановке: истекло время ожидания")
+
+    await imeicheck_client.close()
+    await dispose_engine()
     logger.error("Бот остановлен!")
 
 
+def register_routers(dispatcher: Dispatcher) -> None:
+    """
+    Подключает роутеры к диспетчеру (порядок важен: первым совпавшим обработчиком обрабатывается апдейт).
+
+    :param dispatcher: Диспетчер.
+    """
+    dispatcher.include_router(admin_router)
+    dispatcher.include_router(checks_router)
+    dispatcher.include_router(user_router)
+    dispatcher.include_router(echo_router)
+
+
+def setup_dispatcher(dispatcher: Dispatcher, record_updates: bool) -> UpdateJournal:
+    """
+    Подключает внешние middleware апдейтов и роутеры - путь апдейта, общий для бота и воспроизведения трафика.
+
+    :param dispatcher: Диспетчер.
+    :param record_updates: Записывать ли обезличенный трафик (воспроизведение его не записывает).
+    :return: Журнал апдейтов; загрузить и периодически сбрасывать его должен вызывающий код.
+    """
+    # Учет выполняющихся обработчиков для корректной остановки
+    dispatcher.update.outer_middleware(InFlightMiddleware(in_flight))
+    # Защита от повторной обработки апдейтов после перезапуска
+    update_journal = UpdateJournal(window=config.settings.UPDATES_DEDUP_WINDOW,
+                                   flush_interval=config.settings.UPDATES_FLUSH_INTERVAL)
+    dispatcher.update.outer_middleware(UpdateJournalMiddleware(update_journal))
+    # Запись обезличенного трафика для воспроизведения (python -m bot.traffic.replay)
+    if record_updates:
+        writer = CaptureWriter(directory=config.settings.RECORD_DIR, max_bytes=config.settings.RECORD_MAX_BYTES,
+                               rotate_seconds=config.settings.RECORD_ROTATE_SECONDS)
+        salt = config.settings.RECORD_SALT.get_secret_value().encode() if config.settings.RECORD_SALT else secrets.token_bytes(16)
+        dispatcher.update.outer_middleware(UpdateRecorderMiddleware(writer, Anonymizer(salt)))
+        services.spawn(writer.run(), name="capture_writer")
+    # Ограничение параллельной обработки: лимит на весь бот, строгая очередность внутри чата
+    update_scheduler = UpdateScheduler(concurrency=config.settings.UPDATES_CONCURRENCY,
+                                       max_pending=config.settings.UPDATES_MAX_PENDING,
+                                       max_pending_per_chat=config.settings.UPDATES_MAX_PENDING_PER_CHAT)
+    dispatcher.update.outer_middleware(UpdateSchedulerMiddleware(update_scheduler))
+    dispatcher["update_scheduler"] = update_scheduler
+
+    register_routers(dispatcher)
+    return update_journal
+
+
 async def main() -> None:
     """
     Основная функция для запуска бота.
     Регистрация роутеров и функций.
     """
+    setup_logging()
+    bot, dp = config.bot, config.dp
+    codec = use_codec(config.settings.JSON_CODEC)
+    logger.info(f"Кодек JSON: {codec.name}")
 
-    # Регистрация роутеров
-    dp.include_router(user_router)
-    dp.include_router(echo_router)
+    update_journal = setup_dispatcher(dp, record_updates=config.settings.RECORD_UPDATES)
 
     # Регистрация функций
     dp.startup.register(start_bot)
@@ -79,11 +216,20 @@ async def main() -> None:
 
     # Запуск бота в режиме long polling
     try:
-        await bot.delete_webhook(drop_pending_updates=True)
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        # Апдейты, пришедшие пока бот был остановлен, не сбрасываем: Telegram повторно присылает
+        # последнюю неподтвержденную пачку, и уже обработанные апдейты из нее отсекаются журналом
+        await bot.delete_webhook(drop_pending_updates=False)
+        try:
+            await update_journal.load(bot.id)
+        except Exception as e:
+            logger.error(f"Не удалось загрузить журнал апдейтов, дедупликация только в памяти: {e}")
+        services.spawn(update_journal.run(), name="update_journal")
+
+        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types(), close_bot_session=False)
     finally:
+        # Сессия бота закрывается последней, после HTTP-клиента и базы данных
         await bot.session.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main(), fast_loop=config.settings.PERFORMANCE_PROFILE)
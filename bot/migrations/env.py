@@ -9,6 +9,11 @@ from alembic import context
 
 from bot.database import Base
 from bot.users.models import User
+from bot.checks.models import ImeiCheck
+from bot.updates.models import ProcessedUpdate, UpdateOffset
+from bot.quotas.models import UsageDaily
+from bot.stats.models import StatsHourly
+from bot.partitions import partition_month, partitioned_tables
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -25,6 +30,15 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+
+
+def include_name(name, type_, parent_names) -> bool:
+    # Партиции создает не модель, а миграция и bot.partitions: автогенерация не должна их удалять
+    if type_ == "table":
+        return not any(partition_month(table.name, name) for table in partitioned_tables())
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -47,6 +61,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -56,7 +71,7 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(connection=connection, target_metadata=target_metadata, include_name=include_name)
 
     with context.begin_transaction():
         context.run_migrations()
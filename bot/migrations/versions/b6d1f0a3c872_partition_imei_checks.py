@@ -0,0 +1,105 @@
+"""partition imei_checks by month
+
+Revision ID: b6d1f0a3c872
+Revises: e2f8c4a19b53
+Create Date: 2026-10-19 18:03:52.217604
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d1f0a3c872'
+down_revision: Union[str, None] = 'e2f8c4a19b53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Партиции создаются с запасом; дальше их создает bot.partitions
+PREMAKE_MONTHS = 3
+
+COLUMNS = "user_id, imei, service_id, status, result, id, created_at, updated_at"
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _columns(partitioned: bool) -> list:
+    # id берет значения из прежней последовательности, чтобы сохранить нумерацию
+    return [
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('imei', sa.String(length=15), nullable=False),
+        sa.Column('service_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('imei_checks_id_seq'::regclass)"),
+                  nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        # В партиционированной таблице первичный ключ обязан включать ключ партиционирования
+        sa.PrimaryKeyConstraint('id', 'created_at') if partitioned else sa.PrimaryKeyConstraint('id'),
+    ]
+
+
+def _drop_indexes() -> None:
+    op.drop_index('ix_imei_checks_created_at', table_name='imei_checks')
+    op.drop_index('ix_imei_checks_user_id_id', table_name='imei_checks')
+    op.drop_index('ix_imei_checks_imei_service_id_created_at', table_name='imei_checks')
+
+
+def _create_indexes() -> None:
+    op.create_index('ix_imei_checks_imei_service_id_created_at', 'imei_checks', ['imei', 'service_id', 'created_at'],
+                    unique=False)
+    op.create_index('ix_imei_checks_user_id_id', 'imei_checks', ['user_id', 'id'], unique=False)
+    op.create_index('ix_imei_checks_created_at', 'imei_checks', ['created_at'], unique=False)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        # В остальных базах imei_checks остается обычной таблицей
+        return
+
+    first = bind.execute(sa.text("SELECT min(created_at) FROM imei_checks")).scalar()
+    today = date.today()
+    month = date((first or today).year, (first or today).month, 1)
+    last = date(today.year, today.month, 1)
+    for _ in range(PREMAKE_MONTHS):
+        last = _next_month(last)
+
+    _drop_indexes()
+    op.rename_table('imei_checks', 'imei_checks_unpartitioned')
+    op.execute("ALTER INDEX imei_checks_pkey RENAME TO imei_checks_unpartitioned_pkey")
+
+    op.create_table('imei_checks', *_columns(partitioned=True), postgresql_partition_by='RANGE (created_at)')
+    while month <= last:
+        op.execute(f"CREATE TABLE imei_checks_p{month:%Y_%m} PARTITION OF imei_checks "
+                   f"FOR VALUES FROM ('{month}') TO ('{_next_month(month)}')")
+        month = _next_month(month)
+
+    op.execute("ALTER SEQUENCE imei_checks_id_seq OWNED BY imei_checks.id")
+    op.execute(f"INSERT INTO imei_checks ({COLUMNS}) SELECT {COLUMNS} FROM imei_checks_unpartitioned")
+    op.drop_table('imei_checks_unpartitioned')
+    _create_indexes()
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    _drop_indexes()
+    op.rename_table('imei_checks', 'imei_checks_partitioned')
+    op.execute("ALTER INDEX imei_checks_pkey RENAME TO imei_checks_partitioned_pkey")
+
+    op.create_table('imei_checks', *_columns(partitioned=False))
+    op.execute("ALTER SEQUENCE imei_checks_id_seq OWNED BY imei_checks.id")
+    op.execute(f"INSERT INTO imei_checks ({COLUMNS}) SELECT {COLUMNS} FROM imei_checks_partitioned")
+    # Вместе с родительской таблицей удаляются все ее партиции
+    op.drop_table('imei_checks_partitioned')
+    _create_indexes()
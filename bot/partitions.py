@@ -0,0 +1,216 @@
+import asyncio
+import gzip
+import os
+import re
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import Table, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from bot.database import Base, get_engine
+
+# Ожидание блокировки таблицы при создании и отсоединении партиций: обработчики важнее обслуживания
+LOCK_TIMEOUT = "5s"
+
+_PARTITION_SUFFIX = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+def month_start(moment: datetime | date) -> date:
+    """
+    Возвращает первое число месяца.
+
+    :param moment: Дата или время.
+    :return: Начало месяца.
+    """
+    return date(moment.year, moment.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    """
+    Сдвигает начало месяца на указанное количество месяцев.
+
+    :param month: Начало месяца.
+    :param months: Сдвиг (может быть отрицательным).
+    :return: Начало месяца после сдвига.
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """
+    Имя партиции таблицы за месяц, например imei_checks_p2026_10.
+
+    :param table: Имя партиционированной таблицы.
+    :param month: Начало месяца.
+    :return: Имя партиции.
+    """
+    return f"{table}_p{month:%Y_%m}"
+
+
+def partition_month(table: str, name: str) -> Optional[date]:
+    """
+    Определяет месяц партиции по ее имени.
+
+    :param table: Имя партиционированной таблицы.
+    :param name: Имя таблицы.
+    :return: Начало месяца или None, если name не партиция table.
+    """
+    if not name.startswith(table):
+        return None
+    match = _PARTITION_SUFFIX.fullmatch(name[len(table):])
+    if match is None:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def partitioned_tables() -> List[Table]:
+    """
+    Таблицы моделей, объявленные через partitioned_by_month.
+
+    :return: Список таблиц.
+    """
+    return [table for table in Base.metadata.sorted_tables if "partition_by" in table.info]
+
+
+class PartitionMaintenance:
+    """
+    Обслуживание помесячных партиций в PostgreSQL.
+
+    Каждый проход для каждой партиционированной таблицы:
+        * создает партиции текущего и PARTITION_PREMAKE_MONTHS следующих месяцев,
+          чтобы вставка никогда не ждала DDL;
+        * отсоединяет партиции старше PARTITION_RETENTION_MONTHS полных месяцев, выгружает их
+          командой COPY в PARTITION_ARCHIVE_DIR (CSV, gzip) и удаляет таблицу.
+
+    Удаление партиции - это DROP TABLE без VACUUM и без нагрузки на индексы остальных месяцев.
+    Отсоединенная, но еще не удаленная партиция (например, после сбоя во время выгрузки)
+    будет выгружена и удалена при следующем проходе. Несколько экземпляров бота не мешают
+    друг другу: таблицу обслуживает тот, кто взял advisory-блокировку.
+    """
+
+    async def _partitions(self, conn: AsyncConnection, table: str) -> Dict[date, Tuple[str, bool]]:
+        # Партиции ищутся по имени, поэтому находятся и отсоединенные (relispartition = false)
+        result = await conn.execute(text(
+            "SELECT c.relname, c.relispartition FROM pg_class c"
+            " JOIN pg_namespace n ON n.oid = c.relnamespace"
+            " WHERE n.nspname = current_schema() AND c.relkind = 'r' AND c.relname LIKE :pattern"
+        ), {"pattern": f"{table}%"})
+        partitions = {}
+        for name, attached in result.all():
+            month = partition_month(table, name)
+            if month is not None:
+                partitions[month] = (name, attached)
+        return partitions
+
+    async def _archive(self, conn: AsyncConnection, name: str, archive_dir: Path) -> Path:
+        # COPY идет через asyncpg без построчного разбора; сжатие выполняется в отдельном потоке
+        path = archive_dir / f"{name}.csv.gz"
+        temporary = path.with_suffix(".tmp")
+        raw = (await conn.get_raw_connection()).driver_connection
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        file = gzip.open(temporary, "wb")
+        try:
+            async def write(chunk: bytes) -> None:
+                await asyncio.to_thread(file.write, chunk)
+
+            await raw.copy_from_table(name, output=write, format="csv", header=True)
+        finally:
+            await asyncio.to_thread(file.close)
+        os.replace(temporary, path)
+        return path
+
+    async def maintain_table(self, conn: AsyncConnection, table: Table, today: date) -> None:
+        """
+        Создает недостающие партиции таблицы и удаляет устаревшие.
+
+        :param conn: Соединение с основной базой (вне транзакции).
+        :param table: Партиционированная таблица.
+        :param today: Текущая дата.
+        """
+        from bot.config import settings
+
+        quote = conn.dialect.identifier_preparer.quote
+        current = month_start(today)
+        cutoff = add_months(current, -settings.PARTITION_RETENTION_MONTHS)
+        async with conn.begin():
+            kind = (await conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+                                       {"name": table.name})).scalar()
+            if kind != "p":
+                logger.warning(f"Таблица {table.name} не партиционирована (нужна миграция), обслуживание пропущено.")
+                return
+            await conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+            partitions = await self._partitions(conn, table.name)
+
+            for offset in range(settings.PARTITION_PREMAKE_MONTHS + 1):
+                month = add_months(current, offset)
+                if month in partitions:
+                    continue
+                name = partition_name(table.name, month)
+                await conn.execute(text(
+                    f"CREATE TABLE {quote(name)} PARTITION OF {quote(table.name)}"
+                    f" FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+                ))
+                logger.info(f"Создана партиция {name}")
+
+            expired = []
+            if settings.PARTITION_RETENTION_MONTHS > 0:
+                for month, (name, attached) in sorted(partitions.items()):
+                    if month >= cutoff:
+                        break
+                    if attached:
+                        await conn.execute(text(f"ALTER TABLE {quote(table.name)} DETACH PARTITION {quote(name)}"))
+                    expired.append(name)
+
+        # Отсоединенные партиции уже не видны запросам; выгрузка и удаление не держат блокировок родителя
+        for name in expired:
+            if settings.PARTITION_ARCHIVE_DIR:
+                path = await self._archive(conn, name, Path(settings.PARTITION_ARCHIVE_DIR))
+                logger.info(f"Партиция {name} выгружена в {path}")
+            async with conn.begin():
+                await conn.execute(text(f"DROP TABLE IF EXISTS {quote(name)}"))
+            logger.info(f"Партиция {name} удалена")
+
+    async def maintain(self) -> None:
+        """
+        Обслуживает все партиционированные таблицы.
+        """
+        today = date.today()
+        async with get_engine().connect() as conn:
+            for table in partitioned_tables():
+                key = f"partitions:{table.name}"
+                locked = (await conn.execute(text("SELECT pg_try_advisory_lock(hashtext(:key))"),
+                                             {"key": key})).scalar()
+                await conn.commit()
+                if not locked:
+                    logger.info(f"Партиции {table.name} обслуживает другой экземпляр бота.")
+                    continue
+                try:
+                    await self.maintain_table(conn, table, today)
+                finally:
+                    await conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": key})
+                    await conn.commit()
+
+    async def run(self) -> None:
+        """
+        Обслуживает партиции при запуске и затем каждые PARTITION_MAINTENANCE_INTERVAL секунд.
+        Для баз, отличных от PostgreSQL (asyncpg), ничего не делает.
+        """
+        from bot.config import settings
+
+        engine = get_engine()
+        if engine.dialect.name != "postgresql" or engine.dialect.driver != "asyncpg":
+            logger.info("Обслуживание партиций отключено: требуется PostgreSQL (asyncpg).")
+            return
+        while True:
+            try:
+                await self.maintain()
+            except Exception as e:
+                logger.error(f"Не удалось обслужить партиции: {e}")
+            await asyncio.sleep(settings.PARTITION_MAINTENANCE_INTERVAL)
+
+
+partition_maintenance = PartitionMaintenance()
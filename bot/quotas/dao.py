@@ -0,0 +1,83 @@
+from datetime import date
+from typing import Dict, List, Tuple
+
+from loguru import logger
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from bot.dao.base import BaseDAO, dialect_insert
+from bot.quotas.models import UsageDaily
+from bot.users.models import User
+
+
+class UsageDAO(BaseDAO[UsageDaily]):
+    model = UsageDaily
+
+    @classmethod
+    async def load_since(cls, session: AsyncSession, since: date) -> List[UsageDaily]:
+        """
+        Загружает дневные счетчики всех пользователей начиная с указанной даты.
+
+        :param session: Сессия базы данных.
+        :param since: Первый день периода.
+        :return: Список записей.
+        """
+        try:
+            query = select(cls.model).where(cls.model.day >= since)
+            result = await cls._execute_read(session, query, consistent=True)
+            return list(result.scalars().all())
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при загрузке счетчиков использования с {since}: {e}")
+            raise
+
+    @classmethod
+    async def increment_many(cls, session: AsyncSession, deltas: Dict[Tuple[int, date], int]) -> None:
+        """
+        Прибавляет приращения к дневным счетчикам одним запросом и фиксирует транзакцию.
+
+        :param session: Сессия базы данных.
+        :param deltas: Словарь {(user_id, day): приращение}.
+        """
+        stmt = dialect_insert(cls.model).values([
+            {"user_id": user_id, "day": day, "checks": delta} for (user_id, day), delta in deltas.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "day"],
+            set_={"checks": cls.model.checks + stmt.excluded.checks, "updated_at": func.now()},
+        )
+        try:
+            await session.execute(stmt)
+            await session.commit()
+            logger.info(f"Сохранено {len(deltas)} приращений счетчиков использования.")
+        except SQLAlchemyError as e:
+            await session.rollback()
+            logger.error(f"Ошибка при сохранении счетчиков использования: {e}")
+            raise
+
+    @classmethod
+    async def top_consumers(cls, session: AsyncSession, since: date, limit: int = 10) -> List[Tuple[User, int]]:
+        """
+        Возвращает пользователей с наибольшим числом проверок начиная с указанной даты.
+
+        :param session: Сессия базы данных.
+        :param since: Первый день периода.
+        :param limit: Количество пользователей.
+        :return: Список пар (пользователь, количество проверок).
+        """
+        try:
+            total = func.sum(cls.model.checks).label("total")
+            query = (
+                select(User, total)
+                .join(cls.model, cls.model.user_id == User.id)
+                .where(cls.model.day >= since)
+                .group_by(User.id)
+                .order_by(total.desc())
+                .limit(limit)
+            )
+            result = await cls._execute_read(session, query)
+            return [(user, int(checks)) for user, checks in result.all()]
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при получении самых активных пользователей с {since}: {e}")
+            raise
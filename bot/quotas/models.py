@@ -0,0 +1,24 @@
+from datetime import date
+
+from sqlalchemy import Date, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from bot.database import Base
+
+
+class UsageDaily(Base):
+    """
+    Количество платных проверок пользователя за день.
+
+    Attributes:
+        user_id (int): Идентификатор пользователя (users.id).
+        day (date): День.
+        checks (int): Количество проверок за день.
+    """
+
+    __tablename__ = 'usage_daily'
+    __table_args__ = (UniqueConstraint('user_id', 'day'),)
+
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    day: Mapped[date] = mapped_column(Date, nullable=False, index=True)
+    checks: Mapped[int] = mapped_column(nullable=False, default=0)
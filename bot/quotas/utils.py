@@ -0,0 +1,158 @@
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Tuple
+
+from loguru import logger
+
+from bot import config
+from bot.database import get_session_maker
+from bot.quotas.dao import UsageDAO
+
+
+class QuotaExceeded(Exception):
+    """
+    Пользователь исчерпал квоту проверок.
+
+    Attributes:
+        period (str): Исчерпанный период: "day" или "month".
+        limit (int): Размер квоты.
+    """
+
+    def __init__(self, period: str, limit: int) -> None:
+        self.period = period
+        self.limit = limit
+        super().__init__(f"Исчерпана квота проверок ({period}): {limit}")
+
+
+@dataclass
+class _UserUsage:
+    day: date
+    day_checks: int = 0
+    month_checks: int = 0
+
+
+class UsageCounter:
+    """
+    In-memory счетчики платных проверок с отложенной записью в базу.
+
+    Проверка квоты и списание выполняются синхронно (без await), поэтому атомарны
+    в пределах event loop и не требуют обращения к базе. Приращения копятся
+    и сохраняются пачкой раз в USAGE_FLUSH_INTERVAL секунд.
+    """
+
+    def __init__(self) -> None:
+        self._usage: Dict[int, _UserUsage] = {}
+        self._pending: Dict[Tuple[int, date], int] = defaultdict(int)
+        self._flush_lock = asyncio.Lock()
+
+    def _current(self, user_id: int, today: date) -> _UserUsage:
+        usage = self._usage.get(user_id)
+        if usage is None:
+            usage = self._usage[user_id] = _UserUsage(day=today)
+        elif usage.day != today:
+            # Новый день (и, возможно, новый месяц): сбрасываем счетчики периода
+            if (usage.day.year, usage.day.month) != (today.year, today.month):
+                usage.month_checks = 0
+            usage.day, usage.day_checks = today, 0
+        return usage
+
+    def acquire(self, user_id: int, amount: int = 1) -> date:
+        """
+        Списывает amount проверок из квоты пользователя.
+
+        :param user_id: Идентификатор пользователя (users.id).
+        :param amount: Количество проверок.
+        :return: День списания; его нужно передать в refund.
+        :raises QuotaExceeded: Если дневная или месячная квота будет превышена.
+        """
+        today = date.today()
+        usage = self._current(user_id, today)
+        if config.settings.QUOTA_DAILY and usage.day_checks + amount > config.settings.QUOTA_DAILY:
+            raise QuotaExceeded("day", config.settings.QUOTA_DAILY)
+        if config.settings.QUOTA_MONTHLY and usage.month_checks + amount > config.settings.QUOTA_MONTHLY:
+            raise QuotaExceeded("month", config.settings.QUOTA_MONTHLY)
+        usage.day_checks += amount
+        usage.month_checks += amount
+        self._pending[(user_id, today)] += amount
+        return today
+
+    def refund(self, user_id: int, day: date, amount: int = 1) -> None:
+        """
+        Возвращает проверки в квоту, если платный запрос не состоялся.
+
+        Проверки возвращаются в день списания: запрос, начатый до полуночи и завершившийся
+        после нее, уменьшает счетчик вчерашнего дня, а не сегодняшнего.
+
+        :param user_id: Идентификатор пользователя (users.id).
+        :param day: День списания, который вернул acquire.
+        :param amount: Количество проверок.
+        """
+        usage = self._current(user_id, date.today())
+        if day == usage.day:
+            usage.day_checks = max(usage.day_checks - amount, 0)
+        if (day.year, day.month) == (usage.day.year, usage.day.month):
+            usage.month_checks = max(usage.month_checks - amount, 0)
+        self._pending[(user_id, day)] -= amount
+
+    def usage(self, user_id: int) -> Tuple[int, int]:
+        """
+        Возвращает использование пользователя за текущие день и месяц.
+
+        :param user_id: Идентификатор пользователя (users.id).
+        :return: Пара (проверок за день, проверок за месяц).
+        """
+        usage = self._current(user_id, date.today())
+        return usage.day_checks, usage.month_checks
+
+    async def load(self) -> None:
+        """
+        Загружает счетчики текущего месяца из базы.
+        """
+        today = date.today()
+        async with get_session_maker()() as session:
+            rows = await UsageDAO.load_since(session, since=today.replace(day=1))
+        for row in rows:
+            usage = self._current(row.user_id, today)
+            usage.month_checks += row.checks
+            if row.day == today:
+                usage.day_checks += row.checks
+        logger.info(f"Загружены счетчики использования {len(self._usage)} пользователей.")
+
+    async def flush(self) -> None:
+        """
+        Сохраняет накопленные приращения в базу одним запросом.
+        """
+        async with self._flush_lock:
+            deltas = {key: delta for key, delta in self._pending.items() if delta}
+            self._pending.clear()
+            # Пользователи, не делавшие проверок в текущем месяце, не занимают память
+            today = date.today()
+            for user_id in [user_id for user_id, usage in self._usage.items()
+                            if (usage.day.year, usage.day.month) != (today.year, today.month)]:
+                del self._usage[user_id]
+            if not deltas:
+                return
+            try:
+                async with get_session_maker()() as session:
+                    await UsageDAO.increment_many(session, deltas)
+            except Exception as e:
+                # Возвращаем приращения, чтобы сохранить их при следующем сбросе
+                for key, delta in deltas.items():
+                    self._pending[key] += delta
+                logger.error(f"Не удалось сохранить счетчики использования: {e}")
+
+    async def run(self) -> None:
+        """
+        Периодически сбрасывает счетчики в базу; при отмене выполняет последний сброс.
+        """
+        try:
+            while True:
+                await asyncio.sleep(config.settings.USAGE_FLUSH_INTERVAL)
+                await self.flush()
+        finally:
+            await self.flush()
+
+
+usage_counter = UsageCounter()
@@ -0,0 +1,184 @@
+import asyncio
+import socket
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Coroutine, Dict, List, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp.abc import AbstractResolver, ResolveResult
+from aiohttp.resolver import DefaultResolver
+from aiogram.client.session.aiohttp import AiohttpSession
+from loguru import logger
+
+from bot.cache import TTLCache
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - uvloop необязателен (и недоступен в Windows)
+    uvloop = None
+
+T = TypeVar("T")
+
+
+def run(main: Coroutine[Any, Any, T], fast_loop: bool = False) -> T:
+    """
+    Запускает корутину в новом event loop; при fast_loop - в uvloop, если он установлен.
+
+    :param main: Корутина для запуска.
+    :param fast_loop: Использовать ли uvloop.
+    :return: Результат корутины.
+    """
+    if fast_loop and uvloop is not None:
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            return runner.run(main)
+    if fast_loop:
+        logger.warning("uvloop не установлен, используется стандартный event loop.")
+    return asyncio.run(main)
+
+
+class CachingResolver(AbstractResolver):
+    """
+    DNS-резолвер с общим кэшем для нескольких TCPConnector.
+
+    Одновременные запросы одного имени объединяются в один запрос к DNS.
+
+    Attributes:
+        ttl (float): Время жизни записи в секундах.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024) -> None:
+        self.ttl = ttl
+        self._cache: TTLCache[Tuple[str, int, int], List[ResolveResult]] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight: Dict[Tuple[str, int, int], asyncio.Future] = {}
+        self._resolver: Optional[AbstractResolver] = None
+
+    async def resolve(self, host: str, port: int = 0,
+                      family: socket.AddressFamily = socket.AF_INET) -> List[ResolveResult]:
+        key = (host, port, int(family))
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        if self._resolver is None:
+            # Стандартный резолвер привязывается к работающему event loop, поэтому создается лениво
+            self._resolver = DefaultResolver()
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            addresses = await self._resolver.resolve(host, port, family)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Ошибку получают только ожидающие этот же запрос; не даем ей считаться "не извлеченной"
+            future.exception()
+            raise
+        else:
+            self._cache.set(key, addresses)
+            future.set_result(addresses)
+            return addresses
+        finally:
+            del self._inflight[key]
+
+    async def close(self) -> None:
+        if self._resolver is not None:
+            await self._resolver.close()
+            self._resolver = None
+
+
+@dataclass(frozen=True)
+class ConnectorOptions:
+    """
+    Параметры пула HTTP-соединений (aiohttp.TCPConnector).
+
+    Attributes:
+        limit (int): Максимум одновременных соединений.
+        limit_per_host (int): Максимум соединений с одним хостом (0 - без ограничения).
+        keepalive_timeout (float): Сколько секунд держать неиспользуемое соединение открытым.
+        dns_ttl (int): Время жизни DNS-кэша соединителя в секундах.
+        resolver (Optional[AbstractResolver]): Общий резолвер; если задан, собственный кэш соединителя отключается.
+    """
+    limit: int = 100
+    limit_per_host: int = 0
+    keepalive_timeout: float = 15.0
+    dns_ttl: int = 10
+    resolver: Optional[AbstractResolver] = None
+
+    def connector_kwargs(self) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "keepalive_timeout": self.keepalive_timeout,
+        }
+        if self.resolver is not None:
+            kwargs.update(resolver=self.resolver, use_dns_cache=False)
+        else:
+            kwargs["ttl_dns_cache"] = self.dns_ttl
+        return kwargs
+
+    def connector(self) -> aiohttp.TCPConnector:
+        """
+        Создает соединитель с этими параметрами (требует работающего event loop).
+
+        :return: Новый TCPConnector.
+        """
+        return aiohttp.TCPConnector(**self.connector_kwargs())
+
+
+@lru_cache(maxsize=None)
+def connector_options() -> ConnectorOptions:
+    """
+    Параметры пула соединений из настроек; общий резолвер - только в профиле PERFORMANCE_PROFILE.
+
+    :return: Параметры, общие для сессии бота и клиента imeicheck.net.
+    """
+    from bot.config import settings
+
+    return ConnectorOptions(
+        limit=settings.HTTP_LIMIT,
+        limit_per_host=settings.HTTP_LIMIT_PER_HOST,
+        keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+        dns_ttl=settings.HTTP_DNS_TTL,
+        resolver=CachingResolver(ttl=settings.HTTP_DNS_TTL) if settings.PERFORMANCE_PROFILE else None,
+    )
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """
+    Сессия aiogram с параметрами пула соединений из ConnectorOptions.
+    """
+
+    def __init__(self, options: ConnectorOptions, **kwargs: Any) -> None:
+        super().__init__(limit=options.limit, **kwargs)
+        # AiohttpSession создает TCPConnector из _connector_init (там же SSL-контекст aiogram)
+        self._connector_init.update(options.connector_kwargs())
+
+
+async def warm_up(session: aiohttp.ClientSession, url: str, connections: int) -> int:
+    """
+    Заранее открывает keep-alive соединения с хостом, чтобы первые запросы не ждали DNS, TCP и TLS.
+
+    Запросы HEAD выполняются одновременно, поэтому каждый занимает отдельное соединение,
+    которое после ответа остается в пуле.
+
+    :param session: HTTP-сессия, в пул которой попадут соединения.
+    :param url: Любой URL хоста; используется только его схема и адрес.
+    :param connections: Сколько соединений открыть.
+    :return: Сколько соединений удалось открыть.
+    """
+    parts = urlsplit(url)
+    origin = f"{parts.scheme}://{parts.netloc}/"
+
+    async def touch() -> None:
+        async with session.head(origin, allow_redirects=False) as response:
+            await response.read()
+
+    results = await asyncio.gather(*(touch() for _ in range(connections)), return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        logger.warning(f"Не удалось открыть {len(errors)} соединений с {parts.netloc}: {errors[0]}")
+    return connections - len(errors)
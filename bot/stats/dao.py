@@ -0,0 +1,105 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import func, literal
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from bot.dao.base import BaseDAO, dialect_insert
+from bot.database import Base, get_engine
+from bot.stats.models import StatsHourly
+
+
+def hour_bucket(column):
+    """
+    Выражение «начало часа» для колонки времени в диалекте основной базы.
+
+    :param column: Колонка TIMESTAMP.
+    :return: SQL-выражение.
+    """
+    if get_engine().dialect.name == "sqlite":
+        return func.strftime('%Y-%m-%d %H:00:00', column)
+    return func.date_trunc('hour', column)
+
+
+class StatsDAO(BaseDAO[StatsHourly]):
+    model = StatsHourly
+
+    @classmethod
+    async def last_bucket(cls, session: AsyncSession) -> Optional[datetime]:
+        """
+        Возвращает самый поздний посчитанный час.
+
+        :param session: Сессия базы данных.
+        :return: Начало часа или None, если агрегаты еще не считались.
+        """
+        result = await cls._execute_read(session, select(func.max(cls.model.bucket)), consistent=True)
+        return result.scalar()
+
+    @classmethod
+    async def current_time(cls, session: AsyncSession) -> datetime:
+        """
+        Возвращает время базы данных - тот же источник, что и server_default у created_at.
+
+        :param session: Сессия базы данных.
+        :return: Начало текущей транзакции (PostgreSQL) или текущее время базы, без часового пояса.
+        """
+        # В PostgreSQL now() возвращает timestamptz; localtimestamp - то же время в виде, в котором его хранит TIMESTAMP
+        now = func.localtimestamp() if get_engine().dialect.name == "postgresql" else func.now()
+        result = await cls._execute_read(session, select(now), consistent=True)
+        return result.scalar()
+
+    @classmethod
+    async def refresh_metric(cls, session: AsyncSession, metric: str, source: type[Base],
+                             since: Optional[datetime]) -> None:
+        """
+        Пересчитывает почасовые значения метрики начиная с часа, содержащего since.
+
+        Пересчитываются только затронутые часы (диапазон по индексу created_at),
+        поэтому стоимость не зависит от размера исходной таблицы. Коммит выполняет вызывающий код.
+
+        :param session: Сессия базы данных.
+        :param metric: Название метрики.
+        :param source: Модель, записи которой считаются (по created_at).
+        :param since: Начало пересчета; None - пересчитать все.
+        """
+        bucket = hour_bucket(source.created_at)
+        query = select(bucket, literal(metric), func.count()).group_by(bucket)
+        if since is not None:
+            query = query.where(source.created_at >= since.replace(minute=0, second=0, microsecond=0))
+        stmt = dialect_insert(cls.model).from_select(["bucket", "metric", "value"], query)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["bucket", "metric"],
+            set_={"value": stmt.excluded.value, "updated_at": func.now()},
+        )
+        await session.execute(stmt)
+
+    @classmethod
+    async def summary(cls, session: AsyncSession, today: datetime,
+                      hours_from: datetime) -> Tuple[Dict[str, int], Dict[str, int], List[StatsHourly]]:
+        """
+        Возвращает сводку по агрегатам.
+
+        :param session: Сессия базы данных.
+        :param today: Начало текущего дня.
+        :param hours_from: Начало окна почасовой статистики.
+        :return: Итоги по метрикам за все время, итоги за сегодня и почасовые записи окна.
+        """
+        try:
+            totals_query = select(cls.model.metric, func.sum(cls.model.value)).group_by(cls.model.metric)
+            totals = {metric: int(value) for metric, value in (await cls._execute_read(session, totals_query)).all()}
+
+            today_query = (select(cls.model.metric, func.sum(cls.model.value))
+                           .where(cls.model.bucket >= today).group_by(cls.model.metric))
+            today_totals = {metric: int(value)
+                            for metric, value in (await cls._execute_read(session, today_query)).all()}
+
+            hours_query = (select(cls.model).where(cls.model.bucket >= hours_from)
+                           .order_by(cls.model.bucket, cls.model.metric))
+            hours = list((await cls._execute_read(session, hours_query)).scalars().all())
+            return totals, today_totals, hours
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при получении статистики: {e}")
+            raise
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import String, TIMESTAMP, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from bot.database import Base
+
+
+class StatsHourly(Base):
+    """
+    Почасовой агрегат метрики (количество регистраций, проверок и т.п.).
+
+    Attributes:
+        bucket (datetime): Начало часа.
+        metric (str): Название метрики.
+        value (int): Значение метрики за час.
+    """
+
+    __tablename__ = 'stats_hourly'
+    __table_args__ = (UniqueConstraint('bucket', 'metric'),)
+
+    bucket: Mapped[datetime] = mapped_column(TIMESTAMP, nullable=False)
+    metric: Mapped[str] = mapped_column(String(32), nullable=False)
+    value: Mapped[int] = mapped_column(nullable=False, default=0)
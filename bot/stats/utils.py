@@ -0,0 +1,85 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from loguru import logger
+
+from bot.checks.models import ImeiCheck
+from bot import config
+from bot.database import Base, get_session_maker
+from bot.stats.dao import StatsDAO
+from bot.users.models import User
+
+# Запас на транзакции, начатые до обновления, но зафиксированные после него
+_LATE_COMMIT_MARGIN = timedelta(minutes=5)
+
+# Метрика -> модель, записи которой она считает
+METRICS: Dict[str, type[Base]] = {
+    "users": User,
+    "checks": ImeiCheck,
+}
+
+
+class StatsRollup:
+    """
+    Инкрементальное обновление почасовых агрегатов.
+
+    Каждое обновление пересчитывает только часы начиная с последнего обработанного,
+    поэтому стоит одинаково при любом размере исходных таблиц. Обновление запускается
+    по расписанию и досрочно - после записи (mark_dirty), но не чаще min_interval.
+
+    Attributes:
+        interval (Optional[float]): Период обновления по расписанию в секундах; None - STATS_REFRESH_INTERVAL.
+        min_interval (float): Минимальный интервал между обновлениями в секундах.
+    """
+
+    def __init__(self, interval: Optional[float] = None, min_interval: float = 2.0) -> None:
+        self.interval = interval
+        self.min_interval = min_interval
+        self.watermark: Optional[datetime] = None
+        self._loaded = False
+        self._dirty = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    def mark_dirty(self) -> None:
+        """
+        Сообщает о новой записи в исходные таблицы; агрегаты обновятся в ближайшее время.
+        """
+        self._dirty.set()
+
+    async def refresh(self) -> None:
+        """
+        Пересчитывает агрегаты начиная с часа последнего обновления.
+        """
+        async with self._lock:
+            async with get_session_maker()() as session:
+                # Часы приложения и базы могут расходиться, а created_at ставит база
+                started_at = await StatsDAO.current_time(session)
+                if not self._loaded:
+                    self.watermark = await StatsDAO.last_bucket(session)
+                    self._loaded = True
+                since = self.watermark - _LATE_COMMIT_MARGIN if self.watermark is not None else None
+                for metric, source in METRICS.items():
+                    await StatsDAO.refresh_metric(session, metric=metric, source=source, since=since)
+                await session.commit()
+            self.watermark = started_at
+
+    async def run(self) -> None:
+        """
+        Обновляет агрегаты по расписанию и после записей.
+        """
+        while True:
+            try:
+                interval = self.interval if self.interval is not None else config.settings.STATS_REFRESH_INTERVAL
+                await asyncio.wait_for(self._dirty.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._dirty.clear()
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Не удалось обновить статистику: {e}")
+            await asyncio.sleep(self.min_interval)
+
+
+stats_rollup = StatsRollup()
@@ -0,0 +1,25 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from bot.traffic.utils import Anonymizer, CaptureWriter
+
+
+class UpdateRecorderMiddleware(BaseMiddleware):
+    """
+    Внешний middleware апдейтов: записывает обезличенные апдейты для последующего воспроизведения.
+    """
+
+    def __init__(self, writer: CaptureWriter, anonymizer: Anonymizer) -> None:
+        self.writer = writer
+        self.anonymizer = anonymizer
+
+    async def __call__(self,
+                       handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+                       event: Update,
+                       data: Dict[str, Any]) -> Any:
+        update = self.anonymizer.anonymize(event.model_dump(mode="json", exclude_none=True))
+        self.writer.append({"ts": time.time(), "update": update})
+        return await handler(event, data)
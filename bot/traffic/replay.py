@@ -0,0 +1,199 @@
+"""
+Воспроизведение записанных апдейтов через настоящие роутеры бота.
+
+Запросы к Telegram перехватываются фиктивной сессией, а imeicheck.net заменяется
+локальной заглушкой, поэтому воспроизведение не требует сети. Работа с базой данных
+остается настоящей: укажите DB_URL на локальную базу с примененными миграциями.
+Чтобы квоты не мешали нагрузочному прогону, задайте QUOTA_DAILY=0 и QUOTA_MONTHLY=0.
+
+Запуск из корня репозитория:
+    python -m bot.traffic.replay captures/updates-*.jsonl.gz --speed 0 --concurrency 50
+
+--speed 0 подает апдейты без пауз, --speed 1 - в исходном темпе, 2 - вдвое быстрее и т.д.
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from aiohttp import web
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Chat, Message, Update, User
+from loguru import logger
+
+from bot.traffic.utils import read_capture
+
+# Токен фиктивного бота; в запросы к Telegram он не попадает
+REPLAY_TOKEN = "42:REPLAY"
+
+
+class ReplaySession(BaseSession):
+    """
+    Сессия бота, которая не обращается к Telegram, а только считает вызванные методы.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: Counter[str] = Counter()
+        self._message_ids = itertools.count(1)
+
+    async def close(self) -> None:
+        pass
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[TelegramType],
+                           timeout: Optional[int] = None) -> TelegramType:
+        self.calls[type(method).__name__] += 1
+        returning = method.__returning__
+        if returning is bool:
+            return True
+        if returning is Message:
+            chat_id = getattr(method, "chat_id", 0)
+            return Message(message_id=next(self._message_ids), date=datetime.now(),
+                           chat=Chat(id=chat_id if isinstance(chat_id, int) else 0, type="private"),
+                           text=getattr(method, "text", None))
+        if returning is User:
+            return User(id=bot.id, is_bot=True, first_name="Replay")
+        return None
+
+    async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+
+async def _stub_services(request: web.Request) -> web.Response:
+    return web.json_response([{"id": 12, "title": "Replay stub", "price": "0.00"}])
+
+
+async def _stub_check(request: web.Request) -> web.Response:
+    payload = await request.json()
+    return web.json_response({
+        "id": f"replay-{time.monotonic_ns()}",
+        "type": "api",
+        "status": "successful",
+        "orderId": None,
+        "service": {"id": payload.get("serviceId"), "title": "Replay stub"},
+        "amount": "0.00",
+        "deviceId": payload.get("deviceId"),
+        "processedAt": int(time.time()),
+        "properties": {"deviceName": "Replay device", "imei": payload.get("deviceId")},
+    })
+
+
+async def start_stub_imeicheck() -> web.AppRunner:
+    """
+    Запускает на свободном локальном порту заглушку API imeicheck.net.
+
+    :return: Runner заглушки; base_url клиента переключается на нее.
+    """
+    from bot.checks.client import imeicheck_client
+
+    app = web.Application()
+    app.router.add_get("/services", _stub_services)
+    app.router.add_post("/checks", _stub_check)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    imeicheck_client.base_url = f"http://127.0.0.1:{port}"
+    return runner
+
+
+async def replay(paths: List[str], speed: float, concurrency: int) -> None:
+    """
+    Подает записанные апдейты в диспетчер и выводит пропускную способность.
+
+    :param paths: Файлы записи в порядке воспроизведения.
+    :param speed: Множитель скорости; 0 - без пауз.
+    :param concurrency: Максимальное число одновременно обрабатываемых апдейтов.
+    """
+    import bot.config
+
+    session = ReplaySession()
+    # Подменяем бота до импорта роутеров: они используют bot.config.bot
+    bot.config.bot = replay_bot = Bot(REPLAY_TOKEN, session=session)
+
+    from bot.checks.client import imeicheck_client
+    from bot.database import dispose_engine
+    from bot.lifecycle import background
+    from bot.main import setup_dispatcher
+    from bot.quotas.utils import usage_counter
+
+    dispatcher = bot.config.dp
+    # Те же внешние middleware, что и у бота (планировщик, журнал, учет обработчиков), кроме записи трафика
+    setup_dispatcher(dispatcher, record_updates=False)
+    scheduler = dispatcher["update_scheduler"]
+    stub = await start_stub_imeicheck()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: set[asyncio.Task] = set()
+    latencies: List[float] = []
+    errors = 0
+
+    async def feed(update: Update) -> None:
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            await dispatcher.feed_update(replay_bot, update)
+        except Exception as e:
+            errors += 1
+            logger.error(f"Ошибка обработки апдейта {update.update_id}: {e}")
+        finally:
+            latencies.append(time.perf_counter() - started)
+            semaphore.release()
+
+    started = time.perf_counter()
+    first_ts: Optional[float] = None
+    try:
+        for path in paths:
+            for record in read_capture(path):
+                if speed > 0:
+                    first_ts = record["ts"] if first_ts is None else first_ts
+                    delay = (record["ts"] - first_ts) / speed - (time.perf_counter() - started)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                await semaphore.acquire()
+                task = asyncio.create_task(feed(Update.model_validate(record["update"], context={"bot": replay_bot})))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    finally:
+        elapsed = time.perf_counter() - started
+        # Отложенные записи (групповые коммиты пользователей и т.п.) завершаются до закрытия пула
+        await background.drain(bot.config.settings.SHUTDOWN_TIMEOUT)
+        await usage_counter.flush()
+        await stub.cleanup()
+        await imeicheck_client.close()
+        await dispose_engine()
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"Апдейтов: {total}, ошибок: {errors}, отклонено планировщиком: {scheduler.rejected}, "
+          f"время: {elapsed:.2f} с, пропускная способность: {total / elapsed if elapsed else 0:.1f} апд/с")
+    if total:
+        print(f"Задержка обработки: p50={latencies[total // 2] * 1000:.1f} мс, "
+              f"p95={latencies[int(total * 0.95)] * 1000:.1f} мс, max={latencies[-1] * 1000:.1f} мс")
+    print("Вызовы Bot API: " + ", ".join(f"{name}={count}" for name, count in session.calls.most_common()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Воспроизведение записанных апдейтов")
+    parser.add_argument("paths", nargs="+", help="Файлы записи (.jsonl или .jsonl.gz)")
+    parser.add_argument("--speed", type=float, default=0, help="Множитель скорости; 0 - без пауз")
+    parser.add_argument("--concurrency", type=int, default=100, help="Одновременно обрабатываемых апдейтов")
+    args = parser.parse_args()
+
+    from bot.config import setup_logging
+
+    setup_logging()
+    asyncio.run(replay(sorted(args.paths), args.speed, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import asyncio
+import gzip
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from datetime import datetime
+from typing import Any, Dict, IO, Iterator, List, Optional
+
+from loguru import logger
+
+from bot import json_codec
+
+# Объекты апдейта, поле id которых - идентификатор пользователя или чата, даже если объект неполный
+_ID_OWNERS = frozenset({"from", "chat", "user", "sender_chat", "forward_from", "forward_from_chat", "via_bot"})
+# Признаки объектов User (is_bot) и Chat (type): их id заменяется псевдонимом, где бы они ни встретились
+_IDENTITY_MARKERS = frozenset({"is_bot", "type"})
+# Поля с персональными данными, которые не должны попадать в запись
+_PERSONAL_FIELDS = frozenset({"username", "first_name", "last_name", "phone_number", "title", "bio",
+                              "sender_user_name", "author_signature", "vcard"})
+# Идентификаторы пользователей и чатов, встречающиеся вне объектов User/Chat
+_ID_FIELDS = frozenset({"user_id", "user_chat_id", "sender_user_id", "chat_id", "user_ids"})
+
+
+class Anonymizer:
+    """
+    Заменяет идентификаторы пользователей и чатов стабильными псевдонимами (HMAC),
+    а персональные поля - заглушками. Один и тот же ID в пределах соли всегда дает один псевдоним,
+    поэтому последовательности сообщений одного пользователя сохраняются.
+    """
+
+    def __init__(self, salt: bytes) -> None:
+        self._salt = salt
+
+    def _digest(self, value: str) -> bytes:
+        return hmac.new(self._salt, value.encode(), hashlib.sha256).digest()
+
+    def pseudo_id(self, value: int) -> int:
+        """
+        Возвращает псевдоним идентификатора с сохранением знака (отрицательные ID - группы и каналы).
+
+        :param value: Исходный идентификатор.
+        :return: Псевдоним в диапазоне до 2^40.
+        """
+        pseudo = int.from_bytes(self._digest(str(abs(value)))[:5], "big") or 1
+        return -pseudo if value < 0 else pseudo
+
+    def anonymize(self, obj: Any, owner: Optional[str] = None) -> Any:
+        """
+        Рекурсивно обезличивает JSON-представление апдейта.
+
+        :param obj: Словарь, список или значение.
+        :param owner: Ключ, под которым лежит obj в родительском объекте.
+        :return: Обезличенная копия.
+        """
+        if isinstance(obj, dict):
+            identity = owner in _ID_OWNERS or not _IDENTITY_MARKERS.isdisjoint(obj)
+            result: Dict[str, Any] = {}
+            for key, value in obj.items():
+                if key in _PERSONAL_FIELDS and isinstance(value, str):
+                    result[key] = f"{key}_{self._digest(value)[:6].hex()}"
+                elif _is_int(value) and ((key == "id" and identity) or key in _ID_FIELDS):
+                    result[key] = self.pseudo_id(value)
+                elif key in _ID_FIELDS and isinstance(value, list):
+                    result[key] = [self.pseudo_id(item) if _is_int(item) else item for item in value]
+                else:
+                    result[key] = self.anonymize(value, owner=key)
+            return result
+        if isinstance(obj, list):
+            return [self.anonymize(item, owner=owner) for item in obj]
+        return obj
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class CaptureWriter:
+    """
+    Пишет записи в сжатые JSONL-файлы с ротацией по размеру и времени.
+
+    Запись на диск выполняется пачками в отдельном потоке, чтобы не блокировать event loop.
+
+    Attributes:
+        directory (str): Каталог для файлов записи.
+        max_bytes (int): Размер несжатых данных, после которого начинается новый файл.
+        rotate_seconds (float): Максимальный возраст файла в секундах.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, rotate_seconds: float) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self._buffer: List[str] = []
+        self._file: Optional[IO[bytes]] = None
+        self._file_bytes = 0
+        self._opened_at = 0.0
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """
+        Добавляет запись в буфер.
+
+        :param record: JSON-совместимый словарь.
+        """
+        self._buffer.append(json_codec.dumps(record))
+
+    def _open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"updates-{datetime.now():%Y%m%d-%H%M%S}-{secrets.token_hex(2)}.jsonl.gz"
+        self._file = gzip.open(os.path.join(self.directory, name), "ab")
+        self._file_bytes = 0
+        self._opened_at = time.monotonic()
+        logger.info(f"Запись апдейтов в файл {name}")
+
+    def _write(self, lines: List[str]) -> None:
+        if self._file is not None and (self._file_bytes >= self.max_bytes
+                                       or time.monotonic() - self._opened_at >= self.rotate_seconds):
+            self._close()
+        if self._file is None:
+            self._open()
+        data = ("\n".join(lines) + "\n").encode()
+        self._file.write(data)
+        self._file.flush()
+        self._file_bytes += len(data)
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def flush(self) -> None:
+        """
+        Записывает накопленный буфер на диск.
+        """
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        await asyncio.to_thread(self._write, lines)
+
+    async def run(self, interval: float = 1.0) -> None:
+        """
+        Периодически сбрасывает буфер; при отмене записывает остаток и закрывает файл.
+
+        :param interval: Период сброса в секундах.
+        """
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self.flush()
+        finally:
+            await self.flush()
+            await asyncio.to_thread(self._close)
+
+
+def read_capture(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Читает записи из файла захвата (.jsonl или .jsonl.gz).
+
+    :param path: Путь к файлу.
+    :return: Итератор записей {"ts": ..., "update": {...}}.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as file:
+        for line in file:
+            if line.strip():
+                yield json_codec.loads(line)
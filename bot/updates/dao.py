@@ -0,0 +1,94 @@
+from typing import List, Optional, Sequence
+
+from loguru import logger
+from sqlalchemy import delete as sqlalchemy_delete, func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from bot.dao.base import BaseDAO, dialect_insert
+from bot.updates.models import ProcessedUpdate, UpdateOffset
+
+
+class ProcessedUpdateDAO(BaseDAO[ProcessedUpdate]):
+    model = ProcessedUpdate
+
+    @classmethod
+    async def recent_ids(cls, session: AsyncSession, limit: int) -> List[int]:
+        """
+        Возвращает последние обработанные update_id.
+
+        :param session: Сессия базы данных.
+        :param limit: Максимальное количество идентификаторов.
+        :return: Список update_id.
+        """
+        query = select(cls.model.update_id).order_by(cls.model.update_id.desc()).limit(limit)
+        try:
+            result = await cls._execute_read(session, query, consistent=True)
+            return list(result.scalars().all())
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при загрузке обработанных апдейтов: {e}")
+            raise
+
+    @classmethod
+    async def add_ids(cls, session: AsyncSession, update_ids: Sequence[int]) -> None:
+        """
+        Сохраняет идентификаторы апдейтов, пропуская уже сохраненные. Коммит выполняет вызывающий код.
+
+        :param session: Сессия базы данных.
+        :param update_ids: Идентификаторы апдейтов.
+        """
+        stmt = (dialect_insert(cls.model)
+                .values([{"update_id": update_id} for update_id in update_ids])
+                .on_conflict_do_nothing(index_elements=["update_id"]))
+        await session.execute(stmt)
+
+    @classmethod
+    async def prune(cls, session: AsyncSession, below_update_id: int) -> int:
+        """
+        Удаляет идентификаторы, вышедшие за окно дедупликации. Коммит выполняет вызывающий код.
+
+        :param session: Сессия базы данных.
+        :param below_update_id: Удалить update_id меньше указанного.
+        :return: Количество удаленных записей.
+        """
+        result = await session.execute(sqlalchemy_delete(cls.model).where(cls.model.update_id < below_update_id))
+        return result.rowcount
+
+
+class UpdateOffsetDAO(BaseDAO[UpdateOffset]):
+    model = UpdateOffset
+
+    @classmethod
+    async def get_last_update_id(cls, session: AsyncSession, bot_id: int) -> Optional[int]:
+        """
+        Возвращает последний обработанный update_id бота.
+
+        :param session: Сессия базы данных.
+        :param bot_id: Идентификатор бота.
+        :return: update_id или None, если бот еще ничего не обрабатывал.
+        """
+        query = select(cls.model.last_update_id).filter_by(bot_id=bot_id)
+        try:
+            result = await cls._execute_read(session, query, consistent=True)
+            return result.scalar_one_or_none()
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при загрузке смещения апдейтов бота {bot_id}: {e}")
+            raise
+
+    @classmethod
+    async def save(cls, session: AsyncSession, bot_id: int, last_update_id: int) -> None:
+        """
+        Сохраняет смещение; сохраненное значение никогда не уменьшается. Коммит выполняет вызывающий код.
+
+        :param session: Сессия базы данных.
+        :param bot_id: Идентификатор бота.
+        :param last_update_id: Последний обработанный update_id.
+        """
+        stmt = dialect_insert(cls.model).values(bot_id=bot_id, last_update_id=last_update_id)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["bot_id"],
+            set_={"last_update_id": stmt.excluded.last_update_id, "updated_at": func.now()},
+            where=cls.model.last_update_id < stmt.excluded.last_update_id,
+        )
+        await session.execute(stmt)
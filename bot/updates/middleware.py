@@ -0,0 +1,81 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Chat, Message, Update
+from loguru import logger
+
+from bot.cache import TTLCache
+from bot.updates.utils import SchedulerOverloaded, UpdateJournal, UpdateScheduler
+
+BUSY_TEXT = "Сейчас бот перегружен запросами. Пожалуйста, повторите через минуту 🙏"
+# Ключ в данных апдейта: апдейт отклонен планировщиком и не обработан
+REJECTED_KEY = "update_rejected"
+
+
+class UpdateJournalMiddleware(BaseMiddleware):
+    """
+    Внешний middleware апдейтов: пропускает дубликаты и отмечает обработанные апдейты в журнале.
+
+    Обработанным считается только успешно завершенный апдейт. Если обработчик упал, был отменен
+    при остановке или апдейт отклонен планировщиком, апдейт снимается с учета, чтобы его
+    повторная доставка после перезапуска не была принята за дубликат.
+    """
+
+    def __init__(self, journal: UpdateJournal) -> None:
+        self.journal = journal
+
+    async def __call__(self,
+                       handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+                       event: Update,
+                       data: Dict[str, Any]) -> Any:
+        if not self.journal.claim(event.update_id):
+            logger.info(f"Апдейт {event.update_id} уже обработан, пропускаем")
+            return None
+        try:
+            result = await handler(event, data)
+        except BaseException:
+            self.journal.release(event.update_id)
+            raise
+        if data.get(REJECTED_KEY):
+            self.journal.release(event.update_id)
+        else:
+            self.journal.done(event.update_id)
+        return result
+
+
+class UpdateSchedulerMiddleware(BaseMiddleware):
+    """
+    Внешний middleware апдейтов: обработка через UpdateScheduler.
+
+    Отклоненный апдейт не обрабатывается, а пользователю отправляется вежливый ответ
+    "бот занят" - не чаще одного раза в busy_interval секунд на чат.
+    """
+
+    def __init__(self, scheduler: UpdateScheduler, busy_interval: float = 30) -> None:
+        self.scheduler = scheduler
+        self._notified: TTLCache[int, bool] = TTLCache(maxsize=10_000, ttl=busy_interval)
+
+    async def __call__(self,
+                       handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+                       event: Update,
+                       data: Dict[str, Any]) -> Any:
+        chat: Chat | None = data.get("event_chat")
+        chat_id = chat.id if chat is not None else None
+        try:
+            return await self.scheduler.run(chat_id, lambda: handler(event, data))
+        except SchedulerOverloaded:
+            data[REJECTED_KEY] = True
+            logger.warning(f"Апдейт {event.update_id} отклонен: очередь переполнена "
+                           f"(ожидают {self.scheduler.pending}, чат {chat_id})")
+            await self._reply_busy(event.event, chat_id)
+            return None
+
+    async def _reply_busy(self, event: Any, chat_id: int | None) -> None:
+        if chat_id is None or chat_id in self._notified:
+            return
+        self._notified.set(chat_id, True)
+        try:
+            if isinstance(event, (Message, CallbackQuery)):
+                await event.answer(BUSY_TEXT)
+        except Exception as e:
+            logger.error(f"Не удалось отправить ответ о перегрузке в чат {chat_id}: {e}")
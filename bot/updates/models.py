@@ -0,0 +1,32 @@
+from sqlalchemy import BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from bot.database import Base
+
+
+class ProcessedUpdate(Base):
+    """
+    Идентификатор уже обработанного апдейта Telegram (окно дедупликации).
+
+    Attributes:
+        update_id (int): Идентификатор апдейта.
+    """
+
+    __tablename__ = 'processed_updates'
+
+    update_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False)
+
+
+class UpdateOffset(Base):
+    """
+    Последний обработанный апдейт для каждого бота.
+
+    Attributes:
+        bot_id (int): Идентификатор бота.
+        last_update_id (int): Максимальный обработанный update_id.
+    """
+
+    __tablename__ = 'update_offsets'
+
+    bot_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False)
+    last_update_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
@@ -0,0 +1,282 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager, nullcontext
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from loguru import logger
+
+from bot.database import get_session_maker
+from bot.updates.dao import ProcessedUpdateDAO, UpdateOffsetDAO
+
+T = TypeVar("T")
+
+
+class UpdateJournal:
+    """
+    Журнал обработанных апдейтов: смещение бота и окно дедупликации.
+
+    Проверка дубликата - поиск в in-memory множестве, без обращения к базе.
+    Обработанные идентификаторы копятся в памяти и сбрасываются в базу пачками.
+
+    Смещение getUpdates ведет aiogram: пачка апдейтов подтверждается следующим запросом, еще до
+    завершения обработчиков. Поэтому после сбоя Telegram повторно присылает только последнюю
+    неподтвержденную пачку. Завершенные апдейты из нее отсекаются окном дедупликации, а апдейты,
+    обработка которых упала, была отменена или отклонена, снимаются с учета (release) и будут
+    обработаны заново. Апдейты из уже подтвержденных пачек, не завершенные до сбоя, теряются.
+
+    Сохраняемое смещение - наибольший update_id, до которого завершены все взятые в обработку
+    апдейты (claim вызывается в порядке получения, до первого переключения задачи). Оно задает
+    границу очистки окна дедупликации в базе и показывает, докуда бот догнал поток апдейтов.
+
+    Attributes:
+        window (int): Сколько последних update_id помнить для дедупликации.
+        flush_interval (float): Период сброса в базу в секундах.
+    """
+
+    def __init__(self, window: int, flush_interval: float) -> None:
+        self.window = window
+        self.flush_interval = flush_interval
+        self.bot_id: Optional[int] = None
+        self.last_update_id: Optional[int] = None
+        self._seen: set[int] = set()
+        self._order: deque[int] = deque()
+        self._pending: List[int] = []
+        self._in_flight: set[int] = set()
+        self._max_done: Optional[int] = None
+        self._flush_lock = asyncio.Lock()
+
+    async def load(self, bot_id: int) -> None:
+        """
+        Загружает смещение и последние обработанные update_id из базы.
+
+        :param bot_id: Идентификатор бота.
+        """
+        self.bot_id = bot_id
+        async with get_session_maker()() as session:
+            self.last_update_id = await UpdateOffsetDAO.get_last_update_id(session, bot_id=bot_id)
+            recent = await ProcessedUpdateDAO.recent_ids(session, limit=self.window)
+        for update_id in reversed(recent):
+            self._remember(update_id)
+        logger.info(f"Журнал апдейтов загружен: последний update_id={self.last_update_id}, в окне {len(self._seen)}")
+
+    def _remember(self, update_id: int) -> None:
+        self._seen.add(update_id)
+        self._order.append(update_id)
+        while len(self._order) > self.window:
+            self._seen.discard(self._order.popleft())
+
+    def claim(self, update_id: int) -> bool:
+        """
+        Отмечает апдейт как взятый в обработку.
+
+        :param update_id: Идентификатор апдейта.
+        :return: False, если апдейт уже обрабатывался (дубликат).
+        """
+        if update_id in self._seen:
+            return False
+        self._remember(update_id)
+        self._in_flight.add(update_id)
+        return True
+
+    def done(self, update_id: int) -> None:
+        """
+        Отмечает апдейт как обработанный; запись в базу выполнится при следующем сбросе.
+
+        :param update_id: Идентификатор апдейта.
+        """
+        self._in_flight.discard(update_id)
+        self._pending.append(update_id)
+        if self._max_done is None or update_id > self._max_done:
+            self._max_done = update_id
+
+    def release(self, update_id: int) -> None:
+        """
+        Снимает апдейт с учета, не отмечая его обработанным: повторная доставка будет обработана.
+
+        :param update_id: Идентификатор апдейта.
+        """
+        if update_id not in self._in_flight:
+            return
+        self._in_flight.discard(update_id)
+        self._seen.discard(update_id)
+        self._order.remove(update_id)
+
+    def committed_offset(self) -> Optional[int]:
+        """
+        Возвращает смещение, до которого (включительно) завершены все взятые в обработку апдейты.
+
+        :return: update_id или None, если ни один апдейт еще не завершен.
+        """
+        if self._max_done is None:
+            return None
+        if self._in_flight:
+            return min(self._max_done, min(self._in_flight) - 1)
+        return self._max_done
+
+    async def flush(self) -> None:
+        """
+        Сохраняет накопленные update_id и смещение (если оно продвинулось) одной транзакцией.
+        """
+        async with self._flush_lock:
+            if not self._pending or self.bot_id is None:
+                return
+            batch, self._pending = self._pending, []
+            last_update_id = self.committed_offset()
+            if last_update_id is not None and self.last_update_id is not None:
+                # Смещение сохраняется, только если оно продвинулось
+                last_update_id = last_update_id if last_update_id > self.last_update_id else None
+            try:
+                async with get_session_maker()() as session:
+                    await ProcessedUpdateDAO.add_ids(session, batch)
+                    if last_update_id is not None:
+                        await UpdateOffsetDAO.save(session, bot_id=self.bot_id, last_update_id=last_update_id)
+                        await ProcessedUpdateDAO.prune(session, below_update_id=last_update_id - self.window)
+                    await session.commit()
+            except Exception as e:
+                # Возвращаем пачку, чтобы сохранить ее при следующем сбросе
+                self._pending[:0] = batch
+                logger.error(f"Не удалось сохранить журнал апдейтов: {e}")
+                return
+            if last_update_id is not None:
+                self.last_update_id = last_update_id
+
+    async def run(self) -> None:
+        """
+        Периодически сбрасывает журнал в базу; при отмене выполняет последний сброс.
+        """
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        finally:
+            await self.flush()
+
+
+class SchedulerOverloaded(Exception):
+    """
+    Апдейт не принят планировщиком: превышен общий лимит очереди или лимит чата.
+
+    Attributes:
+        chat_id (Optional[int]): Чат апдейта.
+    """
+
+    def __init__(self, chat_id: Optional[int]) -> None:
+        self.chat_id = chat_id
+        super().__init__(f"Очередь апдейтов переполнена (чат {chat_id})")
+
+
+class _ChatSlot:
+    __slots__ = ("lock", "pending")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+
+class _Lease:
+    __slots__ = ("semaphore", "held")
+
+    def __init__(self, semaphore: asyncio.Semaphore) -> None:
+        self.semaphore = semaphore
+        self.held = False
+
+
+# Место в общем лимите, занятое текущим апдейтом (обработчик выполняется в той же задаче, что и middleware)
+_lease: ContextVar[Optional[_Lease]] = ContextVar("update_scheduler_lease", default=None)
+
+
+@asynccontextmanager
+async def released_slot() -> AsyncIterator[None]:
+    """
+    Временно освобождает место текущего апдейта в общем лимите UpdateScheduler.
+
+    Для ожидания без нагрузки (пауза в вводе, ожидание результата другой задачи), чтобы
+    долгие ожидания не занимали места обработчиков. Очередь чата при этом не освобождается.
+    По выходе место занимается снова. Вне планировщика ничего не делает.
+    """
+    lease = _lease.get()
+    if lease is None or not lease.held:
+        yield
+        return
+    lease.semaphore.release()
+    lease.held = False
+    try:
+        yield
+    finally:
+        await lease.semaphore.acquire()
+        lease.held = True
+
+
+class UpdateScheduler:
+    """
+    Планировщик обработки апдейтов.
+
+    * Не больше concurrency апдейтов обрабатываются одновременно.
+    * Апдейты одного чата обрабатываются строго по очереди, в порядке поступления,
+      поэтому переходы FSM не перемешиваются.
+    * Общий семафор ждут только первые в очереди апдейты каждого чата, а asyncio.Semaphore
+      будит ожидающих по порядку - чаты обслуживаются по кругу, и поток сообщений
+      из одного чата не задерживает остальные.
+    * Если ожидающих апдейтов больше max_pending (или больше max_pending_per_chat в одном чате),
+      новый апдейт отклоняется.
+    * Обработчик может отдать свое место в общем лимите на время ожидания (released_slot).
+
+    Attributes:
+        concurrency (int): Максимум одновременно обрабатываемых апдейтов.
+        max_pending (int): Максимум принятых, но не обработанных апдейтов.
+        max_pending_per_chat (int): Максимум таких апдейтов в одном чате.
+        pending (int): Сколько апдейтов сейчас принято.
+        rejected (int): Сколько апдейтов отклонено с момента запуска.
+    """
+
+    def __init__(self, concurrency: int, max_pending: int, max_pending_per_chat: int) -> None:
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.max_pending_per_chat = max_pending_per_chat
+        self.pending = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._chats: Dict[int, _ChatSlot] = {}
+
+    @property
+    def active_chats(self) -> int:
+        return len(self._chats)
+
+    async def run(self, chat_id: Optional[int], call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет обработку апдейта с учетом лимитов.
+
+        :param chat_id: Чат апдейта; None - апдейт без чата, ограничивается только общим лимитом.
+        :param call: Обработка апдейта.
+        :return: Результат обработки.
+        :raises SchedulerOverloaded: Если апдейт не принят.
+        """
+        slot = self._chats.get(chat_id) if chat_id is not None else None
+        if self.pending >= self.max_pending or (slot is not None and slot.pending >= self.max_pending_per_chat):
+            self.rejected += 1
+            raise SchedulerOverloaded(chat_id)
+        if chat_id is not None and slot is None:
+            slot = self._chats[chat_id] = _ChatSlot()
+
+        self.pending += 1
+        if slot is not None:
+            slot.pending += 1
+        try:
+            async with slot.lock if slot is not None else nullcontext():
+                lease = _Lease(self._semaphore)
+                await self._semaphore.acquire()
+                lease.held = True
+                token = _lease.set(lease)
+                try:
+                    return await call()
+                finally:
+                    _lease.reset(token)
+                    if lease.held:
+                        self._semaphore.release()
+        finally:
+            self.pending -= 1
+            if slot is not None:
+                slot.pending -= 1
+                if not slot.pending:
+                    del self._chats[chat_id]
@@ -1,6 +1,90 @@
-from bot.dao.base import BaseDAO
+from typing import Any, Dict, Sequence, Set
+
+from loguru import logger
+from sqlalchemy import bindparam, column, update, values
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.dao.base import BaseDAO, dialect_insert
+from bot.database import get_engine
 from bot.users.models import User
 
+# Поля пользователя, которые можно записывать пачкой
+USER_FIELDS = ("telegram_id", "username", "first_name", "last_name", "token_id")
+
 
 class UserDAO(BaseDAO[User]):
     model = User
+
+    @classmethod
+    async def insert_many(cls, session: AsyncSession, rows: Sequence[Dict[str, Any]]) -> Dict[int, int]:
+        """
+        Добавляет пользователей одним многострочным INSERT; уже существующие telegram_id пропускаются.
+        Транзакцию не фиксирует - это делает вызывающий код.
+
+        :param session: Сессия базы данных.
+        :param rows: Значения полей USER_FIELDS; telegram_id обязателен.
+        :return: Словарь {telegram_id: users.id} только для действительно добавленных строк.
+        """
+        table = cls.model.__table__
+        stmt = (
+            dialect_insert(cls.model)
+            .values([{field: row.get(field) for field in USER_FIELDS} for row in rows])
+            .on_conflict_do_nothing(index_elements=["telegram_id"])
+            .returning(table.c.telegram_id, table.c.id)
+        )
+        try:
+            result = await session.execute(stmt)
+            inserted = {telegram_id: user_id for telegram_id, user_id in result.all()}
+            await cls._publish_invalidation(session, "insert", *(row for row in rows if row["telegram_id"] in inserted))
+            logger.info(f"Добавлено пользователей: {len(inserted)} из {len(rows)}")
+            return inserted
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при добавлении пачки пользователей: {e}")
+            raise
+
+    @classmethod
+    async def update_many_by_telegram_id(cls, session: AsyncSession, fields: Sequence[str],
+                                         rows: Sequence[Dict[str, Any]]) -> Set[int]:
+        """
+        Обновляет пользователей с одинаковым набором изменяемых полей.
+        Транзакцию не фиксирует - это делает вызывающий код.
+
+        В PostgreSQL выполняется один UPDATE ... FROM (VALUES ...), в остальных базах -
+        отдельный UPDATE на строку в той же транзакции.
+
+        :param session: Сессия базы данных.
+        :param fields: Изменяемые поля (без telegram_id).
+        :param rows: Значения: telegram_id и поля fields.
+        :return: telegram_id обновленных пользователей.
+        """
+        table = cls.model.__table__
+        try:
+            if get_engine().dialect.name == "postgresql":
+                data = values(*(column(name, table.c[name].type) for name in ("telegram_id", *fields)),
+                              name="data").data([(row["telegram_id"], *(row[name] for name in fields))
+                                                 for row in rows])
+                stmt = (
+                    update(table)
+                    .where(table.c.telegram_id == data.c.telegram_id)
+                    .values({name: data.c[name] for name in fields})
+                    .returning(table.c.telegram_id)
+                )
+                updated = set((await session.execute(stmt)).scalars().all())
+            else:
+                stmt = (
+                    update(table)
+                    .where(table.c.telegram_id == bindparam("b_telegram_id"))
+                    .values({name: bindparam(f"b_{name}") for name in fields})
+                    .returning(table.c.telegram_id)
+                )
+                updated = set()
+                for row in rows:
+                    params = {f"b_{name}": row[name] for name in ("telegram_id", *fields)}
+                    updated.update((await session.execute(stmt, params)).scalars().all())
+            await cls._publish_invalidation(session, "update", *rows)
+            logger.info(f"Обновлено пользователей: {len(updated)} из {len(rows)}")
+            return updated
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при обновлении пачки пользователей: {e}")
+            raise
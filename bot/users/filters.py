@@ -0,0 +1,72 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.filters import Filter
+from aiogram.types import Message
+
+from bot.users.keyboards.markup_kb import IMEI_BUTTON, REGISTRATION_BUTTON
+
+# Действия, на которые ведут кнопки и текстовые синонимы команд
+REGISTRATION = "registration"
+SEND_IMEI = "send_imei"
+
+
+def normalize_text(text: str) -> str:
+    """
+    Приводит текст к виду ключа таблицы маршрутов: нижний регистр, одиночные пробелы.
+
+    :param text: Исходный текст.
+    :return: Нормализованный текст.
+    """
+    return " ".join(text.casefold().split())
+
+
+# Нормализованный текст -> действие. Строится один раз при импорте модуля
+TEXT_ROUTES: Dict[str, str] = {
+    normalize_text(label): action
+    for action, labels in {
+        REGISTRATION: (REGISTRATION_BUTTON, "зарегистрироваться"),
+        SEND_IMEI: (IMEI_BUTTON, "проверить imei", "проверка imei", "imei"),
+    }.items()
+    for label in labels
+}
+
+# Текст длиннее самой длинной подписи заведомо не совпадет ни с одним маршрутом
+_MAX_ROUTE_LENGTH = max(map(len, TEXT_ROUTES)) * 2
+
+
+def resolve_text_action(text: Optional[str]) -> Optional[str]:
+    """
+    Находит действие для текста сообщения одним обращением к словарю.
+
+    :param text: Текст сообщения.
+    :return: Действие или None.
+    """
+    if not text or len(text) > _MAX_ROUTE_LENGTH:
+        return None
+    return TEXT_ROUTES.get(normalize_text(text))
+
+
+class TextActionMiddleware(BaseMiddleware):
+    """
+    Внешний middleware сообщений: один раз вычисляет действие для текста и кладет его в data["text_action"].
+    """
+
+    async def __call__(self,
+                       handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+                       event: Message,
+                       data: Dict[str, Any]) -> Any:
+        data["text_action"] = resolve_text_action(event.text)
+        return await handler(event, data)
+
+
+class TextAction(Filter):
+    """
+    Фильтр по действию, вычисленному TextActionMiddleware (сравнение строк вместо разбора текста).
+    """
+
+    def __init__(self, action: str) -> None:
+        self.action = action
+
+    async def __call__(self, message: Message, text_action: Optional[str] = None) -> bool:
+        return text_action == self.action
@@ -1,10 +1,18 @@
+from functools import lru_cache
+
 from aiogram.types import ReplyKeyboardMarkup
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 
+# Подписи кнопок; по ним же строится таблица текстовых маршрутов (bot/users/filters.py)
+REGISTRATION_BUTTON = "Регистрация"
+IMEI_BUTTON = "Информация по IMEI"
+
 
+@lru_cache(maxsize=None)
 def start_keyboard(registered: bool) -> ReplyKeyboardMarkup:
     """
     Создает клавиатуру для начала взаимодействия с ботом.
+    Клавиатура строится один раз для каждого значения registered и далее берется из кэша.
 
     :param registered: Указывает, зарегистрирован ли пользователь.
     :return: Объект ReplyKeyboardMarkup с кнопками.
@@ -13,10 +21,10 @@ def start_keyboard(registered: bool) -> ReplyKeyboardMarkup:
 
     if not registered:
         # Если пользователь не зарегистрирован, добавляем кнопку регистрации
-        kb.button(text="Регистрация")
+        kb.button(text=REGISTRATION_BUTTON)
     else:
         # Если пользователь зарегистрирован, добавляем кнопку для получения информации по IMEI
-        kb.button(text="Информация по IMEI")
+        kb.button(text=IMEI_BUTTON)
 
     kb.adjust(1)  # Настройка количества кнопок в строке
     return kb.as_markup(resize_keyboard=True, one_time_keyboard=True)
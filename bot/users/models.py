@@ -1,8 +1,7 @@
-import asyncio
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import BigInteger
+from sqlalchemy import BigInteger, Index
 from typing import Optional
-from bot.database import Base, async_session_maker
+from bot.database import Base
 
 
 class User(Base):
@@ -18,9 +17,13 @@ class User(Base):
     """
 
     __tablename__ = 'users'  # Укажите имя таблицы в базе данных
+    __table_args__ = (
+        # Инкрементальный пересчет статистики регистраций по диапазону created_at
+        Index('ix_users_created_at', 'created_at'),
+    )
 
     telegram_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False)
     username: Mapped[Optional[str]]
     first_name: Mapped[Optional[str]]
     last_name: Mapped[Optional[str]]
-    token_id: Mapped[Optional[str]]
+    token_id: Mapped[Optional[str]] = mapped_column(unique=True, index=True)
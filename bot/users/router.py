@@ -8,12 +8,15 @@ from loguru import logger
 from aiogram.types import Message
 from aiogram.dispatcher.router import Router
 
-from bot.config import bot
+from bot.checks.utils import get_or_create_check, get_or_create_report, render_check, render_report
+from bot import config
 from bot.database import connection
+from bot.quotas.utils import QuotaExceeded
 from bot.users.dao import UserDAO
+from bot.users.filters import REGISTRATION, SEND_IMEI, TextAction, TextActionMiddleware
 from bot.users.keyboards.markup_kb import start_keyboard
-from bot.users.schemas import TelegramIDModel, UserModel
-from bot.users.utils import generate_token, create_checks
+from bot.users.schemas import TelegramIDModel
+from bot.users.utils import generate_token, user_writer
 
 
 class RegistrationsState(StatesGroup):
@@ -23,6 +26,8 @@ class RegistrationsState(StatesGroup):
 
 
 user_router = Router()
+# Кнопки и текстовые синонимы команд разбираются один раз на сообщение
+user_router.message.outer_middleware(TextActionMiddleware())
 
 
 @user_router.message(CommandStart())
@@ -42,15 +47,17 @@ async def cmd_start(message: Message, command: CommandObject, session, state: FS
 
         # Проверка существования пользователя в базе данных
         user_info = await UserDAO.find_one_or_none(session=session,
-                                                   filters=TelegramIDModel(telegram_id=user_id))
+                                                   filters=TelegramIDModel(telegram_id=user_id),
+                                                   consistent=True)
+        # Возвращаем соединение в пул до ожидания групповой записи: она берет собственное соединение
+        await session.close()
 
         if not user_info:
-            # Если пользователь не найден, добавляем его в базу данных
-            values = UserModel(telegram_id=user_id,
-                               username=message.from_user.username,
-                               first_name=message.from_user.first_name,
-                               last_name=message.from_user.last_name)
-            await UserDAO.add(session=session, values=values)
+            # Если пользователь не найден, добавляем его в базу данных (групповой записью)
+            await user_writer.add({"telegram_id": user_id,
+                                   "username": message.from_user.username,
+                                   "first_name": message.from_user.first_name,
+                                   "last_name": message.from_user.last_name})
         elif user_info.token_id:
             # Если пользователь уже зарегистрирован и имеет токен
             await message.answer(f"👋 Привет, {message.from_user.full_name}! Выберите следующее действие",
@@ -69,7 +76,7 @@ async def cmd_start(message: Message, command: CommandObject, session, state: FS
 
 
 @user_router.message(Command(commands=['registration']))
-@user_router.message(F.text.lower().contains('регистрация'), RegistrationsState.registration)
+@user_router.message(TextAction(REGISTRATION), RegistrationsState.registration)
 @connection()
 async def cmd_registration(message: Message, session, state: FSMContext, command: CommandObject = None,
                            **kwargs) -> None:
@@ -86,24 +93,26 @@ async def cmd_registration(message: Message, session, state: FSMContext, command
 
         # Проверка существования пользователя в базе данных
         user_info = await UserDAO.find_one_or_none(session=session,
-                                                   filters=TelegramIDModel(telegram_id=user_id))
+                                                   filters=TelegramIDModel(telegram_id=user_id),
+                                                   consistent=True)
+        # Возвращаем соединение в пул до ожидания групповой записи: она берет собственное соединение
+        await session.close()
 
         token_id = generate_token()  # Генерация токена
 
         if not user_info:
             # Если пользователь не найден, добавляем его в базу данных с токеном
-            values = UserModel(telegram_id=user_id,
-                               username=message.from_user.username,
-                               first_name=message.from_user.first_name,
-                               last_name=message.from_user.last_name,
-                               token_id=token_id)
-            await UserDAO.add(session=session, values=values)
+            created = await user_writer.add({"telegram_id": user_id,
+                                             "username": message.from_user.username,
+                                             "first_name": message.from_user.first_name,
+                                             "last_name": message.from_user.last_name,
+                                             "token_id": token_id})
+            if created is None:
+                # Пользователь успел появиться параллельно (например, из /start) - выдаем токен обновлением
+                await user_writer.update(user_id, {"token_id": token_id})
         elif not user_info.token_id:
             # Если пользователь найден, но не имеет токена - обновляем данные
-            values = UserModel(**user_info.to_dict())
-            values.token_id = token_id
-            await UserDAO.update(session=session, filters=TelegramIDModel(telegram_id=user_id),
-                                 values=values)
+            await user_writer.update(user_id, {"token_id": token_id})
         elif user_info.token_id:
             # Если пользователь уже зарегистрирован
             await message.answer(f"Пользователь, {message.from_user.full_name} уже зарегистрирован! Нажми кнопку 👇",
@@ -121,12 +130,13 @@ async def cmd_registration(message: Message, session, state: FSMContext, command
         await message.answer("Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте снова позже.")
 
 
-@user_router.message(Command(commands=['send_imei']))
-@user_router.message(F.text.lower().contains('информация по imei'), RegistrationsState.input_imei)
+@user_router.message(Command(commands=['send_imei', 'full_report']))
+@user_router.message(TextAction(SEND_IMEI), RegistrationsState.input_imei)
 @connection()
 async def cmd_input_imei(message: Message, session, state: FSMContext, command: CommandObject = None, **kwargs) -> None:
     """
     Запрашивает у пользователя ввод IMEI.
+    Команда /full_report включает сводный отчет по нескольким услугам (если их настроено не меньше двух).
 
     :param message: Сообщение от пользователя.
     :param session: Сессия базы данных.
@@ -135,10 +145,18 @@ async def cmd_input_imei(message: Message, session, state: FSMContext, command:
     """
     try:
         user_id = message.from_user.id
+        full_report = command is not None and command.command == 'full_report'
+        if full_report and len(config.settings.IMEICHECK_REPORT_SERVICES) < 2:
+            # С одной услугой сводный отчет совпадает с обычной проверкой
+            await message.answer("Сводный отчет недоступен: для него настроена только одна услуга. "
+                                 "Воспользуйтесь командой /send_imei.")
+            return
 
         # Проверка существования пользователя в базе данных и наличия токена
+        # Чтение из основной базы: только что зарегистрированный пользователь может еще не дойти до реплики
         user_info = await UserDAO.find_one_or_none(session=session,
-                                                   filters=TelegramIDModel(telegram_id=user_id))
+                                                   filters=TelegramIDModel(telegram_id=user_id),
+                                                   consistent=True)
 
         if user_info and user_info.token_id:
             await message.answer("Введите IMEI (15 цифр без пробелов).")
@@ -147,6 +165,7 @@ async def cmd_input_imei(message: Message, session, state: FSMContext, command:
 
         # Установка состояния ввода информации по IMEI
         await state.set_state(RegistrationsState.information_imei)
+        await state.update_data(full_report=full_report)
 
     except Exception as e:
         logger.error(f"Ошибка при выполнении команды /send_imei для пользователя {message.from_user.id}: {e}")
@@ -169,12 +188,30 @@ async def cmd_information_imei(message: Message, session, state: FSMContext, com
         text = message.text
 
         if text and (len(text) == 15):
-            async with ChatActionSender(bot=bot, chat_id=message.from_user.id, action="typing"):
+            user_info = await UserDAO.find_one_or_none(session=session,
+                                                       filters=TelegramIDModel(telegram_id=message.from_user.id),
+                                                       consistent=True)
+            if not user_info:
+                await message.answer("Необходимо пройти регистрацию!", reply_markup=start_keyboard(registered=False))
+                return
+
+            async with ChatActionSender(bot=config.bot, chat_id=message.from_user.id, action="typing"):
                 await asyncio.sleep(2)  # Эффект набора текста
 
-                res = await create_checks(text)  # Выполнение проверки IMEI
-
-                await message.answer(res)  # Отправка результата пользователю
+                if (await state.get_data()).get('full_report'):
+                    # Сводный отчет: услуги опрашиваются параллельно с общим сроком ожидания
+                    report = await get_or_create_report(session, user_id=user_info.id, imei=text,
+                                                        service_ids=config.settings.IMEICHECK_REPORT_SERVICES,
+                                                        deadline=config.settings.IMEICHECK_REPORT_DEADLINE)
+                    chunks = render_report(report)
+                else:
+                    # Выполнение проверки IMEI (или повторное использование сохраненного результата)
+                    check = await get_or_create_check(session, user_id=user_info.id, imei=text)
+                    chunks = render_check(check.result)
+
+                # Отправка результата пользователю (длинный результат - несколькими сообщениями)
+                for chunk in chunks:
+                    await message.answer(chunk)
 
         else:
             await message.reply("IMEI должен содержать 15 цифр без пробелов. Попробуйте ввести еще раз.")
@@ -182,6 +219,11 @@ async def cmd_information_imei(message: Message, session, state: FSMContext, com
 
         await state.clear()  # Очистка состояния после обработки
 
+    except QuotaExceeded as e:
+        period = "дневной" if e.period == "day" else "месячный"
+        await message.answer(f"Исчерпан {period} лимит проверок ({e.limit}). Попробуйте позже.")
+        await state.clear()
+
     except Exception as e:
         logger.error(f"Ошибка при обработке IMEI для пользователя {message.from_user.id}: {e}")
         await message.answer("Произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте снова позже.")
@@ -26,3 +26,13 @@ class UserModel(TelegramIDModel):
     first_name: str | None
     last_name: str | None
     token_id: str | None = None
+
+
+class TokenIDModel(BaseModel):
+    """
+    Модель для поиска пользователя по токену.
+
+    Attributes:
+        token_id (str): Токен пользователя.
+    """
+    token_id: str
@@ -1,10 +1,14 @@
 import asyncio
-import json
 import secrets
-from pprint import pprint
-import aiohttp
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
 
-from bot.config import settings
+from loguru import logger
+
+from bot import config
+from bot.database import get_session_maker
+from bot.lifecycle import background
+from bot.stats.utils import stats_rollup
+from bot.users.dao import UserDAO
 
 
 def get_refer_id_or_none(command_args: str, user_id: int) -> int:
@@ -28,75 +32,136 @@ def generate_token() -> str:
     return secrets.token_hex(16)  # Генерирует уникальный токен
 
 
-async def fetch_services() -> dict:
-    """
-    Получает список доступных услуг из API imeicheck.net.
 
-    :return: Словарь с данными о доступных услугах.
+class UserWriter:
     """
-    url = "https://api.imeicheck.net/v1/services"
-    api_key = settings.IMEICHECK_TOKEN.get_secret_value()
+    Групповая запись пользователей (group commit).
 
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Accept-Language': 'en',
-        'Content-Type': 'application/json'
-    }
+    Добавления и обновления от одновременных обработчиков копятся не дольше window секунд
+    или до max_rows строк и записываются одной транзакцией: добавления - одним многострочным
+    INSERT, обновления - одним UPDATE на каждый набор полей. Каждый вызывающий получает свой
+    результат. Если один пользователь добавляется в группе несколько раз, строку записывает первое
+    добавление, а остальные получают None, как при уже существующем telegram_id, и дописывают свои
+    поля обновлением. Если групповая запись не удалась, строки записываются по одной, чтобы ошибка
+    одной строки (например, конфликт токена) досталась только ее автору.
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as response:
-            response.raise_for_status()  # Проверка на ошибки
-            data = await response.json()  # Получение данных в формате JSON
-            return data
+    Группы записываются строго по очереди, поэтому обновление не обгонит добавление того же пользователя.
 
-
-async def create_checks(imei: str) -> str:
+    Attributes:
+        window (Optional[float]): Сколько секунд копить группу (по умолчанию USER_WRITE_WINDOW).
+        max_rows (Optional[int]): Размер группы, при котором она записывается сразу (по умолчанию USER_WRITE_MAX_ROWS).
     """
-    Создает проверку IMEI через API imeicheck.net.
 
-    :param imei: IMEI устройства для проверки.
-    :return: Строка с результатами проверки.
-    """
-    url = "https://api.imeicheck.net/v1/checks"
-    api_key = settings.IMEICHECK_TOKEN.get_secret_value()
-
-    payload = {
-        "deviceId": f"{imei}",
-        "serviceId": 12,
-    }
-
-    headers = {
-        'Authorization': f'Bearer {api_key}',  # Вставьте ваш API ключ
-        'Accept-Language': 'en',
-        'Content-Type': 'application/json'
-    }
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=payload, headers=headers) as response:
-            response.raise_for_status()  # Проверка на ошибки
-            data = await response.json()  # Получение данных в формате JSON
-
-            # Преобразование данных в строку для удобного отображения
-            out = json.dumps(data).split(',')
-            rest = '\n'.join(out)
-            return rest
-
-
-# async def main() -> None:
-#     """
-#     Основная функция для выполнения асинхронных запросов к API.
-#
-#     Запускает функции для создания проверок IMEI и выводит результаты.
-#     """
-#
-#     # Пример вызова функции create_checks с IMEI
-#     order2 = await create_checks(str(869851059376901))
-#
-#     # Преобразование результата в JSON и вывод
-#     s = json.dumps(order2)
-#     pprint(s)
-#
-#
-# if __name__ == '__main__':
-#     da = asyncio.run(main())
-#     print(da)
+    def __init__(self, window: Optional[float] = None, max_rows: Optional[int] = None) -> None:
+        self.window = window
+        self.max_rows = max_rows
+        self._pending: List[_PendingWrite] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock = asyncio.Lock()
+
+    def add(self, values: Dict[str, Any]) -> "asyncio.Future[Optional[int]]":
+        """
+        Ставит добавление пользователя в группу.
+
+        :param values: Поля пользователя; telegram_id обязателен.
+        :return: Future с users.id добавленного пользователя или None, если telegram_id уже существует.
+        """
+        return self._submit("insert", values)
+
+    def update(self, telegram_id: int, values: Dict[str, Any]) -> "asyncio.Future[bool]":
+        """
+        Ставит обновление пользователя в группу.
+
+        :param telegram_id: Telegram ID пользователя.
+        :param values: Изменяемые поля.
+        :return: Future с признаком того, что пользователь найден и обновлен.
+        """
+        return self._submit("update", {**values, "telegram_id": telegram_id})
+
+    def _submit(self, op: str, row: Dict[str, Any]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(_PendingWrite(op, row, future))
+        if len(self._pending) >= (self.max_rows or config.settings.USER_WRITE_MAX_ROWS):
+            self._flush_now()
+        elif self._timer is None:
+            window = self.window if self.window is not None else config.settings.USER_WRITE_WINDOW
+            self._timer = loop.call_later(window, self._flush_now)
+        return future
+
+    def _flush_now(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            background.spawn(self._write(batch), name="user_group_commit")
+
+    async def _write(self, batch: List["_PendingWrite"]) -> None:
+        async with self._lock:
+            try:
+                results = await self._write_group(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    _resolve(batch[0].future, exception=e)
+                    return
+                logger.warning(f"Групповая запись {len(batch)} пользователей не удалась ({e}), запись по одной")
+                for item in batch:
+                    try:
+                        result = (await self._write_group([item]))[0]
+                    except Exception as item_error:
+                        _resolve(item.future, exception=item_error)
+                    else:
+                        _resolve(item.future, result)
+            else:
+                for item, result in zip(batch, results):
+                    _resolve(item.future, result)
+
+    @staticmethod
+    async def _write_group(batch: List["_PendingWrite"]) -> List[Any]:
+        inserts: Dict[int, _PendingWrite] = {}
+        updates: Dict[Tuple[str, ...], Dict[int, Dict[str, Any]]] = {}
+        for item in batch:
+            if item.op == "insert":
+                # Повторное добавление того же пользователя в группе - одна строка (первого вызывающего)
+                inserts.setdefault(item.row["telegram_id"], item)
+            else:
+                fields = tuple(sorted(key for key in item.row if key != "telegram_id"))
+                # Более позднее обновление того же пользователя с тем же набором полей побеждает
+                updates.setdefault(fields, {})[item.row["telegram_id"]] = item.row
+
+        async with get_session_maker()() as session:
+            try:
+                inserted = await UserDAO.insert_many(session, [item.row for item in inserts.values()]) if inserts else {}
+                updated: Set[int] = set()
+                for fields, rows in updates.items():
+                    updated |= await UserDAO.update_many_by_telegram_id(session, fields, list(rows.values()))
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+        if inserted:
+            stats_rollup.mark_dirty()
+        return [(inserted.get(item.row["telegram_id"]) if inserts[item.row["telegram_id"]] is item else None)
+                if item.op == "insert" else item.row["telegram_id"] in updated
+                for item in batch]
+
+
+class _PendingWrite(NamedTuple):
+    op: str
+    row: Dict[str, Any]
+    future: asyncio.Future
+
+
+def _resolve(future: asyncio.Future, result: Any = None, exception: Optional[BaseException] = None) -> None:
+    # Вызывающий мог перестать ждать (например, обработчик отменен при остановке)
+    if future.done():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+
+user_writer = UserWriter()
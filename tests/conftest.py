@@ -0,0 +1,54 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable
+
+import pytest
+
+# Обязательные настройки задаются окружением до первого обращения к bot.config.settings
+os.environ.update({
+    "BOT_TOKEN": "123456:TEST",
+    "ADMIN_IDS": "[1]",
+    "DB_USER": "test",
+    "DB_PASSWORD": "test",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "test",
+    "IMEICHECK_TOKEN": "test",
+    "PYTHONPATH": ".",
+})
+
+
+@pytest.fixture
+def run_with_db(tmp_path, monkeypatch) -> Callable[[Callable[[], Awaitable[Any]]], Any]:
+    """
+    Запускает сценарий в новом event loop с чистой базой SQLite.
+
+    :return: Функция, принимающая фабрику корутины и возвращающая ее результат.
+    """
+    from bot import config
+    from bot.database import Base, dispose_engine, get_engine, get_replica_engine, get_session_maker
+    from bot.checks.models import ImeiCheck
+    from bot.stats.models import StatsHourly
+    from bot.updates.models import ProcessedUpdate, UpdateOffset
+    from bot.users.models import User
+
+    monkeypatch.setattr(config, "database_url", f"sqlite+aiosqlite:///{tmp_path / 'bot.sqlite3'}", raising=False)
+    tables = [model.__table__ for model in (User, ImeiCheck, ProcessedUpdate, UpdateOffset, StatsHourly)]
+    factories = (get_engine, get_replica_engine, get_session_maker)
+    for factory in factories:
+        factory.cache_clear()
+
+    def run(scenario: Callable[[], Awaitable[Any]]) -> Any:
+        async def main() -> Any:
+            async with get_engine().begin() as conn:
+                await conn.run_sync(Base.metadata.create_all, tables=tables)
+            try:
+                return await scenario()
+            finally:
+                await dispose_engine()
+
+        return asyncio.run(main())
+
+    yield run
+    for factory in factories:
+        factory.cache_clear()
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot import config
+from bot.api import router
+from bot.api.app import create_app
+from bot.api.utils import token_cache
+from bot.database import get_session_maker
+from bot.users.dao import UserDAO
+
+TOKEN = "token-1"
+IMEI = "490154203237518"
+OTHER_IMEI = "356938035643809"
+
+
+@pytest.fixture
+def api(run_with_db, monkeypatch):
+    """
+    Запускает HTTP API с пользователем TOKEN; проверки IMEI не обращаются к imeicheck.net.
+
+    :return: Функция, принимающая сценарий (корутину от TestClient) и список вызовов проверки.
+    """
+    checked = []
+
+    async def get_or_create_check(session, user_id, imei, service_id):
+        checked.append((imei, service_id))
+        return SimpleNamespace(status="successful", result={"imei": imei})
+
+    monkeypatch.setattr(router, "get_or_create_check", get_or_create_check)
+    monkeypatch.setattr(config.settings, "API_TOKEN_RATE", 3)
+    token_cache.invalidate()
+
+    def run(scenario):
+        async def main():
+            async with get_session_maker()() as session:
+                await UserDAO.add_many(session, [{"telegram_id": 1, "token_id": TOKEN}])
+            async with TestClient(TestServer(create_app())) as client:
+                return await scenario(client)
+
+        return run_with_db(main)
+
+    yield run, checked
+    token_cache.invalidate()
+
+
+async def post(client: TestClient, body: dict, token: str | None = TOKEN):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    response = await client.post("/api/check-imei", json=body, headers=headers)
+    return response.status, await response.json(), response.headers
+
+
+@pytest.mark.parametrize("token, status", [(None, 401), ("unknown", 401), (TOKEN, 200)])
+def test_token_is_required(api, token, status):
+    run, _ = api
+
+    async def scenario(client):
+        return await post(client, {"imei": IMEI}, token=token)
+
+    assert run(scenario)[0] == status
+
+
+@pytest.mark.parametrize("body, status", [
+    ({}, 400),
+    ({"imei": "123"}, 400),
+    ({"imeis": [IMEI] * 51}, 400),
+    ({"imei": IMEI, "service_id": 999}, 403),
+])
+def test_invalid_requests_are_rejected_before_checks(api, body, status):
+    run, checked = api
+
+    async def scenario(client):
+        return await post(client, body)
+
+    assert run(scenario)[0] == status
+    assert checked == []
+
+
+def test_duplicate_imeis_are_checked_once(api):
+    run, checked = api
+
+    async def scenario(client):
+        return await post(client, {"imeis": [IMEI, OTHER_IMEI, IMEI]})
+
+    status, body, _ = run(scenario)
+
+    assert status == 200
+    assert [item["imei"] for item in body["results"]] == [IMEI, OTHER_IMEI, IMEI]
+    assert sorted(checked) == sorted([(IMEI, 12), (OTHER_IMEI, 12)])
+
+
+def test_rate_limit(api):
+    run, checked = api
+
+    async def scenario(client):
+        # Повторы не расходуют лимит: три разных IMEI укладываются в API_TOKEN_RATE=3
+        first = await post(client, {"imeis": [IMEI, IMEI, OTHER_IMEI]})
+        second = await post(client, {"imei": IMEI})
+        third = await post(client, {"imei": OTHER_IMEI})
+        return first, second, third
+
+    first, second, third = run(scenario)
+
+    assert (first[0], second[0]) == (200, 200)
+    assert third[0] == 429
+    assert int(third[2]["Retry-After"]) >= 1
+    assert len(checked) == 3
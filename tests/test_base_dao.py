@@ -0,0 +1,24 @@
+import pytest
+
+from bot.database import get_session_maker
+from bot.users.dao import UserDAO
+
+
+@pytest.mark.parametrize("method", ["update", "bulk_update"])
+def test_loaded_object_sees_updated_values(run_with_db, method):
+    async def scenario():
+        async with get_session_maker()() as session:
+            await UserDAO.add_many(session, [{"telegram_id": 1, "username": "a"}, {"telegram_id": 2, "username": "c"}])
+            user = await UserDAO.find_one_or_none(session, {"telegram_id": 1})
+            other = await UserDAO.find_one_or_none(session, {"telegram_id": 2})
+            if method == "update":
+                updated = await UserDAO.update(session, {"telegram_id": 1}, {"username": "b"})
+            else:
+                updated = await UserDAO.bulk_update(session, [{"id": user.id, "username": "b"}])
+            # Объект, загруженный до обновления, читается после коммита в том же обработчике
+            loaded = (user.username, other.username)
+        async with get_session_maker()() as session:
+            stored = (await UserDAO.find_one_or_none(session, {"telegram_id": 1})).username
+        return updated, loaded, stored
+
+    assert run_with_db(scenario) == (1, ("b", "c"), "b")
@@ -0,0 +1,101 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from bot.checks import utils
+from bot.checks.client import ImeiCheckClient
+from bot.checks.dao import ImeiCheckDAO
+from bot.checks.schemas import CheckResponse, ImeiCheckModel
+from bot.database import get_session_maker
+from bot.quotas.utils import usage_counter
+
+IMEI = "490154203237518"
+
+
+def fake_create_check(behaviour: dict, finished: list):
+    """
+    Подменяет запрос к imeicheck.net: поведение задается для каждой услуги.
+
+    ok - ответ сразу, failed_unsent/failed_sent - ошибка до/после отправки,
+    queued/hanging - ответа нет, запрос ждет места в очереди или уже отправлен.
+    """
+    async def create_check(imei, service_id, sent=None):
+        kind = behaviour[service_id]
+        try:
+            if kind in ("failed_sent", "hanging", "ok"):
+                sent.set()
+            if kind.startswith("failed"):
+                raise RuntimeError(kind)
+            if kind in ("queued", "hanging"):
+                await asyncio.sleep(10)
+            return CheckResponse.model_validate({"id": str(service_id), "status": "successful"})
+        finally:
+            finished.append(service_id)
+
+    return create_check
+
+
+@pytest.mark.parametrize("behaviour, charged", [
+    ({1: "ok", 2: "queued", 3: "hanging"}, 2),
+    ({1: "failed_unsent", 2: "failed_sent"}, 1),
+    ({1: "queued", 2: "queued"}, 0),
+])
+def test_quota_is_refunded_only_for_unsent_requests(run_with_db, monkeypatch, behaviour, charged):
+    finished = []
+    monkeypatch.setattr(utils.imeicheck_client, "create_check", fake_create_check(behaviour, finished))
+    user_id = 1000 + len(behaviour) * 10 + charged
+
+    async def scenario():
+        async with get_session_maker()() as session:
+            report = await utils.get_or_create_report(session, user_id=user_id, imei=IMEI,
+                                                      service_ids=list(behaviour), deadline=0.05)
+        # Отмененные запросы завершены к моменту возврата отчета
+        return report, list(finished)
+
+    report, finished_on_return = run_with_db(scenario)
+
+    assert sorted(finished_on_return) == sorted(behaviour)
+    assert usage_counter.usage(user_id) == (charged, charged)
+    assert list(report.responses) == [service_id for service_id, kind in behaviour.items() if kind == "ok"]
+
+
+def test_client_marks_request_as_sent():
+    async def checks(request: web.Request) -> web.Response:
+        return web.json_response({"id": "1", "status": "successful"})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/checks", checks)
+        async with TestServer(app) as server:
+            base_url = str(server.make_url("")).rstrip("/")
+            client = ImeiCheckClient(base_url=base_url)
+            sent = asyncio.Event()
+            response = await client.create_check(IMEI, 12, sent=sent)
+            await client.close()
+        # Сервер остановлен: соединение не устанавливается, запрос не отправлен
+        unreachable = ImeiCheckClient(base_url=base_url)
+        not_sent = asyncio.Event()
+        with pytest.raises(aiohttp.ClientConnectionError):
+            await unreachable.create_check(IMEI, 12, sent=not_sent)
+        await unreachable.close()
+        return response.status, sent.is_set(), not_sent.is_set()
+
+    assert asyncio.run(scenario()) == ("successful", True, False)
+
+
+def test_results_of_other_users_are_copied_to_history(run_with_db, monkeypatch):
+    monkeypatch.setattr(utils.imeicheck_client, "create_check", fake_create_check({2: "ok"}, []))
+
+    async def scenario():
+        async with get_session_maker()() as session:
+            await ImeiCheckDAO.add(session, ImeiCheckModel(user_id=2000, imei=IMEI, service_id=1,
+                                                           status="successful", result={"id": "1"}))
+            await utils.get_or_create_report(session, user_id=2001, imei=IMEI, service_ids=[1, 2], deadline=1)
+            history = await ImeiCheckDAO.find_all(session, {"user_id": 2001})
+        return sorted(check.service_id for check in history), usage_counter.usage(2001)
+
+    # Из истории взята услуга 1 (без списания квоты), запрошена только услуга 2
+    assert run_with_db(scenario) == ([1, 2], (1, 1))
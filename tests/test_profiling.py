@@ -0,0 +1,37 @@
+import asyncio
+
+from bot.admin.profiling import TaskInspector
+
+
+async def idle(seconds: float) -> None:
+    await asyncio.sleep(seconds)
+
+
+def test_task_age_is_measured_from_creation():
+    async def scenario():
+        inspector = TaskInspector()
+        before = asyncio.create_task(idle(10), name="before-start")
+        without_tracking = inspector.report()
+
+        inspector.start()
+        old = asyncio.create_task(idle(10), name="old")
+        await asyncio.sleep(0.2)
+        new = asyncio.create_task(idle(10), name="new")
+        await asyncio.sleep(0)
+        # Первый же отчет ранжирует задачи по возрасту
+        report = inspector.report()
+        inspector.stop()
+        factory = asyncio.get_running_loop().get_task_factory()
+
+        for task in (before, old, new):
+            task.cancel()
+        return without_tracking, report, factory
+
+    without_tracking, report, factory = asyncio.run(scenario())
+
+    assert "/tasks start" in without_tracking and "  old  " not in without_tracking
+    ranked = [line.split()[2] for line in report.splitlines() if " с  " in line]
+    assert ranked[:2] == ["old", "new"]
+    assert "before-start" not in ranked
+    assert float(report.splitlines()[-len(ranked)].split()[0]) >= 0.2
+    assert factory is None
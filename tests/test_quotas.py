@@ -0,0 +1,37 @@
+from datetime import date
+
+from bot.quotas import utils
+from bot.quotas.utils import UsageCounter
+
+
+def freeze_today(monkeypatch, day: date) -> None:
+    class FrozenDate(date):
+        @classmethod
+        def today(cls):
+            return day
+
+    monkeypatch.setattr(utils, "date", FrozenDate)
+
+
+def test_refund_after_midnight_goes_to_the_day_of_acquire(monkeypatch):
+    counter = UsageCounter()
+    freeze_today(monkeypatch, date(2026, 3, 31))
+    charged_on = counter.acquire(1, 2)
+
+    # Запрос завершился ошибкой уже в новом дне (и новом месяце)
+    freeze_today(monkeypatch, date(2026, 4, 1))
+    counter.acquire(1)
+    counter.refund(1, charged_on, 2)
+
+    assert counter.usage(1) == (1, 1)
+    assert {key: delta for key, delta in counter._pending.items() if delta} == {(1, date(2026, 4, 1)): 1}
+
+
+def test_refund_on_the_same_day(monkeypatch):
+    counter = UsageCounter()
+    freeze_today(monkeypatch, date(2026, 4, 1))
+    charged_on = counter.acquire(1, 3)
+    counter.refund(1, charged_on)
+
+    assert counter.usage(1) == (2, 2)
+    assert counter._pending[(1, date(2026, 4, 1))] == 2
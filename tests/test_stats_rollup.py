@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from bot.database import get_session_maker
+from bot.stats.dao import StatsDAO
+from bot.stats.utils import StatsRollup
+from bot.users.dao import UserDAO
+
+
+async def add_users(*telegram_ids: int) -> None:
+    async with get_session_maker()() as session:
+        await UserDAO.add_many(session, [{"telegram_id": telegram_id} for telegram_id in telegram_ids])
+
+
+async def users_total() -> int:
+    async with get_session_maker()() as session:
+        totals, _, _ = await StatsDAO.summary(session, today=datetime(2000, 1, 1), hours_from=datetime(2000, 1, 1))
+    return totals.get("users", 0)
+
+
+def test_watermark_comes_from_database_clock(run_with_db):
+    async def scenario():
+        rollup = StatsRollup()
+        await add_users(1, 2)
+        await rollup.refresh()
+        first = await users_total()
+        async with get_session_maker()() as session:
+            database_now = await StatsDAO.current_time(session)
+        await add_users(3)
+        await rollup.refresh()
+        return first, await users_total(), rollup.watermark, database_now
+
+    first, second, watermark, database_now = run_with_db(scenario)
+
+    assert (first, second) == (2, 3)
+    # Водяной знак - время базы, а не часы приложения
+    assert abs(watermark - database_now) < timedelta(minutes=1)
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from bot.traffic.utils import Anonymizer
+
+USER = {"id": 111222, "is_bot": False, "first_name": "Ivan", "last_name": "Petrov", "username": "ivan"}
+CHAT = {"id": 111222, "type": "private", "first_name": "Ivan", "username": "ivan"}
+
+UPDATES = [
+    pytest.param({"update_id": 1, "message": {
+        "message_id": 5, "date": 0, "chat": CHAT, "from": USER, "text": "/start",
+    }}, [111222], id="message"),
+    pytest.param({"update_id": 2, "message": {
+        "message_id": 6, "date": 0, "chat": CHAT, "from": USER, "text": "hi",
+        "forward_origin": {"type": "user", "date": 0,
+                           "sender_user": {"id": 999111, "is_bot": False, "first_name": "Anna"}},
+    }}, [111222, 999111], id="forward_origin"),
+    pytest.param({"update_id": 3, "message": {
+        "message_id": 7, "date": 0, "from": USER,
+        "chat": {"id": -100777, "type": "supergroup", "title": "Group"},
+        "new_chat_members": [{"id": 424242, "is_bot": False, "first_name": "Oleg"}],
+    }}, [111222, 100777, 424242], id="new_chat_members"),
+    pytest.param({"update_id": 4, "message": {
+        "message_id": 8, "date": 0, "from": USER,
+        "chat": {"id": -100777, "type": "supergroup", "title": "Group"},
+        "left_chat_member": {"id": 313131, "is_bot": False, "first_name": "Petr"},
+    }}, [111222, 100777, 313131], id="left_chat_member"),
+    pytest.param({"update_id": 5, "message": {
+        "message_id": 9, "date": 0, "chat": CHAT, "from": USER,
+        "contact": {"phone_number": "+79990000000", "first_name": "Ivan", "user_id": 555666},
+        "users_shared": {"request_id": 1, "user_ids": [777888]},
+    }}, [111222, 555666, 777888], id="contact_and_shared_users"),
+]
+
+
+@pytest.mark.parametrize("update, original_ids", UPDATES)
+def test_no_original_ids_or_names_survive(update, original_ids):
+    dumped = json.dumps(Anonymizer(b"salt").anonymize(update))
+
+    for original_id in original_ids:
+        assert str(original_id) not in dumped
+    for personal in ("Ivan", "Petrov", "ivan", "Anna", "Oleg", "Petr", "+79990000000", "Group"):
+        assert personal not in dumped
+
+
+def test_pseudonyms_are_stable_and_keep_structure():
+    anonymizer = Anonymizer(b"salt")
+    update = anonymizer.anonymize(UPDATES[0].values[0])
+    message = update["message"]
+
+    assert message["from"]["id"] == message["chat"]["id"] == anonymizer.pseudo_id(111222)
+    assert anonymizer.anonymize(UPDATES[2].values[0])["message"]["chat"]["id"] == anonymizer.pseudo_id(-100777) < 0
+    assert update["update_id"] == 1 and message["message_id"] == 5 and message["text"] == "/start"
+    assert message["from"]["is_bot"] is False
+
+
+def test_salt_changes_pseudonyms():
+    assert Anonymizer(b"one").pseudo_id(111222) != Anonymizer(b"two").pseudo_id(111222)
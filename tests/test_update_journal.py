@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from bot.updates.middleware import REJECTED_KEY, UpdateJournalMiddleware
+from bot.updates.utils import UpdateJournal
+
+BOT_ID = 42
+
+
+async def reload() -> UpdateJournal:
+    journal = UpdateJournal(window=100, flush_interval=60)
+    await journal.load(BOT_ID)
+    return journal
+
+
+def test_duplicates_are_rejected_in_memory_and_after_reload(run_with_db):
+    async def scenario():
+        journal = await reload()
+        first, duplicate = journal.claim(1), journal.claim(1)
+        journal.done(1)
+        await journal.flush()
+        return first, duplicate, (await reload()).claim(1)
+
+    assert run_with_db(scenario) == (True, False, False)
+
+
+def test_offset_does_not_pass_updates_in_flight(run_with_db):
+    async def scenario():
+        journal = await reload()
+        for update_id in (10, 11, 12):
+            journal.claim(update_id)
+        # 11 и 12 завершились раньше 10
+        journal.done(11)
+        journal.done(12)
+        await journal.flush()
+        stalled = (await reload()).last_update_id
+
+        journal.done(10)
+        await journal.flush()
+        restarted = await reload()
+        return stalled, restarted.last_update_id, restarted.claim(12)
+
+    stalled, completed, duplicate = run_with_db(scenario)
+
+    assert stalled == 9
+    assert completed == 12
+    # Завершенный апдейт после сбоя распознается как дубликат
+    assert duplicate is False
+
+
+def test_offset_never_moves_back(run_with_db):
+    async def scenario():
+        journal = await reload()
+        journal.claim(20)
+        journal.done(20)
+        await journal.flush()
+        journal.claim(21)
+        journal.claim(22)
+        journal.done(22)
+        await journal.flush()
+        return journal.last_update_id, (await reload()).last_update_id
+
+    assert run_with_db(scenario) == (20, 20)
+
+
+def test_run_flushes_on_cancel(run_with_db):
+    async def scenario():
+        journal = await reload()
+        task = asyncio.create_task(journal.run())
+        journal.claim(30)
+        journal.done(30)
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return (await reload()).last_update_id
+
+    assert run_with_db(scenario) == 30
+
+
+async def failing_handler(event, data):
+    raise RuntimeError
+
+
+async def cancelled_handler(event, data):
+    raise asyncio.CancelledError
+
+
+async def rejected_handler(event, data):
+    # Так UpdateSchedulerMiddleware помечает апдейт, не принятый в очередь
+    data[REJECTED_KEY] = True
+
+
+@pytest.mark.parametrize("handler", [failing_handler, cancelled_handler, rejected_handler])
+def test_unfinished_update_can_be_processed_again(handler):
+    async def scenario():
+        journal = UpdateJournal(window=100, flush_interval=60)
+        middleware = UpdateJournalMiddleware(journal)
+        await asyncio.gather(middleware(handler, SimpleNamespace(update_id=40), {}), return_exceptions=True)
+        processed = []
+
+        async def handle(event, data):
+            processed.append(event.update_id)
+
+        # Повторная доставка того же апдейта после перезапуска
+        await middleware(handle, SimpleNamespace(update_id=40), {})
+        await middleware(handle, SimpleNamespace(update_id=40), {})
+        return processed, journal.committed_offset()
+
+    assert asyncio.run(scenario()) == ([40], 40)
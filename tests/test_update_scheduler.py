@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+from bot.updates.utils import SchedulerOverloaded, UpdateScheduler, released_slot
+
+
+def test_updates_of_one_chat_run_in_order():
+    async def scenario():
+        scheduler = UpdateScheduler(concurrency=4, max_pending=100, max_pending_per_chat=10)
+        log = []
+
+        async def handle(chat_id, number):
+            log.append(("start", chat_id, number))
+            # Поздние апдейты короче: без очереди чата они завершились бы первыми
+            await asyncio.sleep(0.01 * (3 - number))
+            log.append(("end", chat_id, number))
+
+        await asyncio.gather(*(scheduler.run(chat_id, lambda c=chat_id, n=number: handle(c, n))
+                               for number in range(3) for chat_id in (1, 2)))
+        return log, scheduler
+
+    log, scheduler = asyncio.run(scenario())
+
+    for chat_id in (1, 2):
+        events = [(kind, number) for kind, chat, number in log if chat == chat_id]
+        assert events == [("start", 0), ("end", 0), ("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+    # Разные чаты обрабатываются параллельно
+    assert log[:2] == [("start", 1, 0), ("start", 2, 0)]
+    assert scheduler.pending == 0 and scheduler.active_chats == 0
+
+
+def test_concurrency_limit():
+    async def scenario():
+        scheduler = UpdateScheduler(concurrency=2, max_pending=100, max_pending_per_chat=10)
+        running = peak = 0
+
+        async def handle():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(*(scheduler.run(chat_id, handle) for chat_id in range(6)))
+        return peak
+
+    assert asyncio.run(scenario()) == 2
+
+
+@pytest.mark.parametrize("max_pending, max_pending_per_chat, chats, accepted", [
+    (3, 10, [1, 2, 3, 4, 5], 3),
+    (100, 2, [1, 1, 1, 2], 3),
+])
+def test_overload_is_rejected(max_pending, max_pending_per_chat, chats, accepted):
+    async def scenario():
+        scheduler = UpdateScheduler(concurrency=1, max_pending=max_pending, max_pending_per_chat=max_pending_per_chat)
+        results = await asyncio.gather(*(scheduler.run(chat_id, lambda: asyncio.sleep(0.01, "ok"))
+                                         for chat_id in chats), return_exceptions=True)
+        return results, scheduler
+
+    results, scheduler = asyncio.run(scenario())
+
+    assert results.count("ok") == accepted
+    assert all(isinstance(result, SchedulerOverloaded) for result in results if result != "ok")
+    assert scheduler.rejected == len(chats) - accepted
+    assert scheduler.pending == 0
+
+
+def test_slot_is_freed_on_error_and_cancel():
+    async def scenario():
+        scheduler = UpdateScheduler(concurrency=1, max_pending=10, max_pending_per_chat=10)
+
+        async def fail():
+            raise ValueError
+
+        with pytest.raises(ValueError):
+            await scheduler.run(1, fail)
+        task = asyncio.create_task(scheduler.run(1, lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return await asyncio.wait_for(scheduler.run(1, lambda: asyncio.sleep(0, "ok")), timeout=1), scheduler
+
+    result, scheduler = asyncio.run(scenario())
+    assert result == "ok"
+    assert scheduler.pending == 0 and scheduler.active_chats == 0
+
+
+def test_released_slot_lets_other_chats_run():
+    async def scenario():
+        scheduler = UpdateScheduler(concurrency=1, max_pending=10, max_pending_per_chat=10)
+        log = []
+        waiting = asyncio.Event()
+
+        async def inline_query():
+            async with released_slot():
+                log.append("inline waits")
+                await waiting.wait()
+            log.append("inline resumes")
+
+        async def message():
+            log.append("message")
+            waiting.set()
+
+        inline = asyncio.create_task(scheduler.run(None, inline_query))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(asyncio.gather(inline, scheduler.run(1, message)), timeout=1)
+        return log, scheduler
+
+    log, scheduler = asyncio.run(scenario())
+    assert log == ["inline waits", "message", "inline resumes"]
+    assert scheduler.pending == 0
+
+
+def test_released_slot_outside_scheduler_is_noop():
+    async def scenario():
+        async with released_slot():
+            return "ok"
+
+    assert asyncio.run(scenario()) == "ok"
+
+
+def test_cancel_while_taking_slot_back_does_not_leak_it():
+    async def scenario():
+        scheduler = UpdateScheduler(concurrency=1, max_pending=10, max_pending_per_chat=10)
+        release_message = asyncio.Event()
+
+        async def inline_query():
+            async with released_slot():
+                await asyncio.sleep(0)
+
+        async def message():
+            await release_message.wait()
+
+        inline = asyncio.create_task(scheduler.run(None, inline_query))
+        await asyncio.sleep(0)
+        busy = asyncio.create_task(scheduler.run(1, message))
+        await asyncio.sleep(0.01)
+        # inline_query ждет возврата места, которое занято сообщением
+        inline.cancel()
+        await asyncio.gather(inline, return_exceptions=True)
+        release_message.set()
+        await busy
+
+        running = peak = 0
+
+        async def handle():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(*(scheduler.run(chat_id, handle) for chat_id in range(3)))
+        return peak, scheduler
+
+    peak, scheduler = asyncio.run(scenario())
+    assert peak == 1
+    assert scheduler.pending == 0
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from bot.database import get_session_maker
+from bot.users.dao import UserDAO
+from bot.users.utils import UserWriter
+
+
+def spy_insert_many(monkeypatch) -> list:
+    calls = []
+    original = UserDAO.insert_many.__func__
+
+    async def insert_many(cls, session, rows):
+        calls.append([row["telegram_id"] for row in rows])
+        return await original(cls, session, rows)
+
+    monkeypatch.setattr(UserDAO, "insert_many", classmethod(insert_many))
+    return calls
+
+
+async def load_user(telegram_id: int):
+    async with get_session_maker()() as session:
+        return await UserDAO.find_one_or_none(session, {"telegram_id": telegram_id})
+
+
+def test_concurrent_adds_are_written_as_one_group(run_with_db, monkeypatch):
+    calls = spy_insert_many(monkeypatch)
+    writer = UserWriter(window=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(writer.add({"telegram_id": telegram_id}) for telegram_id in (10, 11, 12)))
+
+    ids = run_with_db(scenario)
+
+    assert calls == [[10, 11, 12]]
+    assert all(isinstance(user_id, int) for user_id in ids)
+    assert len(set(ids)) == 3
+
+
+def test_duplicate_add_in_group_returns_none_to_later_callers(run_with_db):
+    writer = UserWriter(window=0.05)
+
+    async def scenario():
+        # /start и /registration одного пользователя попали в одну группу
+        start = writer.add({"telegram_id": 20, "username": "user"})
+        registration = writer.add({"telegram_id": 20, "token_id": "token-20"})
+        created = await registration
+        if created is None:
+            assert await writer.update(20, {"token_id": "token-20"})
+        return await start, created, await load_user(20)
+
+    start_id, registration_id, user = run_with_db(scenario)
+
+    assert isinstance(start_id, int)
+    assert registration_id is None
+    assert user.username == "user"
+    assert user.token_id == "token-20"
+
+
+def test_failed_group_falls_back_to_single_rows(run_with_db, monkeypatch):
+    calls = spy_insert_many(monkeypatch)
+    writer = UserWriter(window=0.05)
+
+    async def scenario():
+        # Одинаковый token_id нарушает уникальность - ошибку должен получить только второй вызывающий
+        first = writer.add({"telegram_id": 30, "token_id": "same"})
+        second = writer.add({"telegram_id": 31, "token_id": "same"})
+        third = writer.add({"telegram_id": 32})
+        results = await asyncio.gather(first, second, third, return_exceptions=True)
+        return results, await load_user(31)
+
+    (first_id, second_error, third_id), missing = run_with_db(scenario)
+
+    assert calls == [[30, 31, 32], [30], [31], [32]]
+    assert isinstance(first_id, int)
+    assert isinstance(second_error, IntegrityError)
+    assert isinstance(third_id, int)
+    assert missing is None
+
+
+def test_update_reports_missing_user(run_with_db):
+    writer = UserWriter(window=0)
+
+    async def scenario():
+        return await writer.update(40, {"token_id": "token-40"})
+
+    assert run_with_db(scenario) is False
+
+
+@pytest.mark.parametrize("max_rows", [1, 2])
+def test_group_is_flushed_when_full(run_with_db, monkeypatch, max_rows):
+    calls = spy_insert_many(monkeypatch)
+    # Окно намеренно большое: запись должна начаться по размеру группы
+    writer = UserWriter(window=60, max_rows=max_rows)
+
+    async def scenario():
+        return await asyncio.wait_for(asyncio.gather(*(writer.add({"telegram_id": 50 + i})
+                                                       for i in range(max_rows))), timeout=5)
+
+    run_with_db(scenario)
+    assert calls == [[50 + i for i in range(max_rows)]]